@@ -0,0 +1,248 @@
+"""Headless batch dressing.
+
+    blender -b -P Batch.py -- manifest.json [--workers 4] [--summary summary.json]
+
+The manifest is a JSON file:
+
+    {
+        "options": {"smooth": 0.1, "clean": true, "apply_transform": false, "transfer_engine": "NATIVE", "force": false},
+        "jobs": [
+            {
+                "blend": "avatars/alice.blend",
+                "body": "Body",
+                "garments": ["Shirt", {"blend": "garments/coat.blend", "object": "Coat"}],
+                "output": "out/alice_dressed.blend",
+                "options": {"smooth": 0.2}
+            }
+        ]
+    }
+
+Relative paths are resolved from the manifest directory. Garments given as objects of another .blend file are
+appended first. `output` defaults to `<blend>_dressed.blend` and per job `options` override the global ones.
+With `"library": "weights/"` in the options, garments already in that weight library are not transferred again.
+`"smooth_per_group": true` smooths once per vertex group like earlier versions instead of once over all groups.
+With `"layered": true`, garments given as `{"object": "Coat", "layer": 1}` are weighted from the body and the garments of
+lower layers.
+"""
+
+if __name__ == "__main__":
+    # started with `blender -b -P Batch.py -- manifest.json`: import the add-on as a package and run from there
+    import sys
+    import importlib
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    batch = importlib.import_module(Path(__file__).resolve().parent.name + ".Batch")
+    sys.exit(batch.main(batch.script_arguments()))
+
+from typing import Sequence
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bpy
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from .WeightTransfer import apply_cloth, ClothApplyOptions, set_garment_layer
+from .WeightLimit import InfluenceLimits
+from .WeightLibrary import WeightLibrary
+
+@dataclass
+class GarmentSource:
+    object: str
+    blend: str | None = None
+    # layer of the garment for layered dressing, the layer stored in the object when None
+    layer: int | None = None
+
+@dataclass
+class BatchJob:
+    blend: str
+    body: str
+    garments: list[GarmentSource]
+    output: str
+    options: dict = field(default_factory=dict)
+
+@dataclass
+class JobResult:
+    blend: str
+    output: str
+    garments: int
+    seconds: float
+    succeeded: bool
+    error: str | None = None
+
+
+def load_manifest(path: str) -> list[BatchJob]:
+    manifest_path = Path(path).resolve()
+    with open(manifest_path, encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    def resolve(value: str) -> str:
+        return str((manifest_path.parent / value).resolve())
+
+    jobs = []
+    for entry in manifest["jobs"]:
+        blend = resolve(entry["blend"])
+        garments = []
+        for garment in entry["garments"]:
+            if isinstance(garment, str):
+                garments.append(GarmentSource(garment))
+            else:
+                garments.append(GarmentSource(garment["object"], resolve(garment["blend"]) if "blend" in garment else None, garment.get("layer")))
+        output = resolve(entry["output"]) if "output" in entry else str(Path(blend).with_name(Path(blend).stem + "_dressed.blend"))
+        options = {**manifest.get("options", {}), **entry.get("options", {})}
+        if options.get("library"):
+            options["library"] = resolve(options["library"])
+        jobs.append(BatchJob(blend, entry["body"], garments, output, options))
+
+    return jobs
+
+def cloth_options(options: dict) -> ClothApplyOptions:
+    return ClothApplyOptions(
+        smooth=options.get("smooth", 0.1),
+        smooth_per_group=options.get("smooth_per_group", False),
+        clean=options.get("clean", True),
+        apply_transform=options.get("apply_transform", False),
+        message_updator=lambda message: None,
+        transfer_engine=options.get("transfer_engine", "NATIVE"),
+        force=options.get("force", False),
+        prefilter=options.get("prefilter", False),
+        prefilter_tolerance=options.get("prefilter_tolerance", 0.1),
+        symmetric=options.get("symmetric", False),
+        workers=options.get("transfer_workers", 0),
+        layered=options.get("layered", False),
+        layer_offset=options.get("layer_offset", 0.0),
+        memory_budget_mb=options.get("memory_budget_mb", 0),
+        library=WeightLibrary(options["library"]) if options.get("library") else None,
+        limits=InfluenceLimits(
+            options.get("max_influences", 0),
+            options.get("weight_threshold", 0.0),
+            options.get("normalize", False),
+            options.get("quantize_bits", 0)
+        ),
+    )
+
+def append_object(blend: str, name: str) -> bpy.types.Object:
+    with bpy.data.libraries.load(blend, link=False) as (data_from, data_to):
+        if name not in data_from.objects:
+            raise KeyError(f"'{name}' is not in {blend}")
+        data_to.objects = [name]
+    obj = data_to.objects[0]
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+def run_job(job: BatchJob) -> JobResult:
+    """Open the job's file, dress the body with every garment by name and save the result."""
+    start = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=job.blend)
+        body = bpy.data.objects[job.body]
+        garments = [
+            append_object(garment.blend, garment.object) if garment.blend is not None else bpy.data.objects[garment.object]
+            for garment in job.garments
+        ]
+        for garment, obj in zip(job.garments, garments):
+            if garment.layer is not None:
+                set_garment_layer(obj, garment.layer)
+
+        if not apply_cloth(body, garments, cloth_options(job.options)):
+            raise RuntimeError(f"'{job.body}' is not parented to an armature or no garment is a mesh")
+
+        Path(job.output).parent.mkdir(parents=True, exist_ok=True)
+        bpy.ops.wm.save_as_mainfile(filepath=job.output, copy=True)
+        return JobResult(job.blend, job.output, len(garments), time.perf_counter() - start, True)
+    except Exception as error:
+        return JobResult(job.blend, job.output, len(job.garments), time.perf_counter() - start, False, str(error))
+
+def run_jobs(jobs: Sequence[BatchJob]) -> list[JobResult]:
+    results = []
+    for i, job in enumerate(jobs):
+        result = run_job(job)
+        status = "done" if result.succeeded else f"failed: {result.error}"
+        print(f"[{i+1} / {len(jobs)}] {job.blend} -> {job.output} ({result.seconds:.2f} s) {status}")
+        results.append(result)
+    return results
+
+
+def run_worker(manifest: str, indices: Sequence[int]) -> list[JobResult]:
+    """Run the jobs `indices` of the manifest in a separate background Blender."""
+    with tempfile.TemporaryDirectory() as directory:
+        report = str(Path(directory) / "report.json")
+        command = [
+            bpy.app.binary_path, "--background", "--factory-startup", "--python", str(Path(__file__).resolve()), "--",
+            manifest, "--jobs", ",".join(map(str, indices)), "--report", report
+        ]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if not Path(report).exists():
+            jobs = load_manifest(manifest)
+            error = process.stderr.strip().splitlines()[-1:] or [f"exit code {process.returncode}"]
+            return [JobResult(jobs[i].blend, jobs[i].output, len(jobs[i].garments), 0.0, False, error[0]) for i in indices]
+        with open(report, encoding="utf-8") as file:
+            return [JobResult(**result) for result in json.load(file)]
+
+def run_manifest(manifest: str, workers: int = 1) -> list[JobResult]:
+    """Run every job of the manifest, fanned out over `workers` background Blender processes when more than one."""
+    manifest = str(Path(manifest).resolve())
+    jobs = load_manifest(manifest)
+    if workers <= 1 or len(jobs) <= 1 or not bpy.app.binary_path:
+        return run_jobs(jobs)
+
+    workers = min(workers, len(jobs))
+    chunks = [list(range(i, len(jobs), workers)) for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(lambda indices: run_worker(manifest, indices), chunks))
+
+    results: list[JobResult | None] = [None] * len(jobs)
+    for indices, report in zip(chunks, reports):
+        for index, result in zip(indices, report):
+            results[index] = result
+    return [result for result in results if result is not None]
+
+
+def summarize(results: Sequence[JobResult], seconds: float) -> dict:
+    garments = sum(result.garments for result in results if result.succeeded)
+    return {
+        "jobs": len(results),
+        "failed": sum(1 for result in results if not result.succeeded),
+        "garments": garments,
+        "seconds": seconds,
+        "garments_per_minute": garments / seconds * 60 if seconds > 0 else 0.0,
+        "results": [asdict(result) for result in results],
+    }
+
+def script_arguments() -> list[str]:
+    """Arguments after `--` on the Blender command line."""
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="blender -b -P Batch.py --", description="Dress many avatars from a manifest.")
+    parser.add_argument("manifest", help="JSON manifest of the bodies and garments to dress")
+    parser.add_argument("--workers", type=int, default=1, help="number of background Blender processes")
+    parser.add_argument("--summary", help="write the summary as JSON to this file")
+    parser.add_argument("--jobs", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # worker process started by run_worker
+    if args.jobs is not None:
+        jobs = load_manifest(args.manifest)
+        results = run_jobs([jobs[int(index)] for index in args.jobs.split(",")])
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump([asdict(result) for result in results], file)
+        return 0
+
+    start = time.perf_counter()
+    results = run_manifest(args.manifest, args.workers)
+    summary = summarize(results, time.perf_counter() - start)
+
+    print(f"{summary['garments']} garments in {summary['jobs']} jobs, {summary['failed']} failed, "
+          f"{summary['seconds']:.1f} s ({summary['garments_per_minute']:.1f} garments / minute)")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+
+    return 1 if summary["failed"] else 0
@@ -0,0 +1,363 @@
+"""Benchmark of every Dress Up stage on synthetic scenes.
+
+    blender -b -P Benchmark.py -- [--scenes small,medium] [--baseline baseline.json] [--save-baseline baseline.json]
+
+Every scene is generated from scratch: an armature with L/R bone chains, a body weighted to its nearest bones and
+a garment around it. The stages are timed one by one with their peak memory, and the weights of the native
+transfer are compared with Blender's own data transfer, so a faster stage cannot quietly change the result.
+
+With `--baseline`, the run is compared with a stored one and the exit code is 1 when a stage got slower than the
+tolerance, the transfer got less accurate or the resulting weights changed. `benchmark_baseline.json` holds the small
+and medium scenes measured with the bpy 5.0.1 module on one Xeon core; timings only compare on similar machines.
+"""
+
+if __name__ == "__main__":
+    # started with `blender -b -P Benchmark.py`: import the add-on as a package and run from there
+    import sys
+    import importlib
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    benchmark = importlib.import_module(Path(__file__).resolve().parent.name + ".Benchmark")
+    sys.exit(benchmark.main(benchmark.script_arguments()))
+
+from typing import Sequence, Callable
+from dataclasses import dataclass, field, asdict
+
+import bpy
+import sys
+import math
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+from .WeightTransfer import apply_cloth, ClothApplyOptions, make_armature_parent
+from .WeightSmooth import smooth_matrix_groups, smoothing_passes
+from .WeightMatrix import WeightMatrix
+from .VertexCleaner import cleanup_unused_vertex_groups, flip_vertex_group_name, read_deform_weights, write_deform_weights
+from .Profiler import StageProfiler, resident_mb
+
+BENCHMARK_VERSION = 1
+
+@dataclass
+class SceneSpec:
+    name: str
+    bones: int
+    body_vertices: int
+    garment_vertices: int
+
+SCENES = {
+    "small": SceneSpec("small", 50, 4_000, 5_000),
+    "medium": SceneSpec("medium", 200, 16_000, 50_000),
+    "large": SceneSpec("large", 500, 40_000, 250_000),
+    "huge": SceneSpec("huge", 900, 65_000, 1_000_000),
+}
+
+@dataclass
+class StageResult:
+    seconds: float
+    # how far the resident memory of the process rose above its start during the stage
+    peak_mb: float
+
+@dataclass
+class SceneResult:
+    spec: SceneSpec
+    stages: dict[str, StageResult] = field(default_factory=dict)
+    # largest and mean difference of the transferred weights from the reference transfer, over the weights either has
+    max_error: float = 0.0
+    mean_error: float = 0.0
+    # total and count of the weights of the dressed garment
+    weight_sum: float = 0.0
+    weight_count: int = 0
+    # resident set size of the whole process, Blender's own allocations included
+    max_rss_mb: float = 0.0
+
+
+# Synthetic scene
+#################################################
+
+BONE_SUFFIXES = [(".L", ".R"), ("_L", "_R"), ("Left", "Right")]
+
+def ellipsoid_mesh(name: str, vertex_count: int, radii: tuple[float, float, float]) -> bpy.types.Mesh:
+    """Quad grid over an ellipsoid without its poles, built from arrays so a million vertices take no Python loop."""
+    segments = max(8, int(math.sqrt(vertex_count * 2)))
+    rings = max(2, vertex_count // segments)
+    theta = np.linspace(0.1 * math.pi, 0.9 * math.pi, rings)
+    phi = np.linspace(0.0, 2.0 * math.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing="ij")
+    coords = np.stack([
+        radii[0] * np.sin(theta) * np.cos(phi), radii[1] * np.sin(theta) * np.sin(phi), radii[2] * np.cos(theta)
+    ], axis=-1).reshape(-1, 3)
+
+    ring = np.arange(rings - 1)[:, None] * segments
+    segment = np.arange(segments)[None, :]
+    next_segment = (segment + 1) % segments
+    quads = np.stack([ring + segment, ring + next_segment, ring + segments + next_segment, ring + segments + segment], axis=-1).reshape(-1, 4)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set("co", coords.astype(np.float32).ravel())
+    mesh.loops.add(quads.size)
+    mesh.loops.foreach_set("vertex_index", quads.astype(np.int32).ravel())
+    mesh.polygons.add(len(quads))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, quads.size, 4, dtype=np.int32))
+    try:
+        mesh.polygons.foreach_set("loop_total", np.full(len(quads), 4, dtype=np.int32))
+    except (AttributeError, TypeError, RuntimeError):
+        # read-only since Blender 4.0, where the sizes follow from the starts
+        pass
+    mesh.update(calc_edges=True)
+    return mesh
+
+def make_armature(bones: int) -> tuple[bpy.types.Object, list[str], np.ndarray]:
+    """Armature with a spine and L/R chains spiralling around it. Returns it with the names and heads of its bones."""
+    data = bpy.data.armatures.new("BenchmarkArmature")
+    armature = bpy.data.objects.new("BenchmarkArmature", data)
+    bpy.context.scene.collection.objects.link(armature)
+    bpy.context.view_layer.objects.active = armature
+    bpy.ops.object.mode_set(mode="EDIT")
+
+    spine = max(1, bones // 10)
+    pairs = (bones - spine) // 2
+    names, heads = [], []
+    for i in range(spine):
+        bone = data.edit_bones.new(f"Spine{i:03d}")
+        bone.head = (0.0, 0.0, -1.2 + 2.4 * i / spine)
+        bone.tail = (0.0, 0.0, -1.2 + 2.4 * (i + 1) / spine)
+        names.append(bone.name)
+        heads.append(tuple(bone.head))
+    for i in range(pairs):
+        left, right = BONE_SUFFIXES[i % len(BONE_SUFFIXES)]
+        angle = 2.0 * math.pi * i / max(1, pairs) * 7.0
+        height = -1.2 + 2.4 * i / max(1, pairs)
+        for suffix, side in ((left, 1.0), (right, -1.0)):
+            bone = data.edit_bones.new(f"Limb{i:03d}{suffix}")
+            bone.head = (side * (0.3 + 0.5 * abs(math.cos(angle))), 0.4 * math.sin(angle), height)
+            bone.tail = (bone.head[0] + side * 0.1, bone.head[1], bone.head[2])
+            names.append(bone.name)
+            heads.append(tuple(bone.head))
+
+    bpy.ops.object.mode_set(mode="OBJECT")
+    return armature, names, np.array(heads, dtype=np.float64)
+
+def weight_to_nearest_bones(obj: bpy.types.Object, heads: np.ndarray, names: list[str], influences: int = 4):
+    """Weight every vertex to its nearest bone heads by inverse square distance, deterministic unlike automatic weights."""
+    mesh = obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3).astype(np.float64)
+    for name in names:
+        obj.vertex_groups.new(name=name)
+
+    influences = min(influences, len(heads))
+    nearest, weights = [], []
+    for start in range(0, len(coords), 4096):
+        distances = ((coords[start:start + 4096, None, :] - heads[None, :, :]) ** 2).sum(axis=-1)
+        chunk = np.argpartition(distances, influences - 1, axis=1)[:, :influences]
+        inverse = 1.0 / (np.take_along_axis(distances, chunk, axis=1) + 1e-6)
+        nearest.append(chunk)
+        weights.append(inverse / inverse.sum(axis=1, keepdims=True))
+
+    vertices = np.repeat(np.arange(len(coords), dtype=np.int32), influences)
+    write_deform_weights(mesh, vertices, np.concatenate(nearest).astype(np.int32).ravel(), np.concatenate(weights).astype(np.float32).ravel())
+
+def make_scene(spec: SceneSpec) -> tuple[bpy.types.Object, bpy.types.Object]:
+    """Empty the file and build the body and garment of the scene."""
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    armature, names, heads = make_armature(spec.bones)
+
+    body = bpy.data.objects.new("BenchmarkBody", ellipsoid_mesh("BenchmarkBody", spec.body_vertices, (1.0, 0.5, 1.5)))
+    bpy.context.scene.collection.objects.link(body)
+    weight_to_nearest_bones(body, heads, names)
+    make_armature_parent([body], armature)
+
+    garment = bpy.data.objects.new("BenchmarkGarment", ellipsoid_mesh("BenchmarkGarment", spec.garment_vertices, (1.08, 0.56, 1.3)))
+    bpy.context.scene.collection.objects.link(garment)
+    bpy.context.view_layer.update()
+    return body, garment
+
+def copy_object(obj: bpy.types.Object, name: str) -> bpy.types.Object:
+    copy = obj.copy()
+    copy.data = obj.data.copy() # type: ignore
+    copy.name = name
+    bpy.context.scene.collection.objects.link(copy)
+    return copy
+
+
+# Measurement
+#################################################
+
+def max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        # not on Windows
+        return 0.0
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+def measure(stages: dict[str, StageResult], stage: str, function: Callable, *args, interval: float = 0.005):
+    """Run the function as the stage, recording its wall time and peak memory. The memory is sampled from another
+    thread rather than traced, since tracing every allocation would slow the Python-heavy stages many times over.
+    Without /proc, the rise of the process peak is recorded instead, which misses peaks below an earlier one."""
+    start_rss = resident_mb()
+    start_peak = max_rss_mb()
+    peak = [start_rss or 0.0]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            peak[0] = max(peak[0], resident_mb() or 0.0)
+    sampler = threading.Thread(target=sample, daemon=True)
+    if start_rss is not None:
+        sampler.start()
+
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        seconds = time.perf_counter() - start
+        stop.set()
+        if start_rss is not None:
+            sampler.join()
+            peak_mb = max(peak[0], resident_mb() or 0.0) - start_rss
+        else:
+            peak_mb = max_rss_mb() - start_peak
+        stages[stage] = StageResult(seconds, peak_mb)
+
+def dense_weights(obj: bpy.types.Object, names: list[str]) -> np.ndarray:
+    """(vertices x names) matrix of the weights of the object in the groups `names`."""
+    vertices, groups, weights = read_deform_weights(obj.data) # type: ignore
+    columns = np.array([names.index(group.name) if group.name in names else -1 for group in obj.vertex_groups] + [-1], dtype=np.int64)
+    matrix = np.zeros((len(obj.data.vertices), len(names)), dtype=np.float32) # type: ignore
+    selected = columns[groups] >= 0
+    matrix[vertices[selected], columns[groups[selected]]] = weights[selected]
+    return matrix
+
+def run_scene(spec: SceneSpec) -> SceneResult:
+    result = SceneResult(spec)
+    body, garment = make_scene(spec)
+    reference = copy_object(garment, "BenchmarkReference")
+    names = [group.name for group in body.vertex_groups]
+
+    def flip_all_names():
+        flip_vertex_group_name.cache_clear()
+        return [flip_vertex_group_name(name) for name in names]
+    measure(result.stages, "flip_vertex_group_name", flip_all_names)
+
+    # transfer only, so the accuracy is the transfer's
+    options = ClothApplyOptions(0.0, False, False, lambda message: None, "NATIVE", force=True)
+    measure(result.stages, "transfer_native", apply_cloth, body, [garment], options)
+    measure(result.stages, "transfer_reference", apply_cloth, body, [reference], ClothApplyOptions(0.0, False, False, lambda message: None, "OPERATOR", force=True))
+    native, expected = dense_weights(garment, names), dense_weights(reference, names)
+    error = np.abs(native - expected)[(native > 0) | (expected > 0)]
+    result.max_error = float(error.max()) if error.size else 0.0
+    result.mean_error = float(error.mean()) if error.size else 0.0
+
+    # the smoothing of Dress Up: read once, smooth every group together, write back once
+    def smooth_garment():
+        matrix = WeightMatrix.from_object(garment)
+        smooth_matrix_groups(matrix, 0.5, smoothing_passes(len(matrix.group_names), False), mesh=garment.data) # type: ignore
+        matrix.commit(garment)
+    measure(result.stages, "smooth_matrix_groups", smooth_garment)
+
+    # every group of the body, like a data transfer of all layers leaves them
+    for name in names:
+        if garment.vertex_groups.get(name) is None:
+            garment.vertex_groups.new(name=name)
+    measure(result.stages, "cleanup_unused_vertex_groups", cleanup_unused_vertex_groups, garment)
+
+    # the whole Dress Up on a fresh garment, split into its stages by the profiler
+    dressed = copy_object(reference, "BenchmarkDressed")
+    for group in list(dressed.vertex_groups):
+        dressed.vertex_groups.remove(group)
+    profiler = StageProfiler()
+    measure(result.stages, "apply_cloth", apply_cloth, body, [dressed], ClothApplyOptions(0.1, True, True, lambda message: None, "NATIVE", profiler, force=True))
+    for stage, seconds in profiler.stage_totals():
+        result.stages[f"apply_cloth / {stage}"] = StageResult(seconds, 0.0)
+
+    _, _, weights = read_deform_weights(dressed.data) # type: ignore
+    result.weight_sum = float(weights.astype(np.float64).sum())
+    result.weight_count = len(weights)
+    result.max_rss_mb = max_rss_mb()
+    return result
+
+
+# Baseline
+#################################################
+
+def to_json(results: Sequence[SceneResult]) -> dict:
+    return {"version": BENCHMARK_VERSION, "scenes": {result.spec.name: asdict(result) for result in results}}
+
+def compare(results: Sequence[SceneResult], baseline: dict, tolerance: float, noise: float = 0.05) -> list[str]:
+    """Regressions of the results from the baseline. A stage regresses when it got slower by more than `tolerance`
+    of its baseline time and by more than `noise` seconds, which short stages easily vary by."""
+    regressions = []
+    scenes = baseline.get("scenes", {}) if baseline.get("version") == BENCHMARK_VERSION else {}
+    for result in results:
+        base = scenes.get(result.spec.name)
+        if base is None: continue
+        if base["spec"] != asdict(result.spec):
+            regressions.append(f"{result.spec.name}: the scene differs from the baseline's, run it again with --save-baseline")
+            continue
+
+        for stage, stage_result in result.stages.items():
+            if stage not in base["stages"]: continue
+            seconds = base["stages"][stage]["seconds"]
+            if stage_result.seconds > seconds * (1.0 + tolerance) and stage_result.seconds - seconds > noise:
+                regressions.append(f"{result.spec.name}: {stage} took {stage_result.seconds:.3f} s, {seconds:.3f} s in the baseline")
+
+        if result.max_error > base["max_error"] + 1e-4:
+            regressions.append(f"{result.spec.name}: transfer error {result.max_error:.5f}, {base['max_error']:.5f} in the baseline")
+        if result.weight_count != base["weight_count"] or not math.isclose(result.weight_sum, base["weight_sum"], rel_tol=1e-4):
+            regressions.append(
+                f"{result.spec.name}: the dressed weights changed ({result.weight_count} weights summing to {result.weight_sum:.3f}, "
+                f"{base['weight_count']} summing to {base['weight_sum']:.3f} in the baseline)"
+            )
+    return regressions
+
+def print_result(result: SceneResult):
+    spec = result.spec
+    print(f"{spec.name}: {spec.bones} bones, body {spec.body_vertices} vertices, garment {spec.garment_vertices} vertices")
+    for stage, stage_result in result.stages.items():
+        peak = f"{stage_result.peak_mb:9.1f} MB" if stage_result.peak_mb > 0 else ""
+        print(f"    {stage:<48} {stage_result.seconds:9.3f} s {peak}")
+    print(f"    transfer error max {result.max_error:.5f} mean {result.mean_error:.6f}, process peak {result.max_rss_mb:.0f} MB")
+
+
+def script_arguments() -> list[str]:
+    """Arguments after `--` on the Blender command line."""
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="blender -b -P Benchmark.py --", description="Benchmark every Dress Up stage on synthetic scenes.")
+    parser.add_argument("--scenes", default="small,medium", help=f"comma separated scenes out of {', '.join(SCENES)}")
+    parser.add_argument("--baseline", help="compare with the results stored in this JSON file")
+    parser.add_argument("--save-baseline", help="store the results as a baseline in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown of a stage counted as a regression")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenes.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENES]
+    if len(unknown):
+        parser.error(f"unknown scenes: {', '.join(unknown)}")
+
+    results = []
+    for name in names:
+        result = run_scene(SCENES[name])
+        print_result(result)
+        results.append(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(to_json(results), file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if len(regressions) else 0
+    return 0
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+
+import bpy
+import zlib
+import hashlib
+import numpy as np
+
+from .SurfaceTransfer import SourceSurface
+from .VertexCleaner import read_deform_weights
+from .MemoryBudget import BatchReport
+
+# custom property holding the fingerprint of the last dress up of an object
+FINGERPRINT_PROPERTY = "kiseru_fingerprint"
+# point attribute holding the vertex positions the weights were last computed at.
+# Being an attribute it follows the vertices through edits: extruded vertices copy it, deleted ones drop it.
+REST_POSITION_ATTRIBUTE = "kiseru_rest_position"
+# distance a vertex has to move before its weights are refreshed
+MOVE_TOLERANCE = 1e-5
+
+def mesh_fingerprint(obj: bpy.types.Object) -> tuple:
+    """Element counts, checksums of the coordinates and of the face topology, and the world matrix of the object."""
+    mesh = obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    matrix = tuple(value for row in obj.matrix_world for value in row)
+    return (len(mesh.vertices), len(mesh.edges), len(mesh.polygons), zlib.crc32(coords.tobytes()), zlib.crc32(loops.tobytes()), matrix)
+
+def source_fingerprint(source_obj: bpy.types.Object, surface: SourceSurface) -> tuple:
+    """Geometry and deform weights of the source body, taken from its surface rather than read from the body again.
+    The surface holds the evaluated world coordinates, so the pose, shape keys and modifiers count."""
+    geometry_crc = zlib.crc32(surface.coords.tobytes(), zlib.crc32(surface.triangles.tobytes()))
+    weights_crc = zlib.crc32(surface.weights.tobytes(), zlib.crc32(surface.groups.tobytes(), zlib.crc32(surface.indptr.tobytes())))
+    return (source_obj.name_full, (len(surface.coords), geometry_crc), tuple(surface.group_names), weights_crc)
+
+def dress_fingerprint(target_obj: bpy.types.Object, source: tuple, options: tuple) -> str:
+    return hashlib.sha1(repr((mesh_fingerprint(target_obj), source, options)).encode()).hexdigest()
+
+def is_unchanged(target_obj: bpy.types.Object, armature: bpy.types.Object, source: tuple, options: tuple) -> bool:
+    """True when the object is still dressed on the armature and neither it, the source nor the options changed since."""
+    stored = target_obj.get(FINGERPRINT_PROPERTY)
+    if stored is None or target_obj.parent != armature: return False
+    if not any(modifier.type == "ARMATURE" and modifier.object == armature for modifier in target_obj.modifiers): return False
+    return stored == dress_fingerprint(target_obj, source, options)
+
+def store_fingerprint(target_obj: bpy.types.Object, source: tuple | None, options: tuple):
+    """Without a source fingerprint, forced dress ups do not compute one, only drop the outdated fingerprint."""
+    if source is None:
+        forget_fingerprint(target_obj)
+        return
+    target_obj[FINGERPRINT_PROPERTY] = dress_fingerprint(target_obj, source, options)
+
+def forget_fingerprint(target_obj: bpy.types.Object):
+    if FINGERPRINT_PROPERTY in target_obj:
+        del target_obj[FINGERPRINT_PROPERTY]
+
+def clear_fingerprint(target_obj: bpy.types.Object):
+    forget_fingerprint(target_obj)
+    mesh = target_obj.data
+    if isinstance(mesh, bpy.types.Mesh) and REST_POSITION_ATTRIBUTE in mesh.attributes:
+        mesh.attributes.remove(mesh.attributes[REST_POSITION_ATTRIBUTE])
+
+
+def store_rest_positions(target_obj: bpy.types.Object):
+    """Snapshot the current vertex positions as the ones the weights belong to."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    attribute = mesh.attributes.get(REST_POSITION_ATTRIBUTE)
+    if attribute is None:
+        attribute = mesh.attributes.new(REST_POSITION_ATTRIBUTE, "FLOAT_VECTOR", "POINT")
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    attribute.data.foreach_set("vector", coords) # type: ignore
+
+def moved_vertices(target_obj: bpy.types.Object, tolerance: float = MOVE_TOLERANCE) -> np.ndarray:
+    """Indices of the vertices moved since the snapshot or added without weights. Every vertex without a snapshot."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    attribute = mesh.attributes.get(REST_POSITION_ATTRIBUTE)
+    if attribute is None:
+        return np.arange(len(mesh.vertices), dtype=np.int64)
+
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    rest = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    attribute.data.foreach_get("vector", rest) # type: ignore
+    moved = np.linalg.norm((coords - rest).reshape(-1, 3), axis=1) > tolerance
+
+    vertices, _, _ = read_deform_weights(mesh)
+    unweighted = np.ones(len(mesh.vertices), dtype=bool)
+    unweighted[vertices] = False
+    return np.flatnonzero(moved | unweighted)
+
+
+@dataclass
+class ChangeReport:
+    """Names of the objects skipped because nothing changed, of the objects dressed again and of those whose weights
+    were loaded from the library, how many influences the limits removed from them and the batches they were dressed in."""
+    skipped: list[str] = field(default_factory=list)
+    recomputed: list[str] = field(default_factory=list)
+    loaded: list[str] = field(default_factory=list)
+    pruned_influences: int = 0
+    batches: list[BatchReport] = field(default_factory=list)
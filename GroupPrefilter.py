@@ -0,0 +1,49 @@
+import bpy
+import numpy as np
+
+from .SurfaceTransfer import SourceSurface, world_coordinates, expand_ranges
+from .VertexCleaner import flip_vertex_group_name
+
+def relevant_group_indices(surface: SourceSurface, target_obj: bpy.types.Object, tolerance: float, exact: bool = True) -> np.ndarray | None:
+    """Indices of the source groups weighting any body polygon that overlaps the target's bounding box grown by
+    `tolerance`, or by the largest distance of a target vertex to the body when that is further. Every target vertex
+    interpolates from its nearest polygon, which then overlaps the box, so no group it would get is left out.
+    Without `exact` the distances are not measured, which only estimates the groups of targets further than `tolerance`.
+    Returns None when no polygon overlaps the box, then no group can be ruled out."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    if len(mesh.vertices) == 0 or len(surface.polygon_starts) == 0: return None
+
+    points = world_coordinates(mesh, target_obj.matrix_world)
+    if exact:
+        find_nearest = surface.bvh.find_nearest
+        distances = [hit[3] for hit in map(find_nearest, points.tolist()) if hit[3] is not None]
+        # a little over the distance, the hits are computed in single precision
+        tolerance = max(tolerance, max(distances, default=0.0) * (1 + 1e-5) + 1e-6)
+    lower = points.min(axis=0) - tolerance
+    upper = points.max(axis=0) + tolerance
+
+    corners = surface.coords[surface.loop_vertices]
+    polygon_lower = np.minimum.reduceat(corners, surface.polygon_starts, axis=0)
+    polygon_upper = np.maximum.reduceat(corners, surface.polygon_starts, axis=0)
+    overlapping = np.all((polygon_lower <= upper) & (polygon_upper >= lower), axis=1)
+    if not overlapping.any(): return None
+
+    vertices = np.unique(surface.loop_vertices[expand_ranges(surface.polygon_starts[overlapping], surface.polygon_sides[overlapping])])
+    entries = expand_ranges(surface.indptr[vertices], np.diff(surface.indptr)[vertices])
+    return np.unique(surface.groups[entries][surface.weights[entries] > 0])
+
+def relevant_group_names(surface: SourceSurface, target_obj: bpy.types.Object, tolerance: float, pairs: dict[str, str] | None = None) -> list[str] | None:
+    """Names of the relevant groups and of their L/R counterparts in the source group order,
+    i.e. the groups the unused-group cleanup would keep after transferring every group."""
+    indices = relevant_group_indices(surface, target_obj, tolerance)
+    if indices is None: return None
+    if pairs is None: pairs = {}
+
+    names = {surface.group_names[index] for index in indices.tolist() if index < len(surface.group_names)}
+    for name in list(names):
+        flip_name = pairs[name] if name in pairs else flip_vertex_group_name(name)
+        if flip_name is not None:
+            names.add(flip_name)
+
+    return [name for name in surface.group_names if name in names]
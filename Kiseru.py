@@ -11,9 +11,19 @@ bl_info = {
 
 import bpy
 import time
-from .VertexCleaner import cleanup_all_unused_vertex, cleanup_all_vertex
-from .WeightTransfer import apply_cloth, unapply_cloth, find_armature, ClothApplyOptions, applicable_meshes
+from bpy_extras.io_utils import ExportHelper
+from . import Profiler
+from .Profiler import StageProfiler
 from .Localize import localize
+from .auto_load import lazy_import
+
+# the weight modules pull in numpy and build BVH trees, they load on the first use instead of on registration
+VertexCleaner = lazy_import(".VertexCleaner", __package__)
+Fingerprint = lazy_import(".Fingerprint", __package__)
+WeightLimit = lazy_import(".WeightLimit", __package__)
+WeightLibrary = lazy_import(".WeightLibrary", __package__)
+WeightSnapshot = lazy_import(".WeightSnapshot", __package__)
+WeightTransfer = lazy_import(".WeightTransfer", __package__)
 
 class MY_PT_ui(bpy.types.Panel):  
     bl_label = "Kiseru"
@@ -25,15 +35,60 @@ class MY_PT_ui(bpy.types.Panel):
         self.layout.label(text=localize("Cloth"))
 
         self.layout.prop(context.scene.panel_input, "smooth", slider=True)  # type: ignore
+        self.layout.prop(context.scene.panel_input, "smooth_per_group")  # type: ignore
         self.layout.prop(context.scene.panel_input, "auto_clean")  # type: ignore
         self.layout.prop(context.scene.panel_input, "apply_transform")  # type: ignore
+        self.layout.prop(context.scene.panel_input, "transfer_engine")  # type: ignore
+        self.layout.prop(context.scene.panel_input, "force_redress")  # type: ignore
+        if context.scene.panel_input.transfer_engine == "NATIVE": # type: ignore
+            self.layout.prop(context.scene.panel_input, "symmetric")  # type: ignore
+            self.layout.prop(context.scene.panel_input, "workers")  # type: ignore
+            row = self.layout.row()
+            row.prop(context.scene.panel_input, "layered")  # type: ignore
+            if context.scene.panel_input.layered: # type: ignore
+                row.prop(context.scene.panel_input, "layer_offset")  # type: ignore
+                box = self.layout.box()
+                box.label(text=localize("Layers"))
+                for obj in WeightTransfer.applicable_meshes(context.selected_objects):
+                    if obj == context.active_object: continue
+                    box.prop(obj, "kiseru_layer", text=obj.name)
+        self.layout.prop(context.scene.panel_input, "library_path")  # type: ignore
+        self.layout.prop(context.scene.panel_input, "memory_budget")  # type: ignore
+        if context.scene.panel_input.transfer_engine == "OPERATOR" and context.scene.panel_input.auto_clean: # type: ignore
+            row = self.layout.row()
+            row.prop(context.scene.panel_input, "prefilter")  # type: ignore
+            row.prop(context.scene.panel_input, "prefilter_tolerance")  # type: ignore
+
+        box = self.layout.box()
+        box.label(text=localize("Influences"))
+        box.prop(context.scene.panel_input, "max_influences")  # type: ignore
+        box.prop(context.scene.panel_input, "weight_threshold")  # type: ignore
+        box.prop(context.scene.panel_input, "normalize_weights")  # type: ignore
+        box.prop(context.scene.panel_input, "quantize_weights")  # type: ignore
 
         if len(context.scene.processing): # type: ignore
-            self.layout.label(text=localize(context.scene.processing)) # type: ignore
+            message = localize(context.scene.processing) # type: ignore
+            if hasattr(self.layout, "progress"):
+                self.layout.progress(factor=context.scene.processing_progress, type="BAR", text=message) # type: ignore
+            else:
+                self.layout.label(text=f"{message} ({context.scene.processing_progress:.0%})") # type: ignore
+            self.layout.label(text=localize("Press Esc to cancel"))
         
         row = self.layout.row()
         row.operator(OBJECT_OT_apply_cloth.bl_idname, icon="MOD_CLOTH")
         row.operator(OBJECT_OT_unapply_cloth.bl_idname, icon="MOD_CLOTH")
+        row = self.layout.row()
+        row.operator(OBJECT_OT_refresh_weights.bl_idname, icon="FILE_REFRESH")
+        row.operator(OBJECT_OT_redress_from_snapshot.bl_idname, icon="RECOVER_LAST")
+        self.layout.operator(OBJECT_OT_dress_variants.bl_idname, icon="DUPLICATE")
+
+        profile = Profiler.last_profile
+        if profile is not None and len(profile.records) and not len(context.scene.processing): # type: ignore
+            box = self.layout.box()
+            box.label(text=f"{localize('Last Run')}: {profile.total_seconds:.2f} s", icon="TIME")
+            for stage, seconds in profile.stage_totals():
+                box.label(text=f"{localize(stage)}: {seconds:.2f} s")
+            box.operator(OBJECT_OT_export_profile.bl_idname, icon="EXPORT")
 
         self.layout.separator()
         self.layout.label(text=localize("Vertex Groups"))
@@ -42,28 +97,31 @@ class MY_PT_ui(bpy.types.Panel):
         row.operator(OBJECT_OT_remove_all_vertex_groups.bl_idname, icon="TRASH")
         row.operator(OBJECT_OT_remove_all_ununsed_vertex_groups.bl_idname, icon="BRUSH_DATA")
 
+def influence_limits(panel_input) -> "WeightLimit.InfluenceLimits":
+    return WeightLimit.InfluenceLimits(
+        panel_input.max_influences,
+        panel_input.weight_threshold,
+        panel_input.normalize_weights,
+        int(panel_input.quantize_weights)
+    )
+
 def update_progress_message(message: str|None):
     bpy.context.scene.processing = message or "" # type: ignore
-    bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
-
-def apply_cloth_handler(context):
-    try:
-        target_objs = applicable_meshes(bpy.context.selected_objects[1:])
-        if len(target_objs) < 1:
-            print(localize("All selected objects are not applicable."))
-            return None
-        scene = bpy.context.scene
-        smooth_factor = scene.panel_input.smooth # type: ignore
-        cleanup = scene.panel_input.auto_clean # type: ignore
-        apply_transform = scene.panel_input.apply_transform # type: ignore
 
-        options = ClothApplyOptions(smooth_factor, cleanup, apply_transform, update_progress_message)
+def objects_removed(objects) -> bool:
+    """Whether any of the objects was deleted, which leaves its Python reference dangling."""
+    for obj in objects:
+        try:
+            obj.name
+        except ReferenceError:
+            return True
+    return False
 
-        if not apply_cloth(bpy.context.active_object, target_objs, options):
-            print("Error")
-    finally:
-        # update panel
-        update_progress_message(None)
+def redraw_sidebars(context):
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
 
 
 class OBJECT_OT_apply_cloth(bpy.types.Operator):
@@ -73,20 +131,162 @@ Last selected mesh will be the source of weight"""
     bl_label = localize("Dress Up")
     bl_options = {'REGISTER', 'UNDO'}
 
+    # seconds of work done per timer tick, the rest of the tick is left to the UI
+    time_budget = 0.1
+    # minimum seconds between two redraws of the progress
+    redraw_interval = 0.25
+    # events left to Blender while dressing up: view navigation, hovering and the window. Every other event, undo,
+    # redo and delete among them, is consumed, since the running steps keep references to the dressed objects
+    passed_events = {
+        'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'WHEELINMOUSE', 'WHEELOUTMOUSE',
+        'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEROTATE', 'MOUSESMARTZOOM', 'NDOF_MOTION', 'WINDOW_DEACTIVATE',
+        'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_2', 'NUMPAD_3', 'NUMPAD_4', 'NUMPAD_5', 'NUMPAD_6', 'NUMPAD_7', 'NUMPAD_8',
+        'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_PLUS', 'NUMPAD_MINUS', 'TIMER_REPORT', 'TIMERREGION',
+    }
+
     @classmethod
     def poll(cls, context):
         if context.active_object is None: return False
         if len(bpy.context.selected_objects) < 2: return False
-        if find_armature(bpy.context.active_object) is None: return False
+        if WeightTransfer.find_armature(bpy.context.active_object) is None: return False
         return True
 
     def execute(self, context): 
+        target_objs = WeightTransfer.applicable_meshes(context.selected_objects[1:])
+        if len(target_objs) < 1:
+            print(localize("All selected objects are not applicable."))
+            return {'CANCELLED'}
+
+        scene = context.scene
+        smooth_factor = scene.panel_input.smooth # type: ignore
+        cleanup = scene.panel_input.auto_clean # type: ignore
+        apply_transform = scene.panel_input.apply_transform # type: ignore
+        transfer_engine = scene.panel_input.transfer_engine # type: ignore
+        force = scene.panel_input.force_redress # type: ignore
+        prefilter = scene.panel_input.prefilter # type: ignore
+        prefilter_tolerance = scene.panel_input.prefilter_tolerance # type: ignore
+        limits = influence_limits(scene.panel_input) # type: ignore
+        symmetric = scene.panel_input.symmetric # type: ignore
+        workers = scene.panel_input.workers # type: ignore
+        layered = scene.panel_input.layered # type: ignore
+        layer_offset = scene.panel_input.layer_offset # type: ignore
+        memory_budget = scene.panel_input.memory_budget # type: ignore
+        smooth_per_group = scene.panel_input.smooth_per_group # type: ignore
+        library = WeightLibrary.WeightLibrary(scene.panel_input.library_path) if scene.panel_input.library_path else None # type: ignore
+
+        Profiler.last_profile = StageProfiler()
+        self.change_report = Fingerprint.ChangeReport()
+        options = WeightTransfer.ClothApplyOptions(
+            smooth_factor, cleanup, apply_transform, update_progress_message, transfer_engine, Profiler.last_profile,
+            force, self.change_report, prefilter, prefilter_tolerance, limits, symmetric, library, workers,
+            layered, layer_offset, memory_budget, smooth_per_group
+        )
+
+        self.target_objs = target_objs
+        # in background mode there is no event loop to spread the work over
+        if bpy.app.background or context.window is None:
+            if WeightTransfer.apply_cloth(context.active_object, target_objs, options):
+                self.select_dressed(context)
+            else:
+                print("Error")
+            update_progress_message(None)
+            self.report_changes()
+            return {'FINISHED'}
+
+        self.steps = WeightTransfer.apply_cloth_steps(context.active_object, target_objs, options)
+        self.objects = [context.active_object, WeightTransfer.find_armature(context.active_object)] + target_objs
+        self.last_redraw = 0.0
+        scene.processing_progress = 0.0 # type: ignore
         update_progress_message(localize("Dressing up..."))
-        
-        bpy.app.timers.register(lambda: apply_cloth_handler(bpy.context), first_interval=0.001)
+
+        wm = context.window_manager
+        wm.progress_begin(0, 1)
+        self.timer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.steps.close()
+            self.finish(context)
+            self.report({'WARNING'}, localize("Dress up cancelled"))
+            # keep what is already done undoable
+            return {'FINISHED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'} if event.type in self.passed_events else {'RUNNING_MODAL'}
+
+        # deleted by a script or another add-on in between two ticks
+        if objects_removed(self.objects):
+            self.steps.close()
+            self.finish(context)
+            self.report({'ERROR'}, localize("Dressed objects were removed, dress up cancelled"))
+            return {'CANCELLED'}
+
+        deadline = time.perf_counter() + self.time_budget
+        try:
+            while time.perf_counter() < deadline:
+                progress = next(self.steps)
+                update_progress_message(progress.message)
+                context.scene.processing_progress = progress.factor # type: ignore
+                # other processes are working, leave the rest of the tick to the UI
+                if progress.waiting: break
+        except StopIteration as stop:
+            self.finish(context)
+            if stop.value:
+                self.select_dressed(context)
+            else:
+                print("Error")
+            self.report_changes()
+            return {'FINISHED'}
+        except Exception:
+            self.finish(context)
+            raise
+
+        context.window_manager.progress_update(context.scene.processing_progress) # type: ignore
+        now = time.perf_counter()
+        if now - self.last_redraw >= self.redraw_interval:
+            self.last_redraw = now
+            redraw_sidebars(context)
 
         return {'PASS_THROUGH'}
 
+    def finish(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        # update panel
+        update_progress_message(None)
+        redraw_sidebars(context)
+
+    def select_dressed(self, context):
+        # leave the garments selected without the body, the dressing itself does not touch the selection
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for obj in self.target_objs:
+            obj.select_set(True)
+
+    def report_changes(self):
+        skipped, recomputed = len(self.change_report.skipped), len(self.change_report.recomputed)
+        messages = []
+        if skipped > 0:
+            for name in self.change_report.skipped:
+                print(f"{name}: unchanged, skipped")
+            messages.append(localize("Skipped {skipped} unchanged, dressed {recomputed}").format(skipped=skipped, recomputed=recomputed))
+        if len(self.change_report.loaded):
+            messages.append(localize("Loaded {loaded} from the library").format(loaded=len(self.change_report.loaded)))
+        if self.change_report.pruned_influences > 0:
+            messages.append(localize("Pruned {pruned} influences").format(pruned=self.change_report.pruned_influences))
+        if len(self.change_report.batches):
+            for i, batch in enumerate(self.change_report.batches):
+                peak = f"{batch.peak_mb:.0f} MB" if batch.peak_mb is not None else "unknown"
+                print(f"Batch {i+1}: {len(batch.garments)} garments, estimated {batch.estimated_mb:.0f} MB, peak {peak}, {batch.seconds:.2f} s")
+            peaks = [batch.peak_mb for batch in self.change_report.batches if batch.peak_mb is not None]
+            messages.append(localize("Dressed in {batches} batches, peak {peak:.0f} MB").format(batches=len(self.change_report.batches), peak=max(peaks, default=0.0)))
+        if len(messages):
+            self.report({'INFO'}, ", ".join(messages))
+
 
 class OBJECT_OT_unapply_cloth(bpy.types.Operator):
     """Undress all selected objects. Do not select body mesh"""
@@ -106,8 +306,98 @@ class OBJECT_OT_unapply_cloth(bpy.types.Operator):
 
     def execute(self, context): 
         for obj in bpy.context.selected_objects:
-            unapply_cloth(obj)
+            WeightTransfer.unapply_cloth(obj)
+
+        return {'FINISHED'}
+
+class OBJECT_OT_refresh_weights(bpy.types.Operator):
+    """Recompute the weights of only the vertices moved or added since the last dress up.
+Active mesh is the source of weight"""
+    bl_idname = "mesh.refresh_cloth_weights"
+    bl_label = localize("Refresh Weights")
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        if context.active_object is None: return False
+        if len(bpy.context.selected_objects) < 2: return False
+        if WeightTransfer.find_armature(bpy.context.active_object) is None: return False
+        return True
+
+    def execute(self, context):
+        source_obj = context.active_object
+        armature = WeightTransfer.find_armature(source_obj)
+        target_objs = [
+            obj for obj in WeightTransfer.applicable_meshes(context.selected_objects)
+            if obj != source_obj and obj.parent == armature
+        ]
+        if len(target_objs) < 1: return {'CANCELLED'}
+
+        scene = context.scene
+        Profiler.last_profile = StageProfiler()
+        options = WeightTransfer.ClothApplyOptions(
+            scene.panel_input.smooth, scene.panel_input.auto_clean, False, update_progress_message, # type: ignore
+            "NATIVE", Profiler.last_profile, limits=influence_limits(scene.panel_input), # type: ignore
+            smooth_per_group=scene.panel_input.smooth_per_group # type: ignore
+        )
+
+        refreshed = 0
+        for target_obj in target_objs:
+            refreshed += WeightTransfer.refresh_weights(source_obj, target_obj, options)
+
+        self.report({'INFO'}, localize("Refreshed {vertices} vertices of {objects} objects").format(vertices=refreshed, objects=len(target_objs)))
+        return {'FINISHED'}
+
+class OBJECT_OT_redress_from_snapshot(bpy.types.Operator):
+    """Dress up the selected objects again with the weights they had when undressed"""
+    bl_idname = "mesh.redress_from_snapshot"
+    bl_label = localize("Re-dress from Snapshot")
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return any(WeightSnapshot.has_weight_snapshot(obj) for obj in context.selected_objects)
+
+    def execute(self, context):
+        objs = [obj for obj in context.selected_objects if WeightSnapshot.has_weight_snapshot(obj)]
+        dressed = WeightTransfer.redress_from_snapshot(objs)
+
+        for obj in objs:
+            if obj not in dressed:
+                print(f"{obj.name}: the snapshot is outdated or its armature is gone, dress up again instead")
+        self.report({'INFO'} if len(dressed) == len(objs) else {'WARNING'}, localize("Re-dressed {dressed} of {total} objects").format(dressed=len(dressed), total=len(objs)))
+        return {'FINISHED'}
+
+class OBJECT_OT_dress_variants(bpy.types.Operator):
+    """Dress a copy of the active garment on every selected body.
+The bodies have to share the same armature layout"""
+    bl_idname = "mesh.dress_variants"
+    bl_label = localize("Dress Variants")
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        if context.active_object is None or context.active_object.type != "MESH": return False
+        return any(obj != context.active_object and WeightTransfer.find_armature(obj) is not None for obj in WeightTransfer.applicable_meshes(context.selected_objects))
 
+    def execute(self, context):
+        garment = context.active_object
+        bodies = [obj for obj in WeightTransfer.applicable_meshes(context.selected_objects) if obj != garment and WeightTransfer.find_armature(obj) is not None]
+
+        scene = context.scene
+        Profiler.last_profile = StageProfiler()
+        options = WeightTransfer.ClothApplyOptions(
+            scene.panel_input.smooth, scene.panel_input.auto_clean, scene.panel_input.apply_transform, update_progress_message, # type: ignore
+            "NATIVE", Profiler.last_profile, limits=influence_limits(scene.panel_input), # type: ignore
+            smooth_per_group=scene.panel_input.smooth_per_group # type: ignore
+        )
+        results = WeightTransfer.dress_variants(garment, bodies, options)
+        update_progress_message(None)
+
+        for result in results:
+            print(f"{result.garment.name}: dressed on {result.body} in {result.seconds:.2f} s")
+        seconds = sum(result.seconds for result in results)
+        self.report({'INFO'}, localize("Dressed {garments} variants in {seconds:.2f} s").format(garments=len(results), seconds=seconds))
         return {'FINISHED'}
 
 class OBJECT_OT_remove_all_vertex_groups(bpy.types.Operator):
@@ -123,7 +413,8 @@ class OBJECT_OT_remove_all_vertex_groups(bpy.types.Operator):
 
     def execute(self, context): 
         if len(bpy.context.selected_objects) < 1: return {'CANCELLED'}
-        cleanup_all_vertex(bpy.context.selected_objects)
+        Profiler.last_profile = StageProfiler()
+        VertexCleaner.cleanup_all_vertex(bpy.context.selected_objects, Profiler.last_profile)
 
         return {'FINISHED'}
     
@@ -139,18 +430,49 @@ class OBJECT_OT_remove_all_ununsed_vertex_groups(bpy.types.Operator):
 
     def execute(self, context): 
         if len(bpy.context.selected_objects) < 1: return {'CANCELLED'}
-        cleanup_all_unused_vertex(bpy.context.selected_objects)
+        Profiler.last_profile = StageProfiler()
+        timings = VertexCleaner.cleanup_all_unused_vertex(bpy.context.selected_objects, Profiler.last_profile)
+
+        for timing in timings:
+            print(f"{timing.object_name}: kept {timing.kept}, removed {timing.removed} ({timing.seconds * 1000:.1f} ms)")
+        removed = sum(timing.removed for timing in timings)
+        seconds = sum(timing.seconds for timing in timings)
+        self.report({'INFO'}, f"Removed {removed} vertex groups from {len(timings)} objects ({seconds:.2f} s)")
         
         return {'FINISHED'}
 
+class OBJECT_OT_export_profile(bpy.types.Operator, ExportHelper):
+    """Export the timings of the last run as JSON"""
+    bl_idname = "mesh.export_kiseru_profile"
+    bl_label = localize("Export Timings")
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'}) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return Profiler.last_profile is not None
+
+    def execute(self, context):
+        with open(self.filepath, "w", encoding="utf-8") as file:
+            file.write(Profiler.last_profile.to_json()) # type: ignore
+
+        return {'FINISHED'}
+
 class PanelInputsProps(bpy.types.PropertyGroup):
     smooth: bpy.props.FloatProperty( # type: ignore
         name="Smooth",
-        description="How much to smooth the weight",
+        description="How much to smooth the weight, in one pass over all vertex groups",
         default=0.1,
         min=0,
         max=1
     )
+
+    smooth_per_group: bpy.props.BoolProperty( # type: ignore
+        name=localize("Smooth Each Group"),
+        description="Smooth once per vertex group, as earlier versions did. Much stronger and slower than one pass",
+        default=False
+    )
     
     auto_clean: bpy.props.BoolProperty( # type: ignore
         name=localize("Auto Clean Vertex Groups"),
@@ -164,11 +486,126 @@ class PanelInputsProps(bpy.types.PropertyGroup):
         default=False
     )
 
+    transfer_engine: bpy.props.EnumProperty( # type: ignore
+        name=localize("Transfer Engine"),
+        description="How to transfer the weights from the body",
+        items=[
+            ("OPERATOR", localize("Data Transfer"), "Use the Data Transfer operator"),
+            ("NATIVE", localize("Native"), "Interpolate the weights on the nearest body surface without operators"),
+        ],
+        default="OPERATOR"
+    )
+
+    prefilter: bpy.props.BoolProperty( # type: ignore
+        name=localize("Prefilter Vertex Groups"),
+        description="Transfer only the vertex groups weighting the body near each object",
+        default=False
+    )
+
+    prefilter_tolerance: bpy.props.FloatProperty( # type: ignore
+        name=localize("Tolerance"),
+        description="Distance around the cloth searched for vertex groups, grown to the furthest vertex of the cloth from the body",
+        default=0.1,
+        min=0,
+        subtype="DISTANCE"
+    )
+
+    max_influences: bpy.props.IntProperty( # type: ignore
+        name=localize("Max Influences"),
+        description="Most vertex groups weighting one vertex. 0 for no limit",
+        default=0,
+        min=0,
+        max=32
+    )
+
+    weight_threshold: bpy.props.FloatProperty( # type: ignore
+        name=localize("Weight Threshold"),
+        description="Remove weights below this value",
+        default=0.0,
+        min=0,
+        max=1
+    )
+
+    normalize_weights: bpy.props.BoolProperty( # type: ignore
+        name=localize("Normalize"),
+        description="Make the weights of every vertex sum to 1",
+        default=False
+    )
+
+    quantize_weights: bpy.props.EnumProperty( # type: ignore
+        name=localize("Quantize"),
+        description="Round the weights to the precision of the export format",
+        items=[
+            ("0", localize("None"), "Keep the weights as they are"),
+            ("8", "8 bit", "Round the weights to steps of 1/255"),
+            ("16", "16 bit", "Round the weights to steps of 1/65535"),
+        ],
+        default="0"
+    )
+
+    symmetric: bpy.props.BoolProperty( # type: ignore
+        name=localize("Symmetric"),
+        description="Compute the weights of one half of symmetric clothes and mirror them to the other half",
+        default=False
+    )
+
+    workers: bpy.props.IntProperty( # type: ignore
+        name=localize("Worker Processes"),
+        description="Compute the weights in this many background Blender processes. 0 or 1 computes them in Blender itself",
+        default=0,
+        min=0,
+        max=64
+    )
+
+    layered: bpy.props.BoolProperty( # type: ignore
+        name=localize("Layered"),
+        description="Dress the garments of higher layers from the body and the garments of lower layers",
+        default=False
+    )
+
+    layer_offset: bpy.props.FloatProperty( # type: ignore
+        name=localize("Layer Offset"),
+        description="Distance by which every layer is preferred over the layer below it",
+        default=0.0,
+        min=0,
+        subtype="DISTANCE"
+    )
+
+    memory_budget: bpy.props.IntProperty( # type: ignore
+        name=localize("Memory Budget (MB)"),
+        description="Dress the objects in batches whose estimated memory fits this budget. 0 dresses them all at once",
+        default=0,
+        min=0
+    )
+
+    library_path: bpy.props.StringProperty( # type: ignore
+        name=localize("Weight Library"),
+        description="Folder of precomputed weights. Garments found there are not transferred, the others are added to it",
+        default="",
+        subtype="DIR_PATH"
+    )
+
+    force_redress: bpy.props.BoolProperty( # type: ignore
+        name=localize("Force Re-dress"),
+        description="Dress up every selected object again, even those unchanged since their last dress up",
+        default=False
+    )
+
 
 def register():
     bpy.types.Scene.panel_input = bpy.props.PointerProperty(type=PanelInputsProps) # type: ignore
     bpy.types.Scene.processing = bpy.props.StringProperty(default="") # type: ignore
+    bpy.types.Scene.processing_progress = bpy.props.FloatProperty(default=0.0, min=0.0, max=1.0, subtype="FACTOR") # type: ignore
+    bpy.types.Object.kiseru_layer = bpy.props.IntProperty( # type: ignore
+        name=localize("Layer"),
+        description="Layer of the garment, 0 right on the body. Layered dress up weights garments from the body and the garments of lower layers",
+        default=0,
+        min=0,
+        max=32
+    )
 
 def unregister():
     del bpy.types.Scene.panel_input # type: ignore
     del bpy.types.Scene.processing # type: ignore
+    del bpy.types.Scene.processing_progress # type: ignore
+    del bpy.types.Object.kiseru_layer # type: ignore
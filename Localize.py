@@ -10,7 +10,62 @@ translation_dict = {
         "Auto Clean Vertex Groups": "Auto Clean Vertex Groups",
         "Apply Transform": "Apply Transform",
         "All selected objects are not applicable.": "All selected objects are not applicable. If you want to dress up again, please undress first.",
-        "Dressing up...": "Dressing up..."
+        "Dressing up...": "Dressing up...",
+        "Transfer Engine": "Transfer Engine",
+        "Data Transfer": "Data Transfer",
+        "Native": "Native",
+        "Press Esc to cancel": "Press Esc to cancel",
+        "Dress up cancelled": "Dress up cancelled",
+        "Dressed objects were removed, dress up cancelled": "Dressed objects were removed, dress up cancelled",
+        "Last Run": "Last Run",
+        "Export Timings": "Export Timings",
+        "Remove armature modifiers": "Remove armature modifiers",
+        "Apply transform": "Apply transform",
+        "Parent to armature": "Parent to armature",
+        "Build source surface": "Build source surface",
+        "Transfer weights": "Transfer weights",
+        "Smooth weights": "Smooth weights",
+        "Find used vertex groups": "Find used vertex groups",
+        "Remove unused vertex groups": "Remove unused vertex groups",
+        "Remove all vertex groups": "Remove all vertex groups",
+        "Force Re-dress": "Force Re-dress",
+        "Smooth Each Group": "Smooth Each Group",
+        "Skipped {skipped} unchanged, dressed {recomputed}": "Skipped {skipped} unchanged, dressed {recomputed}",
+        "Refresh Weights": "Refresh Weights",
+        "Find moved vertices": "Find moved vertices",
+        "Refreshed {vertices} vertices of {objects} objects": "Refreshed {vertices} vertices of {objects} objects",
+        "Prefilter Vertex Groups": "Prefilter Vertex Groups",
+        "Tolerance": "Tolerance",
+        "Prefilter vertex groups": "Prefilter vertex groups",
+        "Influences": "Influences",
+        "Max Influences": "Max Influences",
+        "Weight Threshold": "Weight Threshold",
+        "Normalize": "Normalize",
+        "Quantize": "Quantize",
+        "None": "None",
+        "Limit influences": "Limit influences",
+        "Pruned {pruned} influences": "Pruned {pruned} influences",
+        "Symmetric": "Symmetric",
+        "Re-dress from Snapshot": "Re-dress from Snapshot",
+        "Re-dressed {dressed} of {total} objects": "Re-dressed {dressed} of {total} objects",
+        "Weight Library": "Weight Library",
+        "Loaded {loaded} from the library": "Loaded {loaded} from the library",
+        "Load from library": "Load from library",
+        "Store in library": "Store in library",
+        "Worker Processes": "Worker Processes",
+        "Start workers": "Start workers",
+        "Collect worker results": "Collect worker results",
+        "Layered": "Layered",
+        "Layer Offset": "Layer Offset",
+        "Layers": "Layers",
+        "Layer": "Layer",
+        "Build layer surface": "Build layer surface",
+        "Dress Variants": "Dress Variants",
+        "Dressed {garments} variants in {seconds:.2f} s": "Dressed {garments} variants in {seconds:.2f} s",
+        "Prepare garment": "Prepare garment",
+        "Write weights": "Write weights",
+        "Memory Budget (MB)": "Memory Budget (MB)",
+        "Dressed in {batches} batches, peak {peak:.0f} MB": "Dressed in {batches} batches, peak {peak:.0f} MB"
     },
     "ja_JP": {
         "Dress Up": "着せる",
@@ -22,22 +77,76 @@ translation_dict = {
         "Auto Clean Vertex Groups": "必要な頂点グループのみを残す",
         "Apply Transform": "衣装のトランスフォームを適応",
         "All selected objects are not applicable.": "選択されたすべてのオブジェクトはすでに着せられています。もし、再度着せ直したい場合は、一度脱がせてください。",
-        "Dressing up...": "衣装を着せています..."
+        "Dressing up...": "衣装を着せています...",
+        "Transfer Engine": "ウェイト転送方式",
+        "Data Transfer": "データ転送",
+        "Native": "ネイティブ",
+        "Press Esc to cancel": "Escキーでキャンセル",
+        "Dress up cancelled": "着せるのをキャンセルしました",
+        "Dressed objects were removed, dress up cancelled": "着せるオブジェクトが削除されたため、キャンセルしました",
+        "Last Run": "前回の実行",
+        "Export Timings": "計測結果を書き出す",
+        "Remove armature modifiers": "アーマチュアモディファイアの削除",
+        "Apply transform": "トランスフォームの適用",
+        "Parent to armature": "アーマチュアへの親子付け",
+        "Build source surface": "転送元サーフェスの構築",
+        "Transfer weights": "ウェイト転送",
+        "Smooth weights": "ウェイトのスムーズ",
+        "Find used vertex groups": "使用中の頂点グループの検索",
+        "Remove unused vertex groups": "未使用の頂点グループの削除",
+        "Remove all vertex groups": "全頂点グループの削除",
+        "Force Re-dress": "変更がなくても着せ直す",
+        "Smooth Each Group": "グループごとにスムーズ",
+        "Skipped {skipped} unchanged, dressed {recomputed}": "変更のない{skipped}個をスキップし、{recomputed}個に着せました",
+        "Refresh Weights": "ウェイトを更新",
+        "Find moved vertices": "移動した頂点の検索",
+        "Refreshed {vertices} vertices of {objects} objects": "{objects}個のオブジェクトの{vertices}頂点のウェイトを更新しました",
+        "Prefilter Vertex Groups": "近くの頂点グループのみ転送",
+        "Tolerance": "許容距離",
+        "Prefilter vertex groups": "頂点グループの絞り込み",
+        "Influences": "影響数",
+        "Max Influences": "最大影響数",
+        "Weight Threshold": "ウェイトのしきい値",
+        "Normalize": "正規化",
+        "Quantize": "量子化",
+        "None": "なし",
+        "Limit influences": "影響数の制限",
+        "Pruned {pruned} influences": "{pruned}個の影響を削除しました",
+        "Symmetric": "左右対称",
+        "Re-dress from Snapshot": "スナップショットから着せ直す",
+        "Re-dressed {dressed} of {total} objects": "{total}個中{dressed}個のオブジェクトを着せ直しました",
+        "Weight Library": "ウェイトライブラリ",
+        "Loaded {loaded} from the library": "{loaded}個をライブラリから読み込みました",
+        "Load from library": "ライブラリから読み込み",
+        "Store in library": "ライブラリへ保存",
+        "Worker Processes": "ワーカープロセス数",
+        "Start workers": "ワーカーの起動",
+        "Collect worker results": "ワーカーの結果の取り込み",
+        "Layered": "重ね着",
+        "Layer Offset": "レイヤーのオフセット",
+        "Layers": "レイヤー",
+        "Layer": "レイヤー",
+        "Build layer surface": "レイヤーの面の構築",
+        "Dress Variants": "体型違いに着せる",
+        "Dressed {garments} variants in {seconds:.2f} s": "{garments} 体に着せました ({seconds:.2f} 秒)",
+        "Prepare garment": "衣装の準備",
+        "Write weights": "ウェイトの書き込み",
+        "Memory Budget (MB)": "メモリ予算 (MB)",
+        "Dressed in {batches} batches, peak {peak:.0f} MB": "{batches} 回に分けて着せました (最大 {peak:.0f} MB)"
     }
 }
 
-def __get_translation_table() -> dict[str, str]:
-    locale = bpy.app.translations.locale or "en_US"
-    if locale in translation_dict:
-        return translation_dict[locale]
-    else:
-        return translation_dict["en_US"]
+# translation tables resolved so far, keyed by locale
+translation_tables: dict[str, dict[str, str]] = {}
 
-translation_table: dict[str, str] = __get_translation_table()
+def translation_table(locale: str | None = None) -> dict[str, str]:
+    """Table of the current locale, or of `locale`. Strings missing from it fall back to English."""
+    locale = locale or bpy.app.translations.locale or "en_US"
+    table = translation_tables.get(locale)
+    if table is None:
+        table = {**translation_dict["en_US"], **translation_dict.get(locale, {})}
+        translation_tables[locale] = table
+    return table
 
 def localize(string: str) -> str:
-    if string in translation_table:
-        return translation_table[string]
-    else:
-        return string
-
+    return translation_table().get(string, string)
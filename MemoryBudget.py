@@ -0,0 +1,45 @@
+from typing import Sequence
+from dataclasses import dataclass
+
+import bpy
+
+from .SurfaceTransfer import SourceSurface
+from .GroupPrefilter import relevant_group_indices
+
+# bytes one vertex/group weight costs while a garment is dressed: the flat (vertex, group, weight) arrays read and
+# written by every stage, Blender's own deform weight and the garment's share of the dense smoothing matrix
+BYTES_PER_WEIGHT = 48
+
+@dataclass
+class BatchReport:
+    garments: list[str]
+    estimated_mb: float
+    # highest resident memory of the process seen while the batch ran, None where it cannot be read
+    peak_mb: float | None
+    seconds: float
+
+
+def expected_groups(target_obj: bpy.types.Object, source_group_count: int, surface: SourceSurface | None = None, tolerance: float = 0.1) -> int:
+    """Groups the target is expected to hold while it is dressed: every group of the source, like a data transfer
+    of all layers creates, or only those weighting the body near the target when its surface is given."""
+    if surface is not None:
+        relevant = relevant_group_indices(surface, target_obj, tolerance, exact=False)
+        if relevant is not None:
+            return max(1, len(relevant))
+    return max(1, source_group_count)
+
+def garment_cost(target_obj: bpy.types.Object, groups: int) -> int:
+    """Estimated bytes the garment takes while it is dressed with `groups` groups."""
+    return len(target_obj.data.vertices) * groups * BYTES_PER_WEIGHT # type: ignore
+
+def plan_batches(costs: Sequence[int], budget: int) -> list[list[int]]:
+    """Split the garments, in order, into batches whose costs fit the budget. A garment over the budget is a batch of its own."""
+    batches: list[list[int]] = []
+    batch_cost = 0
+    for index, cost in enumerate(costs):
+        if len(batches) == 0 or batch_cost + cost > budget:
+            batches.append([])
+            batch_cost = 0
+        batches[-1].append(index)
+        batch_cost += cost
+    return batches
@@ -0,0 +1,117 @@
+from typing import Sequence, Callable
+from dataclasses import dataclass, field, asdict
+from contextlib import contextmanager, nullcontext
+
+import bpy
+import os
+import json
+import time
+
+@dataclass
+class StageRecord:
+    stage: str
+    object_name: str | None
+    seconds: float
+    vertices: int
+    groups: int
+    operator_calls: int
+
+
+# functions called with every record as soon as it is recorded
+collectors: list[Callable[[StageRecord], None]] = []
+
+def add_collector(collector: Callable[[StageRecord], None]):
+    if collector not in collectors:
+        collectors.append(collector)
+
+def remove_collector(collector: Callable[[StageRecord], None]):
+    if collector in collectors:
+        collectors.remove(collector)
+
+
+@contextmanager
+def count_operator_calls():
+    """Count the bpy.ops calls made inside the block. The counter stays at -1 if they cannot be intercepted."""
+    counter = [0]
+    ops = bpy.ops
+    original = getattr(ops, "_op_call", None)
+    if original is None:
+        counter[0] = -1
+        yield counter
+        return
+
+    def counting_call(*args, **kwargs):
+        counter[0] += 1
+        return original(*args, **kwargs)
+
+    ops._op_call = counting_call # type: ignore
+    try:
+        yield counter
+    finally:
+        ops._op_call = original # type: ignore
+
+
+@dataclass
+class StageProfiler:
+    """Records the wall time, vertex and group counts and operator calls of every stage of a run."""
+    records: list[StageRecord] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, stage: str, objects: Sequence[bpy.types.Object] = ()):
+        """Record the block as one stage. With a single object the record is attributed to that object."""
+        start = time.perf_counter()
+        with count_operator_calls() as operator_calls:
+            yield
+        seconds = time.perf_counter() - start
+
+        meshes = [obj for obj in objects if isinstance(obj.data, bpy.types.Mesh)]
+        record = StageRecord(
+            stage,
+            objects[0].name if len(objects) == 1 else None,
+            seconds,
+            sum(len(obj.data.vertices) for obj in meshes), # type: ignore
+            sum(len(obj.vertex_groups) for obj in meshes),
+            operator_calls[0]
+        )
+        self.records.append(record)
+        for collector in collectors:
+            collector(record)
+
+    def stage_totals(self) -> list[tuple[str, float]]:
+        """Total seconds of every stage in the order the stages first ran."""
+        totals: dict[str, float] = {}
+        for record in self.records:
+            totals[record.stage] = totals.get(record.stage, 0.0) + record.seconds
+        return list(totals.items())
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(record.seconds for record in self.records)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "total_seconds": self.total_seconds,
+            "stages": [{"stage": stage, "seconds": seconds} for stage, seconds in self.stage_totals()],
+            "records": [asdict(record) for record in self.records],
+        }, indent=2)
+
+
+def resident_mb() -> float | None:
+    """Current resident memory of the process, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def profile_stage(profiler: StageProfiler | None, stage: str, objects: Sequence[bpy.types.Object] = ()):
+    """`profiler.stage(...)` when there is a profiler, otherwise a block that records nothing."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(stage, objects)
+
+
+# profile of the last run started from the panel
+last_profile: StageProfiler | None = None
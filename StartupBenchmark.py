@@ -0,0 +1,121 @@
+"""Benchmark of the add-on start: import, registration and the first Dress Up's lazy imports.
+
+    blender -b -P StartupBenchmark.py -- [--runs 5] [--write-manifest]
+
+Every run starts a fresh background Blender (or Python with the bpy module), once with the registration manifest and
+once with class discovery, and reports the median times and the add-on modules loaded by registration alone.
+bpy is imported before the clock starts, Blender has it loaded by the time add-ons register.
+The exit code is 1 when the manifest is older than the sources; `--write-manifest` regenerates it first.
+"""
+
+if __name__ == "__main__":
+    # started with `blender -b -P StartupBenchmark.py`: import the add-on as a package and run from there
+    import sys
+    import importlib
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    benchmark = importlib.import_module(Path(__file__).resolve().parent.name + ".StartupBenchmark")
+    sys.exit(benchmark.main(benchmark.script_arguments()))
+
+from typing import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import bpy
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+from . import auto_load
+
+# printed by the measured process in front of its JSON result, Blender writes its own lines to stdout too
+RESULT_MARKER = "KISERU_STARTUP "
+
+MEASURE_SCRIPT = """
+import sys, json, time, types, importlib
+import bpy
+sys.path.insert(0, {parent!r})
+start = time.perf_counter()
+addon = importlib.import_module({package!r})
+imported = time.perf_counter()
+addon.register()
+registered = time.perf_counter()
+# modules imported lazily but not used yet are still plain stubs
+modules = sorted(name for name, module in sys.modules.items() if name.startswith({package!r} + ".") and type(module) is types.ModuleType)
+importlib.import_module({package!r} + ".WeightTransfer").apply_cloth
+first_use = time.perf_counter()
+addon.unregister()
+print({marker!r} + json.dumps({{
+    "import": imported - start, "register": registered - imported, "first_use": first_use - registered, "modules": modules
+}}))
+"""
+
+@dataclass
+class StartupResult:
+    mode: str
+    import_seconds: float
+    register_seconds: float
+    first_use_seconds: float
+    modules: list[str]
+
+
+def measure_command(script: str) -> list[str]:
+    if bpy.app.binary_path:
+        return [bpy.app.binary_path, "--background", "--factory-startup", "--python-expr", script]
+    # the bpy module: a plain Python process
+    return [sys.executable, "-c", script]
+
+def measure_once(discovery: bool) -> dict:
+    directory = Path(__file__).resolve().parent
+    script = MEASURE_SCRIPT.format(parent=str(directory.parent), package=directory.name, marker=RESULT_MARKER)
+    environment = dict(os.environ)
+    environment.pop(auto_load.DISCOVERY_VARIABLE, None)
+    if discovery:
+        environment[auto_load.DISCOVERY_VARIABLE] = "1"
+    process = subprocess.run(measure_command(script), capture_output=True, text=True, env=environment)
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    error = process.stderr.strip().splitlines()[-1:] or [f"exit code {process.returncode}"]
+    raise RuntimeError(f"startup measurement failed: {error[0]}")
+
+def measure(mode: str, runs: int) -> StartupResult:
+    samples = [measure_once(mode == "discovery") for _ in range(runs)]
+    return StartupResult(
+        mode,
+        statistics.median(sample["import"] for sample in samples),
+        statistics.median(sample["register"] for sample in samples),
+        statistics.median(sample["first_use"] for sample in samples),
+        samples[-1]["modules"]
+    )
+
+def print_result(result: StartupResult):
+    print(f"{result.mode:<10} import {result.import_seconds * 1000:7.1f} ms  register {result.register_seconds * 1000:7.1f} ms  "
+          f"first use {result.first_use_seconds * 1000:7.1f} ms  {len(result.modules)} modules loaded")
+
+
+def script_arguments() -> list[str]:
+    """Arguments after `--` on the Blender command line."""
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="blender -b -P StartupBenchmark.py --", description="Benchmark the add-on start.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode, the median is reported")
+    parser.add_argument("--write-manifest", action="store_true", help="regenerate the registration manifest first")
+    args = parser.parse_args(argv)
+
+    if args.write_manifest:
+        manifest = auto_load.write_manifest()
+        print(f"wrote {auto_load.MANIFEST_NAME}: {len(manifest['classes'])} classes from {', '.join(manifest['modules'])}")
+
+    current = auto_load.is_manifest_current()
+    if not current:
+        print(f"{auto_load.MANIFEST_NAME} is missing or older than the sources, registration falls back to discovery")
+
+    for mode in ("manifest", "discovery"):
+        print_result(measure(mode, max(1, args.runs)))
+
+    return 0 if current else 1
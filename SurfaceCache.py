@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import bpy
+import zlib
+import numpy as np
+
+from .SurfaceTransfer import SourceSurface
+
+# mathutils does not expose the size of a BVH tree, this is roughly what one triangle costs in it
+BVH_BYTES_PER_TRIANGLE = 96
+
+def geometry_hash(source_obj: bpy.types.Object, depsgraph: bpy.types.Depsgraph) -> tuple:
+    """Cheap fingerprint of the geometry the surface is built from: element counts and a checksum of the coordinates
+    of the evaluated mesh, so shape keys, modifiers and the pose of the deforming armature count, and the world matrix."""
+    mesh = source_obj.evaluated_get(depsgraph).data
+    assert isinstance(mesh, bpy.types.Mesh)
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    matrix = tuple(value for row in source_obj.matrix_world for value in row)
+    return (len(mesh.vertices), len(mesh.polygons), len(mesh.loops), zlib.crc32(coords.tobytes()), matrix)
+
+def surface_bytes(surface: SourceSurface) -> int:
+    arrays = [
+        surface.coords, surface.triangles, surface.triangle_polygons, surface.polygon_starts,
+        surface.polygon_sides, surface.loop_vertices, surface.indptr, surface.groups, surface.weights
+    ]
+    return sum(array.nbytes for array in arrays) + len(surface.triangles) * BVH_BYTES_PER_TRIANGLE
+
+
+@dataclass
+class SurfaceCacheEntry:
+    mesh_pointer: int
+    geometry_hash: tuple
+    surface: SourceSurface
+    size: int
+
+
+class SurfaceCache:
+    """LRU cache of source surfaces (BVH tree and weights) keyed by source object, mesh data and a geometry hash.
+    Entries are evicted when there are more than `max_entries` or they take more than `max_bytes` together."""
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, SurfaceCacheEntry] = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries.values())
+
+    def get(self, source_obj: bpy.types.Object, depsgraph: bpy.types.Depsgraph) -> SourceSurface:
+        key = source_obj.name_full
+        mesh_pointer = source_obj.data.as_pointer()
+        fingerprint = geometry_hash(source_obj, depsgraph)
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.mesh_pointer == mesh_pointer and entry.geometry_hash == fingerprint:
+            self.entries.move_to_end(key)
+            return entry.surface
+
+        surface = SourceSurface.from_object(source_obj, depsgraph)
+        register_handlers()
+        self.entries[key] = SurfaceCacheEntry(mesh_pointer, fingerprint, surface, surface_bytes(surface))
+        self.entries.move_to_end(key)
+        self.evict()
+        return surface
+
+    def evict(self):
+        # the most recently used entry is always kept, even if it alone exceeds the budget
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+            self.entries.popitem(last=False)
+
+    def invalidate(self, name: str | None = None, mesh_pointer: int | None = None):
+        """Drop the entries of the object `name` or of the mesh data at `mesh_pointer`. Drop everything without arguments."""
+        if name is None and mesh_pointer is None:
+            self.entries.clear()
+            return
+        for key, entry in list(self.entries.items()):
+            if key == name or entry.mesh_pointer == mesh_pointer:
+                del self.entries[key]
+
+
+surface_cache = SurfaceCache()
+
+@bpy.app.handlers.persistent
+def invalidate_edited_surfaces(scene, depsgraph):
+    # only mesh data updates count: objects are also tagged when they are merely re-parented or re-evaluated,
+    # and the evaluated geometry is covered by the geometry hash
+    if len(surface_cache.entries) == 0: return
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry: continue
+        changed = update.id.original
+        if isinstance(changed, bpy.types.Mesh):
+            surface_cache.invalidate(mesh_pointer=changed.as_pointer())
+
+@bpy.app.handlers.persistent
+def clear_surface_cache(*args):
+    surface_cache.invalidate()
+
+
+def register_handlers():
+    # added with the first cached surface rather than on add-on registration, so this module can load lazily
+    if invalidate_edited_surfaces not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(invalidate_edited_surfaces)
+    if clear_surface_cache not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(clear_surface_cache)
+
+def unregister():
+    if invalidate_edited_surfaces in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(invalidate_edited_surfaces)
+    if clear_surface_cache in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_surface_cache)
+    surface_cache.invalidate()
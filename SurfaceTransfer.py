@@ -0,0 +1,266 @@
+from typing import Sequence
+from dataclasses import dataclass
+from itertools import chain
+
+import bpy
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+from .VertexCleaner import read_deform_weights
+from .WeightMatrix import WeightMatrix, csr_indptr
+
+def world_coordinates(mesh: bpy.types.Mesh, matrix) -> np.ndarray:
+    """Return the vertex coordinates of the mesh transformed by `matrix` as a (vertices x 3) array."""
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)
+    matrix = np.array(matrix, dtype=np.float64)
+    return coords @ matrix[:3, :3].T + matrix[:3, 3]
+
+def polygon_factors(points: np.ndarray, corners: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """Mean value coordinates of every point inside its polygon, the same interpolation as Blender's `interp_weights_poly_v3`.
+    `corners` is a (points x max sides x 3) array padded after the `sides` first corners of each polygon."""
+    count, max_sides = corners.shape[:2]
+    rows = np.arange(count)[:, None]
+    columns = np.arange(max_sides)[None, :]
+    valid = columns < sides[:, None]
+    following = (columns + 1) % sides[:, None]
+
+    directions = corners - points[:, None, :]
+    lengths = np.linalg.norm(directions, axis=2)
+    next_directions = directions[rows, following]
+    next_lengths = lengths[rows, following]
+
+    # tan(angle / 2) between the directions to the corners of each edge
+    areas = np.linalg.norm(np.cross(directions, next_directions), axis=2)
+    dots = np.einsum("ijk,ijk->ij", directions, next_directions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half_tans = (lengths * next_lengths - dots) / areas
+    half_tans[~np.isfinite(half_tans) | (areas <= np.finfo(np.float32).eps) | ~valid] = 0.0
+
+    previous = (columns - 1) % sides[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = (half_tans[rows, previous] + half_tans) / lengths
+    factors[~valid] = 0.0
+
+    # points lying on an edge are interpolated along that edge only
+    edges = next_directions - directions
+    edge_lengths = np.einsum("ijk,ijk->ij", edges, edges)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge_factors = np.clip(-np.einsum("ijk,ijk->ij", directions, edges) / edge_lengths, 0.0, 1.0)
+    edge_factors[~np.isfinite(edge_factors)] = 0.0
+    edge_distances = np.linalg.norm(directions + edges * edge_factors[:, :, None], axis=2)
+    on_edge = (edge_distances < 1e-5) & valid
+
+    for row in np.flatnonzero(on_edge.any(axis=1)).tolist():
+        edge = int(np.argmax(on_edge[row]))
+        factors[row] = 0.0
+        factors[row, edge] = 1.0 - edge_factors[row, edge]
+        factors[row, following[row, edge]] += edge_factors[row, edge]
+
+    totals = factors.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    return factors / totals
+
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate the ranges [start, start + count) into one index array."""
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    return np.arange(total) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+
+
+@dataclass
+class SourceSurface:
+    """Source mesh in world space with a BVH tree over its triangles and its weights in CSR layout."""
+    bvh: BVHTree
+    coords: np.ndarray
+    triangles: np.ndarray
+    triangle_polygons: np.ndarray
+    polygon_starts: np.ndarray
+    polygon_sides: np.ndarray
+    loop_vertices: np.ndarray
+    group_names: list[str]
+    indptr: np.ndarray
+    groups: np.ndarray
+    weights: np.ndarray
+    # layer rank of the source of every triangle, for surfaces combined from several sources
+    triangle_ranks: np.ndarray | None = None
+
+    @classmethod
+    def from_object(cls, source_obj: bpy.types.Object, depsgraph: bpy.types.Depsgraph) -> "SourceSurface":
+        evaluated = source_obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            coords = world_coordinates(mesh, source_obj.matrix_world)
+
+            mesh.calc_loop_triangles()
+            triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", triangles)
+            triangles = triangles.reshape(-1, 3)
+            triangle_polygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+            mesh.loop_triangles.foreach_get("polygon_index", triangle_polygons)
+
+            polygon_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+            polygon_sides = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get("loop_start", polygon_starts)
+            mesh.polygons.foreach_get("loop_total", polygon_sides)
+            loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get("vertex_index", loop_vertices)
+
+            vertices, groups, weights = read_deform_weights(mesh)
+        finally:
+            evaluated.to_mesh_clear()
+
+        # read_deform_weights lists the weights vertex by vertex, so they already are in CSR order
+        indptr = csr_indptr(vertices, len(coords))
+        group_names = [group.name for group in source_obj.vertex_groups]
+
+        return cls.from_arrays(coords, triangles, triangle_polygons, polygon_starts, polygon_sides, loop_vertices, group_names, indptr, groups, weights)
+
+    @classmethod
+    def from_arrays(
+        cls, coords: np.ndarray, triangles: np.ndarray, triangle_polygons: np.ndarray, polygon_starts: np.ndarray, polygon_sides: np.ndarray,
+        loop_vertices: np.ndarray, group_names: list[str], indptr: np.ndarray, groups: np.ndarray, weights: np.ndarray
+    ) -> "SourceSurface":
+        """Build the BVH tree over arrays taken from a mesh, possibly in another process."""
+        bvh = BVHTree.FromPolygons(coords.tolist(), triangles.tolist(), all_triangles=True)
+        return cls(bvh, coords, triangles, triangle_polygons, polygon_starts, polygon_sides, loop_vertices, group_names, indptr, groups, weights)
+
+    def nearest_ranked(self, points: np.ndarray, nearest: list, layer_offset: float) -> list:
+        """Replace every nearest hit by the nearest one once the triangles of each source are moved
+        `layer_offset` closer per layer rank, so upper layers win over sources just below them."""
+        ranks = self.triangle_ranks.tolist() # type: ignore
+        top_rank = max(ranks, default=0)
+        find_nearest_range = self.bvh.find_nearest_range
+        ranked = []
+        for point, hit in zip(points.tolist(), nearest):
+            if hit[2] is None or ranks[hit[2]] == top_rank:
+                ranked.append(hit)
+                continue
+            # a triangle further than this cannot come closer than the hit, whatever its rank
+            reach = hit[3] + (top_rank - ranks[hit[2]]) * layer_offset
+            candidates = find_nearest_range(point, reach) + [hit]
+            ranked.append(min(candidates, key=lambda candidate: candidate[3] - ranks[candidate[2]] * layer_offset))
+        return ranked
+
+    def interpolate(self, points: np.ndarray, layer_offset: float = 0.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolate the source weights at the nearest surface point of every point.
+        Returns flat (point index, source group index, weight) arrays without zero weights."""
+        find_nearest = self.bvh.find_nearest
+        nearest = [find_nearest(point) for point in points.tolist()]
+        if self.triangle_ranks is not None and layer_offset > 0:
+            nearest = self.nearest_ranked(points, nearest, layer_offset)
+        point_indices = np.array([i for i, (_, _, index, _) in enumerate(nearest) if index is not None], dtype=np.int64)
+        if len(point_indices) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        hits = [nearest[i] for i in point_indices.tolist()]
+        locations = np.fromiter(chain.from_iterable(hit[0] for hit in hits), dtype=np.float64, count=len(hits) * 3).reshape(-1, 3)
+        polygons = self.triangle_polygons[np.fromiter((hit[2] for hit in hits), dtype=np.int64, count=len(hits))]
+        sides = self.polygon_sides[polygons]
+        columns = np.minimum(np.arange(sides.max()), sides[:, None] - 1)
+        corners = self.loop_vertices[self.polygon_starts[polygons][:, None] + columns]
+        factors = polygon_factors(locations, self.coords[corners], sides)
+
+        # every corner of the polygon contributes all of its weights scaled by its factor
+        valid = np.arange(corners.shape[1])[None, :] < sides[:, None]
+        corner_vertices = corners[valid]
+        starts = self.indptr[corner_vertices]
+        counts = self.indptr[corner_vertices + 1] - starts
+        entries = expand_ranges(starts, counts)
+
+        targets = np.repeat(np.repeat(point_indices, sides), counts)
+        groups = self.groups[entries]
+        values = self.weights[entries] * np.repeat(factors[valid], counts)
+
+        # sum the contributions of the same point/group pair
+        group_count = max(len(self.group_names), int(groups.max(initial=-1)) + 1)
+        keys, inverse = np.unique(targets.astype(np.int64) * group_count + groups, return_inverse=True)
+        sums = np.bincount(inverse, weights=values)
+        used = sums > 0
+
+        return (keys[used] // group_count).astype(np.int32), (keys[used] % group_count).astype(np.int32), sums[used].astype(np.float32)
+
+
+def combine_surfaces(surfaces: Sequence[SourceSurface], ranks: Sequence[int], group_names_kept: set[str] | None = None) -> SourceSurface:
+    """One surface with a single BVH tree over all of `surfaces`, the body and the garments layered on it.
+    The groups are matched by name, only those in `group_names_kept` when given, and every triangle is tagged
+    with the layer rank of its surface."""
+    group_names: list[str] = []
+    indices: dict[str, int] = {}
+    parts: dict[str, list[np.ndarray]] = {name: [] for name in [
+        "coords", "triangles", "triangle_polygons", "polygon_starts", "polygon_sides", "loop_vertices", "vertices", "groups", "weights", "ranks"
+    ]}
+    vertex_offset = polygon_offset = loop_offset = 0
+    for surface, rank in zip(surfaces, ranks):
+        # groups past the names of the source are skipped like `interpolate` does
+        remap = np.full(max(len(surface.group_names), int(surface.groups.max(initial=-1)) + 1), -1, dtype=np.int32)
+        for i, name in enumerate(surface.group_names):
+            if group_names_kept is not None and name not in group_names_kept: continue
+            if name not in indices:
+                indices[name] = len(group_names)
+                group_names.append(name)
+            remap[i] = indices[name]
+        groups = remap[surface.groups]
+        kept = groups >= 0
+        vertices = np.repeat(np.arange(len(surface.coords)), np.diff(surface.indptr))
+
+        parts["coords"].append(surface.coords)
+        parts["triangles"].append(surface.triangles + vertex_offset)
+        parts["triangle_polygons"].append(surface.triangle_polygons + polygon_offset)
+        parts["polygon_starts"].append(surface.polygon_starts + loop_offset)
+        parts["polygon_sides"].append(surface.polygon_sides)
+        parts["loop_vertices"].append(surface.loop_vertices + vertex_offset)
+        parts["vertices"].append(vertices[kept] + vertex_offset)
+        parts["groups"].append(groups[kept])
+        parts["weights"].append(surface.weights[kept])
+        parts["ranks"].append(np.full(len(surface.triangles), rank, dtype=np.int32))
+        vertex_offset += len(surface.coords)
+        polygon_offset += len(surface.polygon_starts)
+        loop_offset += len(surface.loop_vertices)
+
+    arrays = {name: np.concatenate(part) for name, part in parts.items()}
+    # the vertices of every part are ordered and offset past the previous part, so the whole stays in CSR order
+    indptr = csr_indptr(arrays["vertices"], vertex_offset)
+    combined = SourceSurface.from_arrays(
+        arrays["coords"], arrays["triangles"], arrays["triangle_polygons"], arrays["polygon_starts"], arrays["polygon_sides"],
+        arrays["loop_vertices"], group_names, indptr, arrays["groups"], arrays["weights"]
+    )
+    combined.triangle_ranks = arrays["ranks"]
+    return combined
+
+
+def transfer_surface_matrix(
+    surface: SourceSurface, target_obj: bpy.types.Object, matrix: WeightMatrix, vertex_indices: np.ndarray | None = None,
+    layer_offset: float = 0.0
+):
+    """Put the weights interpolated from `surface` at the vertices of `target_obj` into its weight matrix, adding only
+    the groups it actually receives. With `vertex_indices` only those vertices are transferred: their weights in every
+    group of the source are replaced and all other vertices keep theirs. `layer_offset` favours the upper layers of a
+    combined surface."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+
+    points = world_coordinates(mesh, target_obj.matrix_world)
+    if vertex_indices is None:
+        vertices, source_groups, weights = surface.interpolate(points, layer_offset)
+    else:
+        vertices, source_groups, weights = surface.interpolate(points[vertex_indices], layer_offset)
+        vertices = vertex_indices[vertices].astype(np.int32)
+
+    used_groups = np.unique(source_groups)
+    remap = np.full(int(used_groups.max(initial=-1)) + 1, -1, dtype=np.int32)
+    for source_group in used_groups.tolist():
+        if source_group >= len(surface.group_names): continue
+        remap[source_group] = matrix.group_index(surface.group_names[source_group])
+
+    target_groups = remap[source_groups]
+    valid = target_groups >= 0
+    if vertex_indices is None:
+        # replace the previous weights of the received groups like data_transfer does
+        replaced = np.unique(remap[remap >= 0])
+    else:
+        # the vertices may have left groups they do not receive anymore
+        source_names = set(surface.group_names)
+        replaced = np.array([index for index, name in enumerate(matrix.group_names) if name in source_names], dtype=np.int32)
+    matrix.replace(vertices[valid], target_groups[valid], weights[valid], replaced, vertex_indices)
@@ -0,0 +1,85 @@
+import bpy
+import numpy as np
+
+from .SurfaceTransfer import world_coordinates
+from .VertexCleaner import flip_vertex_group_name, has_mirror_modifier
+from .WeightMatrix import WeightMatrix
+
+# distance under which a vertex counts as the mirror image of another, in armature space
+MIRROR_TOLERANCE = 1e-4
+
+def armature_space(coords: np.ndarray, armature: bpy.types.Object) -> np.ndarray:
+    """World coordinates in the space of the armature, whose X axis the body is mirrored along."""
+    matrix = np.array(armature.matrix_world.inverted(), dtype=np.float64)
+    return coords @ matrix[:3, :3].T + matrix[:3, 3]
+
+def mirror_partners(coords: np.ndarray, tolerance: float = MIRROR_TOLERANCE) -> np.ndarray | None:
+    """Index of the mirror image along X of every point, the point itself on the mirror plane.
+    None when some point has no mirror image, i.e. the points are not symmetric."""
+    if len(coords) == 0: return None
+    cells = np.round(coords / tolerance).astype(np.int64)
+    # the X range is made symmetric so the mirrored cells have keys too
+    low = cells.min(axis=0)
+    low[0] = min(low[0], -cells[:, 0].max())
+    spans = cells.max(axis=0) - low + 1
+    spans[0] = -2 * low[0] + 1
+    if float(spans[0]) * float(spans[1]) * float(spans[2]) >= 2.0 ** 62: return None
+
+    def keys(cells: np.ndarray) -> np.ndarray:
+        offset = cells - low
+        return (offset[:, 0] * spans[1] + offset[:, 1]) * spans[2] + offset[:, 2]
+
+    point_keys = keys(cells)
+    order = np.argsort(point_keys, kind="stable")
+    sorted_keys = point_keys[order]
+    if np.any(sorted_keys[1:] == sorted_keys[:-1]): return None
+
+    mirrored_keys = keys(cells * np.array([-1, 1, 1], dtype=np.int64))
+    found = np.minimum(np.searchsorted(sorted_keys, mirrored_keys), len(sorted_keys) - 1)
+    if np.any(sorted_keys[found] != mirrored_keys): return None
+    return order[found]
+
+def symmetric_halves(target_obj: bpy.types.Object, armature: bpy.types.Object, tolerance: float = MIRROR_TOLERANCE) -> tuple[np.ndarray, np.ndarray] | None:
+    """Mirror partners of the vertices and the sorted indices of the vertices on the +X half and the plane,
+    when the object is symmetric along the armature's X axis. None for asymmetric objects and objects
+    with a mirror modifier, whose mesh already is a single half."""
+    mesh = target_obj.data
+    if not isinstance(mesh, bpy.types.Mesh) or has_mirror_modifier(target_obj): return None
+
+    coords = armature_space(world_coordinates(mesh, target_obj.matrix_world), armature)
+    partners = mirror_partners(coords, tolerance)
+    if partners is None: return None
+    return partners, np.flatnonzero(np.round(coords[:, 0] / tolerance) >= 0)
+
+def is_symmetric_surface(coords: np.ndarray, armature: bpy.types.Object, tolerance: float = MIRROR_TOLERANCE) -> bool:
+    return mirror_partners(armature_space(coords, armature), tolerance) is not None
+
+
+def flipped_group_indices(matrix: WeightMatrix, names: set[str], pairs: dict[str, str] | None = None) -> np.ndarray:
+    """Index of the L/R counterpart of every group of the matrix, added when missing for the groups in `names`.
+    Other groups and groups without a side map to themselves."""
+    if pairs is None: pairs = {}
+    group_names = list(matrix.group_names)
+    flipped = np.arange(len(group_names), dtype=np.int32)
+    for index, name in enumerate(group_names):
+        if name not in names: continue
+        flip_name = pairs[name] if name in pairs else flip_vertex_group_name(name)
+        if flip_name is None: continue
+        flipped[index] = matrix.group_index(flip_name)
+    return flipped
+
+def mirror_matrix_weights(matrix: WeightMatrix, partners: np.ndarray, computed: np.ndarray, group_names: list[str], pairs: dict[str, str] | None = None):
+    """Replace the weights of the vertices outside `computed` in the groups named `group_names` by the weights
+    of their mirror partners, with L/R groups swapped."""
+    names = set(group_names)
+    flipped = flipped_group_indices(matrix, names, pairs)
+
+    is_source = np.zeros(matrix.vertex_count, dtype=bool)
+    is_source[computed] = True
+    is_source[partners == np.arange(len(partners))] = False
+    mirrored = np.flatnonzero(~is_source & (partners != np.arange(len(partners))))
+
+    named = [index for index, name in enumerate(matrix.group_names) if name in names]
+    vertices, groups, weights = matrix.entries()
+    mirroring = is_source[vertices] & np.isin(groups, named)
+    matrix.replace(partners[vertices[mirroring]].astype(np.int32), flipped[groups[mirroring]], weights[mirroring], named, mirrored)
@@ -0,0 +1,260 @@
+"""Weight transfer and smoothing in background Blender processes.
+
+The body surface and the garments are copied once into shared memory. Every worker is started as
+
+    blender -b --factory-startup -P TransferWorker.py -- job.json
+
+attaches to the buffers named in its job, computes the weights of its garments and writes them next to the job.
+Only writing the results into the meshes is left to the main process.
+"""
+
+if __name__ == "__main__":
+    # started by WeightWorkers: import the add-on as a package and run from there
+    import sys
+    import importlib
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    worker = importlib.import_module(Path(__file__).resolve().parent.name + ".TransferWorker")
+    sys.exit(worker.main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []))
+
+from typing import Sequence
+from dataclasses import dataclass
+from multiprocessing import shared_memory, resource_tracker
+from pathlib import Path
+
+import bpy
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+
+from .SurfaceTransfer import SourceSurface, world_coordinates
+from .VertexCleaner import read_deform_weights
+from .WeightSmooth import VertexAdjacency, smooth_weight_entries, smoothing_passes
+from .WeightMatrix import WeightMatrix
+
+SURFACE_ARRAYS = ["coords", "triangles", "triangle_polygons", "polygon_starts", "polygon_sides", "loop_vertices", "indptr", "groups", "weights"]
+
+def share_array(array: np.ndarray) -> tuple[shared_memory.SharedMemory, dict]:
+    """Copy the array into a new shared memory block. Returns the block and the layout to attach to it with."""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {"name": block.name, "dtype": array.dtype.str, "shape": list(array.shape)}
+
+def attach_array(layout: dict) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    """View of an array shared by another process. The block stays owned by that process."""
+    try:
+        block = shared_memory.SharedMemory(name=layout["name"], track=False) # type: ignore
+    except TypeError:
+        # before Python 3.13 every attached block is tracked and unlinked when this process exits
+        block = shared_memory.SharedMemory(name=layout["name"])
+        resource_tracker.unregister(block._name, "shared_memory") # type: ignore
+    return block, np.ndarray(layout["shape"], dtype=np.dtype(layout["dtype"]), buffer=block.buf)
+
+
+@dataclass
+class GarmentWeights:
+    """Weights of a garment as flat (vertex, group, weight) arrays over its group names."""
+    group_names: list[str]
+    vertices: np.ndarray
+    groups: np.ndarray
+    weights: np.ndarray
+
+def compute_garment_weights(
+    surface: SourceSurface, coords: np.ndarray, adjacency: VertexAdjacency, existing: tuple[np.ndarray, np.ndarray, np.ndarray],
+    group_names: list[str], locked: set[str], smooth: float, smooth_per_group: bool = False
+) -> GarmentWeights:
+    """What `transfer_surface_matrix` followed by `smooth_matrix_groups` make of the garment, on arrays only:
+    the received groups replace the existing ones, new groups are appended in source order, then every unlocked group is smoothed,
+    once per group of the garment with `smooth_per_group`."""
+    transferred_vertices, source_groups, transferred_weights = surface.interpolate(coords)
+
+    names = list(group_names)
+    indices = {name: i for i, name in enumerate(names)}
+    remap = np.full(len(surface.group_names), -1, dtype=np.int32)
+    for source_group in np.unique(source_groups).tolist():
+        if source_group >= len(surface.group_names): continue
+        name = surface.group_names[source_group]
+        if name not in indices:
+            indices[name] = len(names)
+            names.append(name)
+        remap[source_group] = indices[name]
+
+    valid = source_groups < len(remap)
+    target_groups = np.full(len(source_groups), -1, dtype=np.int32)
+    target_groups[valid] = remap[source_groups[valid]]
+    valid &= target_groups >= 0
+
+    # the received groups replace the existing weights of those groups
+    vertices, groups, weights = existing
+    kept = ~np.isin(groups, np.unique(target_groups[valid]))
+    vertices = np.concatenate([vertices[kept], transferred_vertices[valid]]).astype(np.int32)
+    groups = np.concatenate([groups[kept], target_groups[valid]]).astype(np.int32)
+    weights = np.concatenate([weights[kept], transferred_weights[valid]]).astype(np.float32)
+
+    if smooth > 0.01:
+        used = set(np.unique(groups).tolist())
+        smoothing = [i for i, name in enumerate(names) if name not in locked and i in used]
+        if len(smoothing):
+            smoothed = smooth_weight_entries(vertices, groups, weights, adjacency, smoothing, smooth, smoothing_passes(len(names), smooth_per_group))
+            others = ~np.isin(groups, smoothing)
+            vertices = np.concatenate([vertices[others], smoothed[0]])
+            groups = np.concatenate([groups[others], smoothed[1]])
+            weights = np.concatenate([weights[others], smoothed[2]])
+
+    return GarmentWeights(names, vertices, groups, weights)
+
+def garment_matrix(obj: bpy.types.Object, result: GarmentWeights) -> WeightMatrix:
+    """Weight matrix of the computed weights, the groups the object already has keeping their locks."""
+    locked = {group.name for group in obj.vertex_groups if group.lock_weight}
+    return WeightMatrix.from_entries(
+        result.group_names, [name in locked for name in result.group_names], len(obj.data.vertices), # type: ignore
+        result.vertices, result.groups, result.weights
+    )
+
+
+def workers_available() -> bool:
+    """Workers are Blender processes, which the bpy module cannot start."""
+    return bool(bpy.app.binary_path)
+
+class WeightWorkers:
+    """Pool of background Blender processes computing the weights of garments from shared memory.
+    `start`, poll `running` until it is False, collect `results`, and always `close`."""
+
+    def __init__(self, surface: SourceSurface, target_objs: Sequence[bpy.types.Object], smooth: float, workers: int, smooth_per_group: bool = False):
+        self.surface = surface
+        self.target_objs = list(target_objs)
+        self.smooth = smooth
+        self.smooth_per_group = smooth_per_group
+        self.workers = max(1, min(workers, len(self.target_objs)))
+        self.blocks: list[shared_memory.SharedMemory] = []
+        self.processes: list[subprocess.Popen] = []
+        self.directory: Path | None = None
+
+    def share(self, array: np.ndarray) -> dict:
+        block, layout = share_array(array)
+        self.blocks.append(block)
+        return layout
+
+    def garment_job(self, index: int, obj: bpy.types.Object) -> dict:
+        mesh = obj.data
+        assert isinstance(mesh, bpy.types.Mesh)
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+        vertices, groups, weights = read_deform_weights(mesh)
+        arrays = {
+            "coords": world_coordinates(mesh, obj.matrix_world), "edges": edges.reshape(-1, 2),
+            "vertices": vertices, "groups": groups, "weights": weights
+        }
+        return {
+            "object": obj.name,
+            "arrays": {name: self.share(array) for name, array in arrays.items()},
+            "group_names": [group.name for group in obj.vertex_groups],
+            "locked": [group.name for group in obj.vertex_groups if group.lock_weight],
+            "output": str(self.directory / f"garment_{index}.npz"), # type: ignore
+        }
+
+    def write_jobs(self) -> list[Path]:
+        """Share the surface and the garments and write the job of every worker. Returns the job files."""
+        self.directory = Path(tempfile.mkdtemp(prefix="kiseru_workers_"))
+        surface = {name: self.share(getattr(self.surface, name)) for name in SURFACE_ARRAYS}
+        garments = [self.garment_job(i, obj) for i, obj in enumerate(self.target_objs)]
+
+        # largest garments first, each to the least loaded worker
+        loads = [0] * self.workers
+        assigned: list[list[dict]] = [[] for _ in range(self.workers)]
+        for obj, garment in sorted(zip(self.target_objs, garments), key=lambda pair: -len(pair[0].data.vertices)): # type: ignore
+            worker = loads.index(min(loads))
+            assigned[worker].append(garment)
+            loads[worker] += len(obj.data.vertices) # type: ignore
+
+        job_paths = []
+        for i, jobs in enumerate(assigned):
+            job_path = self.directory / f"job_{i}.json"
+            with open(job_path, "w", encoding="utf-8") as file:
+                json.dump({"surface": surface, "group_names": self.surface.group_names, "smooth": self.smooth, "smooth_per_group": self.smooth_per_group, "garments": jobs}, file)
+            job_paths.append(job_path)
+        return job_paths
+
+    def start(self):
+        script = str(Path(__file__).resolve())
+        for i, job_path in enumerate(self.write_jobs()):
+            with open(self.directory / f"worker_{i}.log", "w", encoding="utf-8") as log: # type: ignore
+                self.processes.append(subprocess.Popen(
+                    [bpy.app.binary_path, "--background", "--factory-startup", "--python-exit-code", "1", "--python", script, "--", str(job_path)],
+                    stdout=log, stderr=subprocess.STDOUT
+                ))
+
+    @property
+    def running(self) -> bool:
+        return any(process.poll() is None for process in self.processes)
+
+    def results(self) -> dict[str, GarmentWeights]:
+        """Weights of every garment a worker finished. Garments of crashed workers are missing."""
+        results = {}
+        for i, obj in enumerate(self.target_objs):
+            output = self.directory / f"garment_{i}.npz" # type: ignore
+            if not output.exists(): continue
+            try:
+                with np.load(output, allow_pickle=False) as arrays:
+                    results[obj.name] = GarmentWeights(
+                        arrays["group_names"].tolist(), arrays["vertices"], arrays["groups"], arrays["weights"]
+                    )
+            except (OSError, ValueError, KeyError):
+                continue
+        return results
+
+    def close(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def run_job(job: dict):
+    """Compute every garment of the job, written one by one so a crash keeps the garments finished before it."""
+    blocks = []
+    try:
+        surface_arrays = {}
+        for name, layout in job["surface"].items():
+            block, surface_arrays[name] = attach_array(layout)
+            blocks.append(block)
+        surface = SourceSurface.from_arrays(group_names=job["group_names"], **surface_arrays)
+
+        for garment in job["garments"]:
+            arrays = {}
+            for name, layout in garment["arrays"].items():
+                block, arrays[name] = attach_array(layout)
+                blocks.append(block)
+            result = compute_garment_weights(
+                surface, arrays["coords"], VertexAdjacency.from_edges(len(arrays["coords"]), arrays["edges"]), (arrays["vertices"], arrays["groups"], arrays["weights"]),
+                garment["group_names"], set(garment["locked"]), job["smooth"], job.get("smooth_per_group", False)
+            )
+            temporary = garment["output"] + ".tmp.npz"
+            np.savez(
+                temporary, group_names=np.array(result.group_names, dtype=str),
+                vertices=result.vertices, groups=result.groups, weights=result.weights
+            )
+            os.replace(temporary, garment["output"])
+    finally:
+        # the views into the blocks have to be gone before the blocks can be closed
+        surface = surface_arrays = arrays = None
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+
+def main(argv: Sequence[str]) -> int:
+    with open(argv[0], encoding="utf-8") as file:
+        run_job(json.load(file))
+    return 0
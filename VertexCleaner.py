@@ -1,20 +1,68 @@
-from typing import Sequence
+from typing import Sequence, Iterable, TYPE_CHECKING
+from functools import lru_cache
+from itertools import chain
 from dataclasses import dataclass
 
 import bpy
+import bmesh
 import re
+import time
+import numpy as np
 
-def cleanup_all_vertex(objects: Sequence[bpy.types.Object]):
+from .Profiler import StageProfiler, profile_stage
+
+if TYPE_CHECKING:
+    from .WeightMatrix import WeightMatrix
+
+# Removing a group costs one C-level pass over every vertex, rebuilding costs one Python-level write per kept weight.
+# One Python write is worth roughly this many vertex visits of `vertex_groups.remove`. Break-even ratios measured
+# on Blender 5.0 with grids of 4 weights per vertex, removing 5 to 200 groups of 25 to 260:
+#     5k vertices: 41, 46, 69    20k vertices: 39, 55, 51    80k vertices: 52, 49, 85
+REBUILD_COST_RATIO = 50
+
+def cleanup_all_vertex(objects: Sequence[bpy.types.Object], profiler: StageProfiler | None = None):
     bpy.ops.object.mode_set(mode = 'OBJECT')
     for obj in objects:
-        target_vertex_groups = obj.vertex_groups
-        for vg in target_vertex_groups:
-            target_vertex_groups.remove(vg)
+        with profile_stage(profiler, "Remove all vertex groups", [obj]):
+            target_vertex_groups = obj.vertex_groups
+            for vg in target_vertex_groups:
+                target_vertex_groups.remove(vg)
+
+
+@dataclass
+class CleanupTiming:
+    object_name: str
+    kept: int
+    removed: int
+    seconds: float
 
 
-def cleanup_all_unused_vertex(objects: Sequence[bpy.types.Object]):
+def cleanup_all_unused_vertex(objects: Sequence[bpy.types.Object], profiler: StageProfiler | None = None, pairs: dict[str, str] | None = None) -> list[CleanupTiming]:
+    """Remove unused vertex groups from every object. The keep-sets of all objects are computed in one pass
+    sharing the L/R pair index of their armature, or `pairs` when given, then the unused groups of each object are deleted in bulk."""
+    plans: list[tuple[CleanupContext, set[int], float]] = []
+
     for obj in objects:
-        cleanup_unused_vertex_groups(obj)
+        if not isinstance(obj.data, bpy.types.Mesh): continue
+        start = time.perf_counter()
+        with profile_stage(profiler, "Find used vertex groups", [obj]):
+            context = CleanupContext(obj)
+            object_pairs = pairs
+            if object_pairs is None:
+                armature = obj.find_armature()
+                object_pairs = armature_flip_pair_index(armature) if armature is not None else None
+            keep = depending_vertex_group_indices_with_flip(context, object_pairs)
+        plans.append((context, keep, time.perf_counter() - start))
+
+    timings = []
+    for context, keep, seconds in plans:
+        start = time.perf_counter()
+        with profile_stage(profiler, "Remove unused vertex groups", [context.object]):
+            removed = remove_vertex_groups(context, keep)
+        seconds += time.perf_counter() - start
+        timings.append(CleanupTiming(context.object.name, len(context.index_to_name) - removed, removed, seconds))
+
+    return timings
     
 # ------------------------------------------------------------------------------ # 
 
@@ -24,6 +72,7 @@ class CleanupContext:
     mesh: bpy.types.Mesh
     index_to_name: dict[int, str] 
     name_to_index: dict[str, int] 
+    deform_weights: tuple[np.ndarray, np.ndarray, np.ndarray]
     
     def __init__(self, object: bpy.types.Object):
         self.object = object
@@ -34,37 +83,143 @@ class CleanupContext:
         for name, group in object.vertex_groups.items():
             self.index_to_name[group.index] = name
             self.name_to_index[name] = group.index
+        self.deform_weights = read_deform_weights(self.mesh)
     
+LEFT_RIGHT_PATTERN = r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)"
+
+# The side word is searched case-insensitively but only upper-case occurrences are replaced.
+left_right_search = re.compile(LEFT_RIGHT_PATTERN, re.IGNORECASE)
+left_right_replace = re.compile(LEFT_RIGHT_PATTERN)
+
+flip_word_table = {
+    "LEFT": "RIGHT", "Left": "Right", "left": "right", "L": "R", "l": "r",
+    "RIGHT": "LEFT", "Right": "Left", "right": "left", "R": "L", "r": "l",
+}
+
+@lru_cache(maxsize=4096)
 def flip_vertex_group_name(name: str) -> str | None:
     """Flip the vertex group name. If the name is not a left or right name, return None."""
 
-    match = re.search(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", name, re.IGNORECASE)
+    match = left_right_search.search(name)
 
     if match is None: return None
-    
-    match2 = re.search("[A-Z]+", match.group(), re.IGNORECASE)
 
-    if match2 is None: return None
-    
+    word = match.group(2) or match.group(5)
+
     flip_word = ""
-    if   match2.group() == "LEFT":  flip_word = match.group().replace("LEFT", "RIGHT")
-    elif match2.group() == "Left":  flip_word = match.group().replace("Left", "Right")
-    elif match2.group() == "left":  flip_word = match.group().replace("left", "right")
-    elif match2.group() == "L":     flip_word = match.group().replace("L", "R")
-    elif match2.group() == "l":     flip_word = match.group().replace("l", "r")
-    elif match2.group() == "RIGHT": flip_word = match.group().replace("RIGHT", "LEFT")
-    elif match2.group() == "Right": flip_word = match.group().replace("Right", "Left")
-    elif match2.group() == "right": flip_word = match.group().replace("right", "left")
-    elif match2.group() == "R":     flip_word = match.group().replace("R", "L")
-    elif match2.group() == "r":     flip_word = match.group().replace("r", "l")
-        
-    search_name = re.sub(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", flip_word, name)
+    if word in flip_word_table:
+        flip_word = match.group().replace(word, flip_word_table[word])
+
+    return left_right_replace.sub(flip_word, name)
+
 
-    return search_name
+def flip_pair_index(names: Iterable[str]) -> dict[str, str]:
+    """Map every name to its flipped name when the flipped name is also in `names`. Pairs are stored in both directions."""
+    names = set(names)
+    pairs = {}
+    for name in names:
+        flip_name = flip_vertex_group_name(name)
+        if flip_name is not None and flip_name in names:
+            pairs[name] = flip_name
+    return pairs
+
+
+# armature data pointer -> (bone names, pair index)
+armature_pair_indices: dict[int, tuple[tuple[str, ...], dict[str, str]]] = {}
+
+def armature_flip_pair_index(armature: bpy.types.Object) -> dict[str, str]:
+    """Return the L/R pair index of the armature bones, computed once per armature and rebuilt when its bones change."""
+    names = tuple(bone.name for bone in armature.data.bones) # type: ignore
+    key = armature.data.as_pointer()
+
+    cached = armature_pair_indices.get(key)
+    if cached is not None and cached[0] == names:
+        return cached[1]
+
+    pairs = flip_pair_index(names)
+    armature_pair_indices[key] = (names, pairs)
+    return pairs
+
+
+def read_deform_weights(mesh: bpy.types.Mesh) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Read every deform weight of the mesh in one pass.
+    Returns flat (vertex index, group index, weight) arrays, one entry per vertex/group pair.
+
+    Blender has no array access to deform weights (they are not mesh attributes and have no `foreach_get`), so this
+    still visits every vertex in Python, only through a BMesh layer instead of RNA `vertex.groups`. That makes it a
+    modest speedup, about a fifth faster than the RNA walk, not a bulk read; the gain of the callers is that they read
+    once and work on the arrays afterwards."""
+    bm = bmesh.new()
+    try:
+        bm.from_mesh(mesh)
+        layer = bm.verts.layers.deform.active
+        if layer is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        deform_verts = [vert[layer] for vert in bm.verts]
+        group_lists = [deform_vert.keys() for deform_vert in deform_verts]
+        weight_lists = [deform_vert.values() for deform_vert in deform_verts]
+    finally:
+        bm.free()
+
+    counts = np.fromiter(map(len, group_lists), dtype=np.int32, count=len(group_lists))
+    total = int(counts.sum())
+
+    vertices = np.repeat(np.arange(len(group_lists), dtype=np.int32), counts)
+    groups = np.fromiter(chain.from_iterable(group_lists), dtype=np.int32, count=total)
+    weights = np.fromiter(chain.from_iterable(weight_lists), dtype=np.float32, count=total)
+    return vertices, groups, weights
+
+
+def write_deform_weights(mesh: bpy.types.Mesh, vertices: np.ndarray, groups: np.ndarray, weights: np.ndarray):
+    """Write flat (vertex index, group index, weight) arrays into the deform weights of the mesh in one pass.
+    Existing weights of other vertex/group pairs are kept."""
+    bm = bmesh.new()
+    try:
+        bm.from_mesh(mesh)
+        layer = bm.verts.layers.deform.verify()
+        verts = bm.verts
+        verts.ensure_lookup_table()
+        for vertex, group, weight in zip(vertices.tolist(), groups.tolist(), weights.tolist()):
+            verts[vertex][layer][group] = weight
+        bm.to_mesh(mesh)
+    finally:
+        bm.free()
+
+
+def replace_deform_weights(mesh: bpy.types.Mesh, indptr: np.ndarray, groups: np.ndarray, weights: np.ndarray):
+    """Replace every deform weight of the mesh by CSR weights in one pass: the weights of vertex i are
+    weights[indptr[i]:indptr[i + 1]] in the groups groups[...]."""
+    bm = bmesh.new()
+    try:
+        bm.from_mesh(mesh)
+        layer = bm.verts.layers.deform.active
+        if layer is None:
+            if len(groups) == 0: return
+            layer = bm.verts.layers.deform.new()
+        counts = np.diff(indptr).tolist()
+        group_list = groups.tolist()
+        weight_list = weights.tolist()
+        start = 0
+        for vert, count in zip(bm.verts, counts):
+            deform_vert = vert[layer]
+            deform_vert.clear()
+            for i in range(start, start + count):
+                deform_vert[group_list[i]] = weight_list[i]
+            start += count
+        bm.to_mesh(mesh)
+    finally:
+        bm.free()
 
 
 def depending_vertex_group_indices(context: CleanupContext) -> set[int]:
     """Return the set of vertex group indices that are used in the mesh."""
+    _, groups, weights = context.deform_weights
+    return set(np.unique(groups[weights > 0]).tolist())
+
+
+def depending_vertex_group_indices_reference(context: CleanupContext) -> set[int]:
+    """Reference implementation of `depending_vertex_group_indices` walking every vertex in Python."""
     indices = set()
 
     for vertice in context.mesh.vertices:
@@ -75,16 +230,21 @@ def depending_vertex_group_indices(context: CleanupContext) -> set[int]:
     return indices
 
 
-def depending_vertex_group_indices_with_flip(context: CleanupContext) -> set[int]:
-    """Return the set of vertex group indices that are used in the mesh. If the vertex group name is a left or right name, also add the opposite name."""
-    indices = depending_vertex_group_indices(context)
+def depending_vertex_group_indices_with_flip(context: CleanupContext, pairs: dict[str, str] | None = None) -> set[int]:
+    """Return the set of vertex group indices that are used in the mesh. If the vertex group name is a left or right name, also add the opposite name.
+    `pairs` is a precomputed L/R pair index, usually the one of the armature deforming the object."""
+    return add_flipped_indices(depending_vertex_group_indices(context), context.index_to_name, context.name_to_index, pairs)
 
-    for index in indices:
-        name = context.index_to_name[index]
-        flip_name = flip_vertex_group_name(name)
+def add_flipped_indices(indices: set[int], index_to_name: dict[int, str], name_to_index: dict[str, int], pairs: dict[str, str] | None = None) -> set[int]:
+    """Add the index of the L/R counterpart of every group in `indices` that has one."""
+    if pairs is None: pairs = {}
+
+    for index in list(indices):
+        name = index_to_name[index]
+        flip_name = pairs[name] if name in pairs else flip_vertex_group_name(name)
         
-        if flip_name is not None and flip_name in context.name_to_index:
-            indices.add(context.name_to_index[flip_name])
+        if flip_name is not None and flip_name in name_to_index:
+            indices.add(name_to_index[flip_name])
 
     return indices
 
@@ -95,93 +255,62 @@ def has_mirror_modifier(object: bpy.types.Object) -> bool:
             return True
     return False
 
-def cleanup_unused_vertex_groups(object: bpy.types.Object):
-    mesh = object.data
-    if not isinstance(mesh, bpy.types.Mesh): return
-
-    context = CleanupContext(object)
-
-    indices = depending_vertex_group_indices_with_flip(context)
-
-    for _, group in object.vertex_groups.items():
-        if context.name_to_index[group.name] not in indices:
-            object.vertex_groups.remove(group)
-    
-
-
-
-
-
-
-
-
-
-
-
-
+def remove_vertex_groups(context: CleanupContext, keep: set[int]) -> int:
+    """Remove every vertex group not in `keep` and return how many were removed.
+    Groups are removed one by one when only a few go away, otherwise the group list is rebuilt once."""
+    object = context.object
+    removing = [index for index in context.index_to_name if index not in keep]
+    if len(removing) == 0: return 0
 
+    _, groups, weights = context.deform_weights
+    kept_weights = int(np.count_nonzero(np.isin(groups, list(keep))))
 
+    if len(removing) * len(context.mesh.vertices) < kept_weights * REBUILD_COST_RATIO:
+        for index in removing:
+            object.vertex_groups.remove(object.vertex_groups[context.index_to_name[index]])
+    else:
+        rebuild_vertex_groups(context, keep)
 
+    return len(removing)
 
 
+def rebuild_vertex_groups(context: CleanupContext, keep: set[int]):
+    """Recreate the vertex group list with only the groups in `keep` and write their weights back in one pass."""
+    object = context.object
+    vertices, groups, weights = context.deform_weights
 
+    kept_groups = [group for group in object.vertex_groups if group.index in keep]
+    settings = [(group.name, group.lock_weight) for group in kept_groups]
+    active_group = object.vertex_groups.active
+    active_name = active_group.name if active_group is not None else None
 
+    remap = np.full(max(len(context.index_to_name), int(groups.max(initial=-1)) + 1), -1, dtype=np.int32)
+    for new_index, group in enumerate(kept_groups):
+        remap[group.index] = new_index
+    new_groups = remap[groups]
+    mask = new_groups >= 0
 
+    object.vertex_groups.clear()
+    for name, lock_weight in settings:
+        object.vertex_groups.new(name=name).lock_weight = lock_weight
+    if active_name in object.vertex_groups:
+        object.vertex_groups.active_index = object.vertex_groups[active_name].index
 
+    write_deform_weights(context.mesh, vertices[mask], new_groups[mask], weights[mask])
 
 
+def cleanup_unused_vertex_groups(object: bpy.types.Object, profiler: StageProfiler | None = None, pairs: dict[str, str] | None = None) -> CleanupTiming | None:
+    mesh = object.data
+    if not isinstance(mesh, bpy.types.Mesh): return None
 
+    timings = cleanup_all_unused_vertex([object], profiler, pairs)
+    return timings[0]
 
-# def cleanup_unused_vertex_groups(obj: bpy.types.Object):
-#     mesh = obj.data
-#     if not isinstance(mesh, bpy.types.Mesh):
-#         return
-    
-#     should_remove_table: dict[str, bool] = {}
 
-#     for vertex_group in obj.vertex_groups:
-#         should_remove = False
-        
-#         for vertice in mesh.vertices:
-#             for group in vertice.groups:
-#                 if group.group == vertex_group.index and group.weight > 0:
-#                     should_remove = False
-#                     break
-#                 else:
-#                     should_remove = True
-                    
-#             if should_remove == False:
-#                 break
-            
-#         if vertex_group.name not in should_remove_table:
-#             should_remove_table[vertex_group.name] = should_remove
-        
-#         if should_remove == True: continue
-
-#         match = re.search(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", vertex_group.name, re.IGNORECASE)
-
-#         if match != None:
-#             m2 = re.search("[A-Z]+", match.group(), re.IGNORECASE)
-#             if m2 != None:
-#                 flip_word = ""
-#                 if m2.group() == "LEFT":    flip_word = match.group().replace("LEFT", "RIGHT")
-#                 elif m2.group() == "Left":  flip_word = match.group().replace("Left", "Right")
-#                 elif m2.group() == "left":  flip_word = match.group().replace("left", "right")
-#                 elif m2.group() == "L":     flip_word = match.group().replace("L", "R")
-#                 elif m2.group() == "l":     flip_word = match.group().replace("l", "r")
-#                 elif m2.group() == "RIGHT": flip_word = match.group().replace("RIGHT", "LEFT")
-#                 elif m2.group() == "Right": flip_word = match.group().replace("Right", "Left")
-#                 elif m2.group() == "right": flip_word = match.group().replace("right", "left")
-#                 elif m2.group() == "R":     flip_word = match.group().replace("R", "L")
-#                 elif m2.group() == "r":     flip_word = match.group().replace("r", "l")
-                    
-#                 search_name = re.sub(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", flip_word, vertex_group.name)
-
-#                 if search_name in obj.vertex_groups.keys() and search_name not in should_remove_table:
-#                     should_remove_table[search_name] = False
-
-#     for key in should_remove_table.keys():
-#         if should_remove_table[key] == True:
-#             vg = obj.vertex_groups.get(key)
-#             if vg is not None:
-#                 obj.vertex_groups.remove(vg)
\ No newline at end of file
+def cleanup_unused_matrix_groups(matrix: "WeightMatrix", pairs: dict[str, str] | None = None) -> int:
+    """`cleanup_unused_vertex_groups` on a weight matrix: remove the groups without weights, keeping the L/R
+    counterparts of the used ones. Returns how many groups were removed."""
+    used = set(np.unique(matrix.groups[matrix.weights > 0]).tolist())
+    index_to_name = dict(enumerate(matrix.group_names))
+    name_to_index = {name: index for index, name in index_to_name.items()}
+    return matrix.remove_groups(add_flipped_indices(used, index_to_name, name_to_index, pairs))
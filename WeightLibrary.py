@@ -0,0 +1,107 @@
+"""On-disk library of transferred weights.
+
+Every entry is a pair of files named after its key: `<key>.json`, the header, and `<key>.bin`, the raw CSR arrays
+the header points into. The arrays are memory-mapped when loaded, so a library of thousands of entries is only
+read as far as the entries actually used.
+"""
+
+from pathlib import Path
+
+import bpy
+import os
+import json
+import zlib
+import hashlib
+import numpy as np
+
+from .SurfaceTransfer import world_coordinates
+from .WeightMatrix import WeightMatrix
+from .WeightSnapshot import topology_hash
+
+LIBRARY_VERSION = 1
+
+def garment_key(target_obj: bpy.types.Object) -> tuple:
+    """Topology and world-space coordinates of the garment before it is dressed."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    coords = world_coordinates(mesh, target_obj.matrix_world).astype(np.float32)
+    return (len(mesh.vertices), topology_hash(mesh), zlib.crc32(coords.tobytes()))
+
+def body_key(source: tuple, armature: bpy.types.Object) -> tuple:
+    """Geometry, pose and weights of the body from its `source_fingerprint`, and the bones of its armature,
+    whatever the objects are called."""
+    _, geometry, group_names, weights_crc = source
+    return (geometry, group_names, weights_crc, tuple(bone.name for bone in armature.data.bones)) # type: ignore
+
+def library_key(garment: tuple, body: tuple, options: tuple) -> str:
+    return hashlib.sha1(repr((LIBRARY_VERSION, garment, body, options)).encode()).hexdigest()
+
+
+class WeightLibrary:
+    def __init__(self, directory: str):
+        self.directory = Path(bpy.path.abspath(directory))
+
+    def paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.json", self.directory / f"{key}.bin"
+
+    def load(self, key: str) -> WeightMatrix | None:
+        """The weights of the entry of the key, their arrays memory-mapped. None when there is no entry
+        or it was written by another version."""
+        header_path, data_path = self.paths(key)
+        if not header_path.exists() or not data_path.exists(): return None
+        with open(header_path, encoding="utf-8") as file:
+            header = json.load(file)
+        if header.get("version") != LIBRARY_VERSION: return None
+
+        arrays = {
+            name: np.memmap(data_path, dtype=layout["dtype"], mode="r", offset=layout["offset"], shape=(layout["length"],))
+            if layout["length"] > 0 else np.empty(0, dtype=layout["dtype"])
+            for name, layout in header["arrays"].items()
+        }
+        group_names = header["group_names"]
+        return WeightMatrix(group_names, header.get("locked", [False] * len(group_names)), arrays["indptr"], arrays["groups"], arrays["weights"])
+
+    def store(self, key: str, obj: bpy.types.Object, matrix: WeightMatrix | None = None):
+        """Write the weights of the object as the entry of the key, from `matrix` when it already holds them."""
+        if matrix is None:
+            matrix = WeightMatrix.from_object(obj)
+        arrays = {"indptr": matrix.indptr, "groups": matrix.groups, "weights": matrix.weights}
+
+        layouts, offset = {}, 0
+        for name, array in arrays.items():
+            layouts[name] = {"dtype": array.dtype.str, "offset": offset, "length": len(array)}
+            offset += array.nbytes
+        header = {
+            "version": LIBRARY_VERSION,
+            "object": obj.name,
+            "group_names": matrix.group_names,
+            "locked": matrix.locked,
+            "arrays": layouts,
+        }
+
+        # write to temporary files first, so readers never see half an entry
+        self.directory.mkdir(parents=True, exist_ok=True)
+        header_path, data_path = self.paths(key)
+        temporary = f".{os.getpid()}.tmp"
+        with open(str(data_path) + temporary, "wb") as file:
+            for array in arrays.values():
+                file.write(array.tobytes())
+        with open(str(header_path) + temporary, "w", encoding="utf-8") as file:
+            json.dump(header, file)
+        os.replace(str(data_path) + temporary, data_path)
+        os.replace(str(header_path) + temporary, header_path)
+
+
+def apply_library_entry(obj: bpy.types.Object, entry: WeightMatrix, source_group_names: list[str]) -> bool:
+    """Replace the body groups of the object by the weights of the entry. False when the entry does not fit the mesh."""
+    mesh = obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    if entry.vertex_count != len(mesh.vertices): return False
+
+    matrix = WeightMatrix.from_object(obj)
+    # groups of the body the entry does not have would have been removed by the cleanup
+    source_names, entry_names = set(source_group_names), set(entry.group_names)
+    matrix.remove_groups({index for index, name in enumerate(matrix.group_names) if name not in source_names or name in entry_names})
+    matrix.assign(entry)
+    matrix.commit(obj)
+    return True
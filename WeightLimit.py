@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+
+import bpy
+import numpy as np
+
+from .WeightMatrix import WeightMatrix
+
+@dataclass
+class InfluenceLimits:
+    # most groups weighting one vertex, 0 for no limit
+    max_influences: int = 0
+    # weights below this are removed, unless that would leave the vertex without any
+    threshold: float = 0.0
+    # scale the weights of every vertex to sum to 1
+    normalize: bool = False
+    # round the weights to steps of 1 / (2 ** bits - 1), 0 to keep them as they are
+    quantize_bits: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_influences > 0 or self.threshold > 0 or self.normalize or self.quantize_bits > 0
+
+
+def rank_in_vertex(vertices: np.ndarray, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Order the entries by vertex, then by descending `keys`. Returns the order and the rank of every ordered entry within its vertex."""
+    order = np.lexsort((-keys, vertices))
+    sorted_vertices = vertices[order]
+    starts = np.flatnonzero(np.r_[True, sorted_vertices[1:] != sorted_vertices[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    ranks = np.arange(len(order)) - np.repeat(starts, counts)
+    return order, ranks
+
+def limit_weights(vertices: np.ndarray, weights: np.ndarray, limits: InfluenceLimits) -> np.ndarray:
+    """Apply the limits to flat (vertex, weight) entries of one mesh. Returns the new weights, 0 for pruned entries."""
+    weights = weights.astype(np.float64)
+    if len(weights) == 0: return weights.astype(np.float32)
+    order, ranks = rank_in_vertex(vertices, weights)
+    keep = np.zeros(len(weights), dtype=bool)
+    keep[order] = True
+
+    if limits.threshold > 0:
+        # the strongest influence stays, a vertex without weights would not follow any bone
+        keep[order] = (weights[order] >= limits.threshold) | (ranks == 0)
+    if limits.max_influences > 0:
+        keep[order[ranks >= limits.max_influences]] = False
+    weights = np.where(keep & (weights > 0), weights, 0.0)
+
+    if limits.normalize or limits.quantize_bits > 0:
+        sums = np.bincount(vertices, weights=weights, minlength=int(vertices.max()) + 1)
+        if limits.normalize:
+            weights = np.where(weights > 0, weights / np.where(sums > 0, sums, 1.0)[vertices], 0.0)
+            sums = np.where(sums > 0, 1.0, 0.0)
+
+    if limits.quantize_bits > 0:
+        steps = float(2 ** limits.quantize_bits - 1)
+        scaled = weights * steps
+        quantized = np.floor(scaled)
+        # hand the steps lost to rounding down to the largest remainders, so each vertex keeps its total
+        missing = np.rint(sums * steps) - np.bincount(vertices, weights=quantized, minlength=len(sums))
+        order, ranks = rank_in_vertex(vertices, np.where(weights > 0, scaled - quantized, -1.0))
+        quantized[order] += ranks < missing[vertices[order]]
+        weights = quantized / steps
+
+    return weights.astype(np.float32)
+
+
+def deform_group_indices(obj: bpy.types.Object, group_names: list[str] | None = None) -> list[int]:
+    """Groups deforming the object: those named after a deform bone of its armature, or all groups without one.
+    Indices into `group_names` when given, otherwise into the vertex groups of the object."""
+    if group_names is None:
+        group_names = [group.name for group in obj.vertex_groups]
+    armature = obj.find_armature()
+    if armature is None:
+        return list(range(len(group_names)))
+    bones = {bone.name for bone in armature.data.bones if bone.use_deform} # type: ignore
+    return [index for index, name in enumerate(group_names) if name in bones]
+
+def limit_matrix_groups(obj: bpy.types.Object, matrix: WeightMatrix, limits: InfluenceLimits) -> int:
+    """Limit the deform weights in the weight matrix of the object and return how many influences were removed.
+    Groups not deforming the object are left as they are."""
+    deform_groups = deform_group_indices(obj, matrix.group_names)
+    if not limits.enabled or len(deform_groups) == 0: return 0
+
+    vertices, groups, weights = matrix.entries()
+    deforming = np.isin(groups, deform_groups) & (weights > 0)
+    vertices, groups, weights = vertices[deforming], groups[deforming], weights[deforming]
+
+    limited = limit_weights(vertices, weights, limits)
+    kept = limited > 0
+    matrix.replace(vertices[kept], groups[kept], limited[kept], deform_groups)
+
+    return int(len(kept) - kept.sum())
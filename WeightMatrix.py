@@ -0,0 +1,140 @@
+from typing import Sequence
+from dataclasses import dataclass
+
+import bpy
+import numpy as np
+
+from .VertexCleaner import read_deform_weights, replace_deform_weights
+
+def csr_indptr(vertices: np.ndarray, vertex_count: int) -> np.ndarray:
+    """Row pointers of entries ordered by vertex: the entries of vertex i are [indptr[i], indptr[i + 1])."""
+    indptr = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(vertices, minlength=vertex_count)[:vertex_count], out=indptr[1:])
+    return indptr
+
+@dataclass
+class WeightMatrix:
+    """The deform weights of a mesh in CSR layout: the weights of vertex i are weights[indptr[i]:indptr[i + 1]]
+    in the groups group_names[groups[...]]. Loaded from an object once, changed in place by the dressing stages
+    and written back with `commit`, so every stage works on arrays instead of going through Blender."""
+    group_names: list[str]
+    locked: list[bool]
+    indptr: np.ndarray
+    groups: np.ndarray
+    weights: np.ndarray
+
+    @classmethod
+    def from_entries(
+        cls, group_names: Sequence[str], locked: Sequence[bool], vertex_count: int,
+        vertices: np.ndarray, groups: np.ndarray, weights: np.ndarray
+    ) -> "WeightMatrix":
+        """Matrix of flat (vertex, group, weight) entries in any order."""
+        matrix = cls(list(group_names), list(locked), np.zeros(vertex_count + 1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        matrix.set_entries(vertices, groups, weights)
+        return matrix
+
+    @classmethod
+    def from_object(cls, obj: bpy.types.Object) -> "WeightMatrix":
+        mesh = obj.data
+        assert isinstance(mesh, bpy.types.Mesh)
+        vertices, groups, weights = read_deform_weights(mesh)
+        # the deform data can still list groups that were removed from the object
+        valid = groups < len(obj.vertex_groups)
+        return cls.from_entries(
+            [group.name for group in obj.vertex_groups], [group.lock_weight for group in obj.vertex_groups], len(mesh.vertices),
+            vertices[valid], groups[valid], weights[valid]
+        )
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.indptr) - 1
+
+    def vertices(self) -> np.ndarray:
+        """Vertex of every entry."""
+        return np.repeat(np.arange(self.vertex_count, dtype=np.int32), np.diff(self.indptr))
+
+    def entries(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Flat (vertex, group, weight) arrays, ordered by vertex."""
+        return self.vertices(), self.groups, self.weights
+
+    def set_entries(self, vertices: np.ndarray, groups: np.ndarray, weights: np.ndarray):
+        order = np.argsort(vertices, kind="stable")
+        self.indptr = csr_indptr(vertices, self.vertex_count)
+        self.groups = groups[order].astype(np.int32)
+        self.weights = weights[order].astype(np.float32)
+
+    def group_index(self, name: str) -> int:
+        """Index of the group `name`, appended as an unlocked group when missing."""
+        if name in self.group_names:
+            return self.group_names.index(name)
+        self.group_names.append(name)
+        self.locked.append(False)
+        return len(self.group_names) - 1
+
+    def replace(
+        self, vertices: np.ndarray, groups: np.ndarray, weights: np.ndarray,
+        replaced_groups: Sequence[int] | np.ndarray = (), replaced_vertices: np.ndarray | None = None
+    ):
+        """Drop the entries of `replaced_groups`, only at `replaced_vertices` when given, then add the new entries.
+        A new entry overwrites a kept one of the same vertex and group, like a write into the deform weights."""
+        current_vertices, current_groups, current_weights = self.entries()
+        dropped = np.isin(current_groups, np.asarray(replaced_groups, dtype=np.int32))
+        if replaced_vertices is not None:
+            dropped &= np.isin(current_vertices, replaced_vertices)
+
+        keys = current_vertices.astype(np.int64) * (len(self.group_names) + 1) + current_groups
+        new_keys = vertices.astype(np.int64) * (len(self.group_names) + 1) + groups
+        kept = ~dropped & ~np.isin(keys, new_keys)
+
+        self.set_entries(
+            np.concatenate([current_vertices[kept], vertices.astype(np.int32)]),
+            np.concatenate([current_groups[kept], groups.astype(np.int32)]),
+            np.concatenate([current_weights[kept], weights.astype(np.float32)])
+        )
+
+    def assign(self, other: "WeightMatrix"):
+        """Replace the weights of every group of `other`, a matrix of as many vertices, by its weights.
+        Its groups missing here are appended in its order, the other groups keep their weights."""
+        remap = np.array([self.group_index(name) for name in other.group_names], dtype=np.int32)
+        vertices, groups, weights = other.entries()
+        self.replace(vertices, remap[groups], weights, remap)
+
+    def remove_groups(self, keep: set[int]) -> int:
+        """Remove every group not in `keep` with its weights and return how many were removed."""
+        kept_groups = [index for index in range(len(self.group_names)) if index in keep]
+        removed = len(self.group_names) - len(kept_groups)
+        if removed == 0: return 0
+
+        remap = np.full(len(self.group_names), -1, dtype=np.int32)
+        remap[kept_groups] = np.arange(len(kept_groups), dtype=np.int32)
+        vertices, groups, weights = self.entries()
+        new_groups = remap[groups]
+        mask = new_groups >= 0
+
+        self.group_names = [self.group_names[index] for index in kept_groups]
+        self.locked = [self.locked[index] for index in kept_groups]
+        self.set_entries(vertices[mask], new_groups[mask], weights[mask])
+        return removed
+
+    def commit(self, obj: bpy.types.Object):
+        """Write the groups and weights into the object in one bulk pass, replacing all of its deform weights.
+        The vertex group list is only rebuilt when groups were removed or reordered."""
+        mesh = obj.data
+        assert isinstance(mesh, bpy.types.Mesh)
+
+        active_group = obj.vertex_groups.active
+        active_name = active_group.name if active_group is not None else None
+        current = [group.name for group in obj.vertex_groups]
+        if current != self.group_names[:len(current)]:
+            obj.vertex_groups.clear()
+            current = []
+
+        for name in self.group_names[len(current):]:
+            obj.vertex_groups.new(name=name)
+        for group, locked in zip(obj.vertex_groups, self.locked):
+            if group.lock_weight != locked:
+                group.lock_weight = locked
+        if active_name in self.group_names:
+            obj.vertex_groups.active_index = self.group_names.index(active_name)
+
+        replace_deform_weights(mesh, self.indptr, self.groups, self.weights)
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+
+import bpy
+import numpy as np
+
+from .SurfaceTransfer import expand_ranges
+from .WeightMatrix import WeightMatrix, csr_indptr
+
+# upper bound of the temporary (edges x groups) array gathered for one chunk of groups
+SMOOTH_CHUNK_BYTES = 64 * 1024 * 1024
+
+@dataclass
+class VertexAdjacency:
+    """Edge adjacency of a mesh in CSR layout: the neighbours of vertex i are neighbours[indptr[i]:indptr[i + 1]]."""
+    vertex_count: int
+    indptr: np.ndarray
+    neighbours: np.ndarray
+
+    @classmethod
+    def from_mesh(cls, mesh: bpy.types.Mesh) -> "VertexAdjacency":
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+        return cls.from_edges(len(mesh.vertices), edges.reshape(-1, 2))
+
+    @classmethod
+    def from_edges(cls, vertex_count: int, edges: np.ndarray) -> "VertexAdjacency":
+        """Adjacency of an (edges x 2) array of vertex indices."""
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(sources, kind="stable")
+
+        return cls(vertex_count, csr_indptr(sources, vertex_count), targets[order])
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def neighbour_sum(self, values: np.ndarray) -> np.ndarray:
+        """Sum of the rows of `values` over the neighbours of every vertex. Vertices without neighbours get 0."""
+        sums = np.zeros_like(values)
+        connected = self.degrees > 0
+        if connected.any():
+            sums[connected] = np.add.reduceat(values[self.neighbours], self.indptr[:-1][connected], axis=0)
+        return sums
+
+    def grow(self, vertices: np.ndarray, rings: int) -> np.ndarray:
+        """The sorted vertices together with every vertex up to `rings` edges away from them."""
+        grown = np.unique(vertices)
+        for _ in range(rings):
+            neighbours = self.neighbours[expand_ranges(self.indptr[grown], self.degrees[grown])]
+            grown = np.union1d(grown, neighbours)
+        return grown
+
+    def region(self, vertices: np.ndarray) -> tuple[np.ndarray, "VertexAdjacency"]:
+        """Adjacency of the sorted `vertices` to their neighbours, renumbered over `rows`: the vertices and their
+        neighbours. Only the given vertices have edges, so the neighbours around them stay fixed when smoothing."""
+        counts = self.degrees[vertices]
+        neighbours = self.neighbours[expand_ranges(self.indptr[vertices], counts)]
+        rows = np.union1d(vertices, neighbours)
+
+        local_counts = np.zeros(len(rows), dtype=np.int64)
+        local_counts[np.searchsorted(rows, vertices)] = counts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(local_counts, out=indptr[1:])
+        return rows, VertexAdjacency(len(rows), indptr, np.searchsorted(rows, neighbours).astype(self.neighbours.dtype))
+
+
+def smoothing_passes(group_count: int, per_group: bool) -> int:
+    """Passes of one smoothing: one, or one per vertex group like earlier versions, which ran the operator
+    smoothing every group once for each group of the mesh."""
+    return max(1, group_count) if per_group else 1
+
+def smooth_weight_matrix(weights: np.ndarray, adjacency: VertexAdjacency, factor: float, repeat: int = 1) -> np.ndarray:
+    """Smooth a (vertices x groups) weight matrix like `vertex_group_smooth`: every vertex with neighbours is blended
+    towards the average of its neighbours by `factor`, `repeat` times."""
+    degrees = adjacency.degrees.astype(weights.dtype)[:, None]
+    connected = degrees[:, 0] > 0
+    degrees[~connected] = 1
+
+    for _ in range(repeat):
+        average = adjacency.neighbour_sum(weights) / degrees
+        smoothed = np.clip(weights * (1.0 - factor) + average * factor, 0.0, 1.0)
+        weights = np.where(connected[:, None], smoothed, weights)
+
+    return weights
+
+
+def smooth_weight_entries(
+    vertices: np.ndarray, groups: np.ndarray, weights: np.ndarray, adjacency: VertexAdjacency, smoothing: list[int],
+    factor: float, repeat: int = 1, smoothed_rows: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Smooth the groups `smoothing` of flat (vertex, group, weight) entries over the adjacency, a chunk of groups at a
+    time. Returns the smoothed entries of those groups without zero weights, only for `smoothed_rows` when given."""
+    chunk_size = max(1, SMOOTH_CHUNK_BYTES // max(1, len(adjacency.neighbours) * 4))
+    results = [(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))]
+    for start in range(0, len(smoothing), chunk_size):
+        chunk = np.array(smoothing[start:start + chunk_size], dtype=np.int32)
+        columns = np.full(int(chunk.max()) + 1, -1, dtype=np.int32)
+        columns[chunk] = np.arange(len(chunk), dtype=np.int32)
+
+        selected = (groups <= chunk.max()) & (columns[np.minimum(groups, chunk.max())] >= 0)
+        matrix = np.zeros((adjacency.vertex_count, len(chunk)), dtype=np.float32)
+        matrix[vertices[selected], columns[groups[selected]]] = weights[selected]
+
+        matrix = smooth_weight_matrix(matrix, adjacency, factor, repeat)
+        if smoothed_rows is not None:
+            matrix[~smoothed_rows] = 0.0
+
+        rows, cols = np.nonzero(matrix)
+        results.append((rows.astype(np.int32), chunk[cols], matrix[rows, cols]))
+
+    return (
+        np.concatenate([result[0] for result in results]),
+        np.concatenate([result[1] for result in results]),
+        np.concatenate([result[2] for result in results])
+    )
+
+
+def smooth_matrix_groups(
+    matrix: WeightMatrix, factor: float, repeat: int = 1, adjacency: VertexAdjacency | None = None,
+    vertex_indices: np.ndarray | None = None, mesh: bpy.types.Mesh | None = None
+):
+    """Smooth every unlocked group of the weight matrix at once, over `adjacency` or the edges of `mesh`.
+    With sorted `vertex_indices` only those vertices are smoothed, against the current weights of their neighbours."""
+    if adjacency is None:
+        assert mesh is not None
+        adjacency = VertexAdjacency.from_mesh(mesh)
+
+    vertices, groups, weights = matrix.entries()
+    rows = None
+    smoothed_rows = None
+    if vertex_indices is not None:
+        # work on the rows of the region and its neighbours only
+        rows, adjacency = adjacency.region(vertex_indices)
+        local = np.full(matrix.vertex_count, -1, dtype=np.int32)
+        local[rows] = np.arange(len(rows), dtype=np.int32)
+        inside = local[vertices] >= 0
+        vertices, groups, weights = local[vertices[inside]], groups[inside], weights[inside]
+        smoothed_rows = np.isin(rows, vertex_indices)
+
+    used = set(np.unique(groups).tolist())
+    smoothing = [index for index, locked in enumerate(matrix.locked) if not locked and index in used]
+    if len(smoothing) == 0: return
+
+    smoothed_vertices, smoothed_groups, smoothed_weights = smooth_weight_entries(
+        vertices, groups, weights, adjacency, smoothing, factor, repeat, smoothed_rows
+    )
+    if rows is not None:
+        smoothed_vertices = rows[smoothed_vertices].astype(np.int32)
+
+    # zero weights are removed, like the operator does
+    matrix.replace(smoothed_vertices, smoothed_groups, smoothed_weights, smoothing, vertex_indices)
+
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+
+import bpy
+import io
+import zlib
+import numpy as np
+
+from .WeightMatrix import WeightMatrix
+from .Fingerprint import FINGERPRINT_PROPERTY, REST_POSITION_ATTRIBUTE
+
+# custom property holding the weight snapshot taken when the object was undressed
+SNAPSHOT_PROPERTY = "kiseru_weight_snapshot"
+SNAPSHOT_VERSION = 1
+
+def topology_hash(mesh: bpy.types.Mesh) -> int:
+    """Checksum of the element counts and the face corners, which the vertex indices of a snapshot depend on."""
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    counts = np.array([len(mesh.vertices), len(mesh.edges), len(mesh.polygons)], dtype=np.int64)
+    return zlib.crc32(loops.tobytes(), zlib.crc32(counts.tobytes()))
+
+
+@dataclass
+class WeightSnapshot:
+    """The deform weights of a dressed object with what is needed to dress it again: its armature, the topology
+    the vertex indices of the weights belong to and its dress up fingerprint and rest positions."""
+    armature: str
+    weights: WeightMatrix
+    topology: int
+    fingerprint: str
+    rest_positions: np.ndarray | None
+
+    @classmethod
+    def from_object(cls, obj: bpy.types.Object, armature: bpy.types.Object) -> "WeightSnapshot":
+        mesh = obj.data
+        assert isinstance(mesh, bpy.types.Mesh)
+
+        rest_positions = None
+        attribute = mesh.attributes.get(REST_POSITION_ATTRIBUTE)
+        if attribute is not None:
+            rest_positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            attribute.data.foreach_get("vector", rest_positions) # type: ignore
+
+        return cls(armature.name, WeightMatrix.from_object(obj), topology_hash(mesh), obj.get(FINGERPRINT_PROPERTY, ""), rest_positions)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        arrays = {"rest_positions": self.rest_positions} if self.rest_positions is not None else {}
+        matrix = self.weights
+        np.savez(
+            buffer, version=np.int32(SNAPSHOT_VERSION), armature=np.str_(self.armature), group_names=np.array(matrix.group_names, dtype=str),
+            locked=np.array(matrix.locked, dtype=bool), indptr=matrix.indptr, groups=matrix.groups, weights=matrix.weights,
+            topology=np.int64(self.topology), fingerprint=np.str_(self.fingerprint), **arrays
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WeightSnapshot | None":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            if int(arrays["version"]) != SNAPSHOT_VERSION: return None
+            group_names = arrays["group_names"].tolist()
+            # snapshots taken before the locks were kept
+            locked = arrays["locked"].tolist() if "locked" in arrays else [False] * len(group_names)
+            matrix = WeightMatrix(group_names, locked, arrays["indptr"], arrays["groups"], arrays["weights"])
+            return cls(
+                str(arrays["armature"]), matrix, int(arrays["topology"]), str(arrays["fingerprint"]),
+                arrays["rest_positions"] if "rest_positions" in arrays else None
+            )
+
+
+def store_weight_snapshot(obj: bpy.types.Object, armature: bpy.types.Object):
+    obj[SNAPSHOT_PROPERTY] = WeightSnapshot.from_object(obj, armature).to_bytes()
+
+def load_weight_snapshot(obj: bpy.types.Object) -> WeightSnapshot | None:
+    """The snapshot of the object, None when there is none or the topology changed since it was taken."""
+    data = obj.get(SNAPSHOT_PROPERTY)
+    if not isinstance(data, bytes) or not isinstance(obj.data, bpy.types.Mesh): return None
+    snapshot = WeightSnapshot.from_bytes(data)
+    if snapshot is None or snapshot.topology != topology_hash(obj.data): return None
+    return snapshot
+
+def has_weight_snapshot(obj: bpy.types.Object) -> bool:
+    return SNAPSHOT_PROPERTY in obj
+
+def restore_weight_snapshot(obj: bpy.types.Object, snapshot: WeightSnapshot):
+    """Write the weights of the snapshot back in bulk, recreating its groups in their order."""
+    mesh = obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    matrix = WeightMatrix.from_object(obj)
+    matrix.assign(snapshot.weights)
+    matrix.commit(obj)
+
+    if snapshot.rest_positions is not None:
+        attribute = mesh.attributes.get(REST_POSITION_ATTRIBUTE)
+        if attribute is None:
+            attribute = mesh.attributes.new(REST_POSITION_ATTRIBUTE, "FLOAT_VECTOR", "POINT")
+        attribute.data.foreach_set("vector", snapshot.rest_positions) # type: ignore
+    if len(snapshot.fingerprint):
+        obj[FINGERPRINT_PROPERTY] = snapshot.fingerprint
@@ -1,34 +1,47 @@
-from typing import Sequence, Callable
-from dataclasses import dataclass
+from typing import Sequence, Callable, Generator
+from dataclasses import dataclass, field, astuple, replace
 
 import bpy
+import gc
 import time
 
-from .VertexCleaner import cleanup_unused_vertex_groups, cleanup_all_vertex
+from .VertexCleaner import cleanup_unused_matrix_groups, cleanup_all_vertex, armature_flip_pair_index, read_deform_weights
+from .SurfaceTransfer import SourceSurface, transfer_surface_matrix, combine_surfaces, world_coordinates
+from .SurfaceCache import surface_cache
+from .GroupPrefilter import relevant_group_names
+from .WeightLimit import InfluenceLimits, limit_matrix_groups
+from .Symmetry import symmetric_halves, is_symmetric_surface, mirror_matrix_weights
+from .WeightSnapshot import store_weight_snapshot, load_weight_snapshot, restore_weight_snapshot
+from .WeightLibrary import WeightLibrary, garment_key, body_key, library_key, apply_library_entry
+from .TransferWorker import WeightWorkers, workers_available, garment_matrix, compute_garment_weights
+from .WeightSmooth import smooth_matrix_groups, smoothing_passes, VertexAdjacency
+from .WeightMatrix import WeightMatrix
+from .Profiler import StageProfiler, profile_stage, resident_mb
+from .MemoryBudget import BatchReport, expected_groups, garment_cost, plan_batches
+from .Fingerprint import ChangeReport, source_fingerprint, is_unchanged, store_fingerprint, clear_fingerprint, store_rest_positions, moved_vertices
 
 def unapply_cloth(obj):
+    # keep the weights to dress up again from
+    armature = obj.find_armature()
+    if armature is not None and obj.type == "MESH" and len(obj.vertex_groups):
+        store_weight_snapshot(obj, armature)
+
     # remove armature modifier
     remove_all_armature_modifier(obj)
     cleanup_all_vertex([obj])
 
     obj.parent = None # type: ignore
+    clear_fingerprint(obj)
 
-def smooth_weight(obj: bpy.types.Object, factor: float):
-    bpy.context.view_layer.objects.active = obj
-
-    bpy.ops.object.mode_set(mode='WEIGHT_PAINT')
-    
-    for group in obj.vertex_groups:
-        obj.vertex_groups.active_index = group.index
-        bpy.ops.object.vertex_group_smooth(group_select_mode="ALL", factor=factor, repeat=1, expand=0.0)
-
-    bpy.ops.object.mode_set(mode='OBJECT')
+def apply_transforms(obj: bpy.types.Object):
+    mesh = obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+    matrix = obj.matrix_world.copy()
 
+    # one batched transform of the vertices, shape keys and custom normals. The face winding is kept under a
+    # mirroring matrix, like transform_apply does
+    mesh.transform(matrix, shape_keys=True)
 
-def apply_transforms(obj: bpy.types.Object):
-    matrix = obj.matrix_world
-    for vert in obj.data.vertices: # type: ignore
-        vert.co = matrix @ vert.co
     obj.matrix_world = [
         [1, 0, 0, 0],
         [0, 1, 0, 0],
@@ -42,12 +55,37 @@ def remove_all_armature_modifier(obj: bpy.types.Object):
             obj.modifiers.remove(modifier)
 
 def make_armature_parent(objs: list[bpy.types.Object], armature: bpy.types.Object):
-    bpy.ops.object.select_all(action='DESELECT')
+    """Parent every object to the armature with an Armature modifier, like `parent_set(type='ARMATURE')`
+    but through the data API only, without selection or operator calls."""
+    parent_inverse = armature.matrix_world.inverted()
+
     for obj in objs:
-        obj.select_set(True)
-    
-    bpy.context.view_layer.objects.active = armature
-    bpy.ops.object.parent_set(type='ARMATURE')
+        obj.parent = armature
+        obj.parent_type = "OBJECT"
+        obj.matrix_parent_inverse = parent_inverse
+
+        if any(modifier.type == "ARMATURE" and modifier.object == armature for modifier in obj.modifiers):
+            continue
+        modifier = obj.modifiers.new(name="Armature", type="ARMATURE")
+        modifier.object = armature # type: ignore
+
+    bpy.context.view_layer.update()
+
+def redress_from_snapshot(objs: Sequence[bpy.types.Object]) -> list[bpy.types.Object]:
+    """Dress up the objects again with the weights they had when undressed, without any transfer.
+    Returns the objects dressed; objects without a valid snapshot or whose armature is gone are left as they are."""
+    dressed: dict[str, list[bpy.types.Object]] = {}
+    for obj in objs:
+        snapshot = load_weight_snapshot(obj)
+        if snapshot is None: continue
+        armature = bpy.data.objects.get(snapshot.armature)
+        if armature is None or armature.type != "ARMATURE": continue
+        restore_weight_snapshot(obj, snapshot)
+        dressed.setdefault(armature.name, []).append(obj)
+
+    for name, armature_objs in dressed.items():
+        make_armature_parent(armature_objs, bpy.data.objects[name])
+    return [obj for armature_objs in dressed.values() for obj in armature_objs]
 
 
 def find_armature(source_obj: bpy.types.Object):
@@ -55,6 +93,19 @@ def find_armature(source_obj: bpy.types.Object):
     if source_obj.parent.type == "ARMATURE": return source_obj.parent
     return find_armature(source_obj.parent)
 
+# object property holding the layer of a garment, 0 right on the body
+LAYER_PROPERTY = "kiseru_layer"
+
+def garment_layer(obj: bpy.types.Object) -> int:
+    # the property registered by the panel, or a custom property of the same name when the add-on is not registered
+    return int(getattr(obj, LAYER_PROPERTY, obj.get(LAYER_PROPERTY, 0)))
+
+def set_garment_layer(obj: bpy.types.Object, layer: int):
+    if hasattr(obj, LAYER_PROPERTY):
+        setattr(obj, LAYER_PROPERTY, layer)
+    else:
+        obj[LAYER_PROPERTY] = layer
+
 def applicable_meshes(target_objs: Sequence[bpy.types.Object]) -> Sequence[bpy.types.Object]:
     res = []
 
@@ -70,34 +121,123 @@ class ClothApplyOptions:
     clean: bool
     apply_transform: bool
     message_updator: Callable[[str], None]
+    # "OPERATOR" uses bpy.ops.object.data_transfer, "NATIVE" interpolates on a BVH tree of the source
+    transfer_engine: str = "OPERATOR"
+    # records the time and cost of every stage when set
+    profiler: StageProfiler | None = None
+    # dress up every target again, even those unchanged since their last dress up
+    force: bool = False
+    # collects the names of the skipped and recomputed targets when set
+    change_report: ChangeReport | None = None
+    # transfer only the groups weighting the body near each target. Only used with `clean`, whose result it matches:
+    # targets further than `prefilter_tolerance` from the body are searched as far as their furthest vertex
+    prefilter: bool = False
+    prefilter_tolerance: float = 0.1
+    # influence limit, threshold, normalization and quantization applied after smoothing
+    limits: InfluenceLimits = field(default_factory=InfluenceLimits)
+    # with the native engine, compute only the +X half of garments symmetric like the body and mirror the other half
+    symmetric: bool = False
+    # load the weights of garments already in this library instead of transferring them, and store the others
+    library: WeightLibrary | None = None
+    # with the native engine and more than one, transfer and smooth in that many background Blender processes
+    workers: int = 0
+    # with the native engine, dress the garments of higher layers from the body and the garments of lower layers,
+    # each layer favoured by `layer_offset` over the one below it
+    layered: bool = False
+    layer_offset: float = 0.0
+    # dress the targets in batches whose estimated memory fits this many megabytes, one batch after the other. 0 for all at once
+    memory_budget_mb: int = 0
+    # smooth once per vertex group of the target instead of once, what earlier versions did
+    smooth_per_group: bool = False
+
+    def fingerprint(self) -> tuple:
+        """The options that change the resulting weights."""
+        return (
+            round(self.smooth, 6), self.clean, self.apply_transform, self.transfer_engine, astuple(self.limits), self.symmetric,
+            self.layered, round(self.layer_offset, 6), self.smooth_per_group
+        )
 
 def transfer_weights(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions):
-    # Select the source object
-    bpy.ops.object.select_all(action='DESELECT')
-    source_obj.select_set(True)
-    bpy.context.view_layer.objects.active = source_obj
+    if options.transfer_engine == "NATIVE":
+        transfer_weights_native(source_obj, target_objs, options)
+    else:
+        transfer_weights_operator(source_obj, target_objs, options)
 
+def transfer_weights_native(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions):
+    options.message_updator("Transfering weights...")
+
+    surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
     for target_obj in target_objs:
-        target_obj.select_set(True)
+        matrix = WeightMatrix.from_object(target_obj)
+        transfer_surface_matrix(surface, target_obj, matrix)
+        matrix.commit(target_obj)
+
+def create_relevant_groups(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions) -> bool:
+    """Create on every target the source groups that can weight it, so the transfer does not need to create the others.
+    Returns False when a target could not be filtered and every group has to be transferred."""
+    surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
+    armature = find_armature(source_obj)
+    pairs = armature_flip_pair_index(armature) if armature is not None else None
+
+    relevant = [relevant_group_names(surface, target_obj, options.prefilter_tolerance, pairs) for target_obj in target_objs]
+    if any(names is None for names in relevant): return False
 
+    for target_obj, names in zip(target_objs, relevant):
+        for name in names: # type: ignore
+            if target_obj.vertex_groups.get(name) is None:
+                target_obj.vertex_groups.new(name=name)
+    return True
+
+def transfer_weights_operator(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions, use_create: bool = True):
     options.message_updator("Transfering weights...")
 
-    # Transfer weights
-    bpy.ops.object.data_transfer(
+    # the operator reads the source and targets from the context, which is overridden rather than the selection
+    # of the user changed
+    selected = [source_obj] + list(target_objs)
+    override = {"active_object": source_obj, "object": source_obj, "selected_objects": selected, "selected_editable_objects": selected}
+    transfer = dict(
         data_type='VGROUP_WEIGHTS',
-        use_create=True,
+        use_create=use_create,
         layers_select_src="ALL",
         layers_select_dst='NAME',
         vert_mapping="POLYINTERP_NEAREST",
         mix_mode="REPLACE"
     )
+    if hasattr(bpy.context, "temp_override"):
+        with bpy.context.temp_override(**override):
+            bpy.ops.object.data_transfer(**transfer)
+    else:
+        # before Blender 3.2 the override is passed to the operator
+        bpy.ops.object.data_transfer(override, **transfer)
 
-    # Deselect the target objects
-    for target_obj in target_objs:
-        target_obj.select_set(False)
 
+@dataclass
+class ClothProgress:
+    message: str
+    done: int
+    total: int
+    # nothing to do on this thread until other processes finish, the caller should give the time to something else
+    waiting: bool = False
 
-def apply_cloth(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions) -> bool:
+    @property
+    def factor(self) -> float:
+        return self.done / self.total if self.total > 0 else 1.0
+
+
+def run_source_fingerprint(source_obj: bpy.types.Object, options: ClothApplyOptions) -> tuple | None:
+    """Fingerprint of the source for one run, from its cached surface. None when the run is forced and has no
+    library to key, since nothing is compared with it then."""
+    if options.force and options.library is None: return None
+    with profile_stage(options.profiler, "Build source surface", [source_obj]):
+        surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
+    return source_fingerprint(source_obj, surface)
+
+def apply_cloth_steps(
+    source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions, source: tuple | None = None
+) -> Generator[ClothProgress, None, bool]:
+    """Dress up the targets one small step at a time. Each step is announced with its progress before it runs,
+    so the caller can spread the work over several timer ticks or stop in between. Returns True when every step ran.
+    `source` is the fingerprint of the source when the caller already computed it for the run."""
     # filter target objects with mesh type
     target_objs = list(filter(lambda obj: obj.type == "MESH", target_objs))
     if source_obj.parent is None or len(target_objs) < 1: return False
@@ -105,40 +245,440 @@ def apply_cloth(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Ob
     armature = find_armature(source_obj)
     if armature is None or armature.type != "ARMATURE": return False
 
+    # layered garments need the garments below them in the same run, so they are not split
+    native = options.transfer_engine == "NATIVE"
+    if options.memory_budget_mb > 0 and len(target_objs) > 1 and not (options.layered and native):
+        return (yield from apply_cloth_batches_steps(source_obj, target_objs, options))
+
+    # skip the targets dressed with the same body and options whose geometry did not change since
+    # layered garments depend on the garments below them, so they are all dressed again
+    layered = options.layered and native
+    if source is None:
+        source = run_source_fingerprint(source_obj, options)
+    option_key = options.fingerprint()
+    if source is not None and not options.force and not layered:
+        skipped = [obj for obj in target_objs if is_unchanged(obj, armature, source, option_key)]
+        target_objs = [obj for obj in target_objs if obj not in skipped]
+        if options.change_report is not None:
+            options.change_report.skipped.extend(obj.name for obj in skipped)
+    if options.change_report is not None:
+        options.change_report.recomputed.extend(obj.name for obj in target_objs)
+    if len(target_objs) < 1: return True
+
+    # key the targets in the library before anything changes their geometry
+    # the key of a layered garment would have to cover the garments below it as well
+    library = options.library if not layered else None
+    library_keys = {}
+    if library is not None:
+        body = body_key(source, armature) # type: ignore
+        library_keys = {obj.name: library_key(garment_key(obj), body, option_key) for obj in target_objs}
+
+    def computing_steps(count: int) -> int:
+        """Steps from the transfer on for `count` targets."""
+        steps = (count if native else 1) if count > 0 else 0
+        if options.clean: steps += count
+        if options.smooth > 0.01: steps += count
+        if options.limits.enabled: steps += count
+        if library is not None: steps += count
+        # the write of the weight matrices
+        steps += count
+        return steps
+
+    count = len(target_objs)
+    total = 1 + computing_steps(count)
+    if options.clean: total += count
+    if options.apply_transform: total += count
+    if library is not None: total += count
+    done = 0
+
     # remove all armature modifier
     if options.clean:
         for i, target_mesh in enumerate(target_objs):
-            remove_all_armature_modifier(target_mesh)
-            options.message_updator(f"Remove all armature modifier from '{target_mesh.name}' ({i+1} / {len(target_objs)})")
+            yield ClothProgress(f"Remove all armature modifier from '{target_mesh.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Remove armature modifiers", [target_mesh]):
+                remove_all_armature_modifier(target_mesh)
+            done += 1
 
     # apply transform
     if options.apply_transform:
         for i, target_obj in enumerate(target_objs):
-            apply_transforms(target_obj)
-            options.message_updator(f"Apply transform to '{target_obj.name}' ({i+1} / {len(target_objs)})")
+            yield ClothProgress(f"Apply transform to '{target_obj.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Apply transform", [target_obj]):
+                apply_transforms(target_obj)
+            done += 1
 
     # make every target objects to armature children
-    make_armature_parent(target_objs, armature)
-    
+    yield ClothProgress(f"Parent to '{armature.name}'", done, total)
+    with profile_stage(options.profiler, "Parent to armature", target_objs):
+        make_armature_parent(target_objs, armature)
+    done += 1
+
+    # dressed targets, target_objs keeps only those whose weights are computed
+    dressed = target_objs
+    if library is not None:
+        source_group_names = [group.name for group in source_obj.vertex_groups]
+        loaded = []
+        for i, target_obj in enumerate(dressed):
+            yield ClothProgress(f"Look up '{target_obj.name}' in the library ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Load from library", [target_obj]):
+                entry = library.load(library_keys[target_obj.name])
+                if entry is not None and apply_library_entry(target_obj, entry, source_group_names):
+                    loaded.append(target_obj)
+            done += 1
+
+        target_objs = [obj for obj in dressed if obj not in loaded]
+        if options.change_report is not None:
+            loaded_names = [obj.name for obj in loaded]
+            options.change_report.loaded.extend(loaded_names)
+            options.change_report.recomputed = [name for name in options.change_report.recomputed if name not in loaded_names]
+        total = done + computing_steps(len(target_objs))
+        count = len(target_objs)
+
     # transfar weight from source to target
-    transfer_weights(source_obj, target_objs, options)
+    # mirror partners and computed half of the symmetric targets
+    halves = {}
+    # targets whose weights are already smoothed, by the workers or as the layer under other targets
+    smoothed = set()
+    pairs = armature_flip_pair_index(armature)
+
+    # the weights of every target are read once, changed by every stage and written back once at the end
+    matrices: dict[str, WeightMatrix] = {}
+
+    def weight_matrix(target_obj: bpy.types.Object) -> WeightMatrix:
+        if target_obj.name not in matrices:
+            matrices[target_obj.name] = WeightMatrix.from_object(target_obj)
+        return matrices[target_obj.name]
+
+    def smooth_target(target_mesh: bpy.types.Object):
+        matrix = weight_matrix(target_mesh)
+        repeat = smoothing_passes(len(matrix.group_names), options.smooth_per_group)
+        if target_mesh.name in halves:
+            # the mirrored half is what the neighbours across the plane would have been smoothed to
+            partners, computed = halves[target_mesh.name]
+            smooth_matrix_groups(matrix, options.smooth, repeat, vertex_indices=computed, mesh=target_mesh.data) # type: ignore
+            mirror_matrix_weights(matrix, partners, computed, surface.group_names, pairs)
+        else:
+            smooth_matrix_groups(matrix, options.smooth, repeat, mesh=target_mesh.data) # type: ignore
+
+    if native and count > 0:
+        with profile_stage(options.profiler, "Build source surface", [source_obj]):
+            surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
+
+        # layer of the garments over other garments of this run, transferred after the garments below them
+        layers = {obj.name: garment_layer(obj) for obj in target_objs}
+        upper_layers = {}
+        if layered:
+            lowest = min(layers.values())
+            upper_layers = {name: layer for name, layer in layers.items() if layer > lowest}
+
+        if options.symmetric and is_symmetric_surface(surface.coords, armature):
+            for target_obj in target_objs:
+                if target_obj.name in upper_layers: continue
+                half = symmetric_halves(target_obj, armature)
+                if half is not None:
+                    halves[target_obj.name] = half
+
+        # weights computed in worker processes, already smoothed
+        workers = [obj for obj in target_objs if obj.name not in halves and obj.name not in upper_layers]
+        if options.workers > 1 and len(workers) > 1 and workers_available():
+            pool = WeightWorkers(surface, workers, options.smooth, options.workers, options.smooth_per_group)
+            try:
+                with profile_stage(options.profiler, "Start workers", workers):
+                    pool.start()
+                while pool.running:
+                    yield ClothProgress(f"Computing weights in {pool.workers} processes", done, total, waiting=True)
+                results = pool.results()
+            finally:
+                pool.close()
+
+            for target_obj in workers:
+                if target_obj.name not in results: continue
+                yield ClothProgress(f"Collect weights of '{target_obj.name}'", done, total)
+                with profile_stage(options.profiler, "Collect worker results", [target_obj]):
+                    matrices[target_obj.name] = garment_matrix(target_obj, results[target_obj.name])
+                smoothed.add(target_obj.name)
+                done += 2 if options.smooth > 0.01 else 1
+
+        # the garments of crashed workers fall back to this process
+        for i, target_obj in enumerate(target_objs):
+            if target_obj.name in smoothed or target_obj.name in upper_layers: continue
+            yield ClothProgress(f"Transfer weights to '{target_obj.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Transfer weights", [target_obj]):
+                matrix = weight_matrix(target_obj)
+                if target_obj.name in halves:
+                    partners, computed = halves[target_obj.name]
+                    transfer_surface_matrix(surface, target_obj, matrix, computed)
+                    mirror_matrix_weights(matrix, partners, computed, surface.group_names, pairs)
+                else:
+                    transfer_surface_matrix(surface, target_obj, matrix)
+            done += 1
+
+        for layer in sorted(set(upper_layers.values())):
+            below = [obj for obj in target_objs if layers[obj.name] < layer]
+            # the garments below are sources of this layer, their weights have to be final first
+            if options.smooth > 0.01:
+                for target_mesh in below:
+                    if target_mesh.name in smoothed: continue
+                    yield ClothProgress(f"Smooth weight of '{target_mesh.name}'", done, total)
+                    with profile_stage(options.profiler, "Smooth weights", [target_mesh]):
+                        smooth_target(target_mesh)
+                    smoothed.add(target_mesh.name)
+                    done += 1
+
+            yield ClothProgress(f"Combine the body and {len(below)} garments under layer {layer}", done, total)
+            with profile_stage(options.profiler, "Build layer surface", below):
+                # the surfaces are read from the objects, so the garments below write their weights early
+                for target_mesh in below:
+                    weight_matrix(target_mesh).commit(target_mesh)
+                    target_mesh.data.update()
+                depsgraph = bpy.context.evaluated_depsgraph_get()
+                # the garments pass on the groups of the body only
+                layer_surface = combine_surfaces(
+                    [surface] + [SourceSurface.from_object(obj, depsgraph) for obj in below],
+                    [0] + [layers[obj.name] - lowest + 1 for obj in below], set(surface.group_names)
+                )
+
+            for i, target_obj in enumerate(target_objs):
+                if upper_layers.get(target_obj.name) != layer: continue
+                yield ClothProgress(f"Transfer weights to '{target_obj.name}' ({i+1} / {count})", done, total)
+                with profile_stage(options.profiler, "Transfer weights", [target_obj]):
+                    transfer_surface_matrix(layer_surface, target_obj, weight_matrix(target_obj), layer_offset=options.layer_offset)
+                done += 1
+    elif count > 0:
+        use_create = True
+        if options.prefilter and options.clean:
+            yield ClothProgress("Prefilter vertex groups", done, total)
+            with profile_stage(options.profiler, "Prefilter vertex groups", target_objs):
+                use_create = not create_relevant_groups(source_obj, target_objs, options)
+
+        yield ClothProgress("Transfering weights...", done, total)
+        with profile_stage(options.profiler, "Transfer weights", target_objs):
+            transfer_weights_operator(source_obj, target_objs, options, use_create)
+        done += 1
 
     if options.smooth > 0.01:
         for i, target_mesh in enumerate(target_objs):
+            if target_mesh.name in smoothed: continue
             # smooth weight
-            options.message_updator(f"Smooth weight of '{target_mesh.name}' ({i+1} / {len(target_objs)})")
-            smooth_weight(target_mesh, options.smooth)
+            yield ClothProgress(f"Smooth weight of '{target_mesh.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Smooth weights", [target_mesh]):
+                smooth_target(target_mesh)
+            done += 1
+
+    # limit the influences for real-time engines
+    if options.limits.enabled:
+        for i, target_mesh in enumerate(target_objs):
+            yield ClothProgress(f"Limit influences of '{target_mesh.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Limit influences", [target_mesh]):
+                pruned = limit_matrix_groups(target_mesh, weight_matrix(target_mesh), options.limits)
+            if options.change_report is not None:
+                options.change_report.pruned_influences += pruned
+            done += 1
 
     # cleanup unused vertex groups
     if options.clean:
         for i, target_mesh in enumerate(target_objs):
-            options.message_updator(f"Cleanup unused vertex groups of '{target_mesh.name}' ({i+1} / {len(target_objs)})")
-            cleanup_unused_vertex_groups(target_mesh)
+            yield ClothProgress(f"Cleanup unused vertex groups of '{target_mesh.name}' ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Remove unused vertex groups", [target_mesh]):
+                cleanup_unused_matrix_groups(weight_matrix(target_mesh), pairs)
+            done += 1
 
-    # reselect target objects
-    bpy.ops.object.select_all(action='DESELECT')
-    for target_mesh in target_objs:
-        target_mesh.select_set(True)
+    for i, target_obj in enumerate(target_objs):
+        if target_obj.name not in matrices:
+            # no stage changed the weights the transfer operator wrote
+            done += 1
+            continue
+        yield ClothProgress(f"Write weights of '{target_obj.name}' ({i+1} / {count})", done, total)
+        with profile_stage(options.profiler, "Write weights", [target_obj]):
+            # the library stores the weights from the matrix, otherwise it can go
+            matrix = matrices[target_obj.name] if library is not None else matrices.pop(target_obj.name)
+            matrix.commit(target_obj)
+        done += 1
+
+    if library is not None:
+        for i, target_obj in enumerate(target_objs):
+            yield ClothProgress(f"Store '{target_obj.name}' in the library ({i+1} / {count})", done, total)
+            with profile_stage(options.profiler, "Store in library", [target_obj]):
+                library.store(library_keys[target_obj.name], target_obj, matrices.pop(target_obj.name, None))
+            done += 1
+
+    for target_obj in dressed:
+        store_rest_positions(target_obj)
+        store_fingerprint(target_obj, source, option_key)
 
     return True
-        
+
+
+def apply_cloth_batches_steps(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions) -> Generator[ClothProgress, None, bool]:
+    """`apply_cloth_steps` over batches of the targets sized to `options.memory_budget_mb`, one after the other,
+    so only the weights of one batch are alive at a time. The cost of a target is its vertex count times the groups
+    it is expected to hold: every source group with the data transfer, the groups of the body near it otherwise."""
+    surface = None
+    if options.transfer_engine == "NATIVE" or (options.prefilter and options.clean):
+        surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
+    group_count = len(source_obj.vertex_groups)
+    source = run_source_fingerprint(source_obj, options)
+    costs = [garment_cost(obj, expected_groups(obj, group_count, surface, options.prefilter_tolerance)) for obj in target_objs]
+    batches = plan_batches(costs, options.memory_budget_mb * 2 ** 20)
+    batch_options = replace(options, memory_budget_mb=0)
+
+    # progress steps of one batch, whose own step count is only known once it runs
+    batch_steps = 1000
+    succeeded = True
+    for b, batch in enumerate(batches):
+        batch_objs = [target_objs[i] for i in batch]
+        start = time.perf_counter()
+        peak = resident_mb()
+        steps = apply_cloth_steps(source_obj, batch_objs, batch_options, source)
+        while True:
+            try:
+                progress = next(steps)
+            except StopIteration as stop:
+                succeeded = bool(stop.value) and succeeded
+                break
+            resident = resident_mb()
+            if resident is not None and peak is not None:
+                peak = max(peak, resident)
+            yield ClothProgress(
+                f"Batch {b+1} / {len(batches)}: {progress.message}",
+                b * batch_steps + int(progress.factor * batch_steps), len(batches) * batch_steps, progress.waiting
+            )
+
+        # release what the batch left behind before the next one allocates its own
+        del steps
+        gc.collect()
+        if options.change_report is not None:
+            options.change_report.batches.append(BatchReport(
+                [obj.name for obj in batch_objs], sum(costs[i] for i in batch) / 2 ** 20, peak, time.perf_counter() - start
+            ))
+
+    return succeeded
+
+
+def refresh_weights(source_obj: bpy.types.Object, target_obj: bpy.types.Object, options: ClothApplyOptions, rings: int = 1) -> int:
+    """Transfer and smooth again only the vertices moved or added since the weights were computed,
+    grown by `rings` edges so the refreshed region blends into the rest. Returns the number of refreshed vertices."""
+    mesh = target_obj.data
+    assert isinstance(mesh, bpy.types.Mesh)
+
+    with profile_stage(options.profiler, "Find moved vertices", [target_obj]):
+        moved = moved_vertices(target_obj)
+        if len(moved) == 0: return 0
+        adjacency = VertexAdjacency.from_mesh(mesh)
+        region = adjacency.grow(moved, rings)
+
+    # only the native transfer can interpolate a part of the mesh
+    with profile_stage(options.profiler, "Build source surface", [source_obj]):
+        surface = surface_cache.get(source_obj, bpy.context.evaluated_depsgraph_get())
+    with profile_stage(options.profiler, "Transfer weights", [target_obj]):
+        matrix = WeightMatrix.from_object(target_obj)
+        transfer_surface_matrix(surface, target_obj, matrix, region)
+
+    if options.smooth > 0.01:
+        with profile_stage(options.profiler, "Smooth weights", [target_obj]):
+            repeat = smoothing_passes(len(matrix.group_names), options.smooth_per_group)
+            smooth_matrix_groups(matrix, options.smooth, repeat, adjacency=adjacency, vertex_indices=region)
+
+    if options.limits.enabled:
+        with profile_stage(options.profiler, "Limit influences", [target_obj]):
+            limit_matrix_groups(target_obj, matrix, options.limits)
+
+    if options.clean:
+        with profile_stage(options.profiler, "Remove unused vertex groups", [target_obj]):
+            armature = find_armature(source_obj)
+            cleanup_unused_matrix_groups(matrix, armature_flip_pair_index(armature) if armature is not None else None)
+
+    with profile_stage(options.profiler, "Write weights", [target_obj]):
+        matrix.commit(target_obj)
+
+    store_rest_positions(target_obj)
+    store_fingerprint(target_obj, source_fingerprint(source_obj, surface) if not options.force else None, options.fingerprint())
+    return len(region)
+
+
+@dataclass
+class VariantResult:
+    body: str
+    garment: bpy.types.Object
+    seconds: float
+
+def dress_variants(garment: bpy.types.Object, bodies: Sequence[bpy.types.Object], options: ClothApplyOptions) -> list[VariantResult]:
+    """Dress a copy of the garment on every body, the bodies sharing one armature layout. Everything about the garment
+    is prepared once: its cleaned and transformed coordinates, edge adjacency, weights and the L/R pair index of the
+    layout. Each body only adds its surface lookup and the write into its copy. Always uses the native engine."""
+    bodies = [body for body in bodies if body != garment and find_armature(body) is not None]
+    if not isinstance(garment.data, bpy.types.Mesh) or len(bodies) == 0: return []
+
+    with profile_stage(options.profiler, "Prepare garment", [garment]):
+        # a copy outside the scene, which every variant is copied from
+        template = garment.copy()
+        template.data = garment.data.copy()
+        world = garment.matrix_world.copy()
+        template.parent = None
+        template.matrix_world = world
+        if options.clean:
+            remove_all_armature_modifier(template)
+        if options.apply_transform:
+            apply_transforms(template)
+
+        mesh = template.data
+        assert isinstance(mesh, bpy.types.Mesh)
+        coords = world_coordinates(mesh, template.matrix_world)
+        adjacency = VertexAdjacency.from_mesh(mesh)
+        existing = read_deform_weights(mesh)
+        group_names = [group.name for group in template.vertex_groups]
+        locked = {group.name for group in template.vertex_groups if group.lock_weight}
+        pairs = armature_flip_pair_index(find_armature(bodies[0])) # type: ignore
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    option_key = options.fingerprint()
+    results = []
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            armature = find_armature(body)
+            assert armature is not None
+            with profile_stage(options.profiler, "Build source surface", [body]):
+                surface = surface_cache.get(body, depsgraph)
+            with profile_stage(options.profiler, "Transfer weights", [template]):
+                weights = compute_garment_weights(surface, coords, adjacency, existing, group_names, locked, options.smooth, options.smooth_per_group)
+
+            variant = template.copy()
+            variant.data = mesh.copy()
+            variant.name = f"{garment.name}.{body.name}"
+            for collection in garment.users_collection:
+                collection.objects.link(variant)
+            make_armature_parent([variant], armature)
+            matrix = garment_matrix(variant, weights)
+
+            if options.limits.enabled:
+                with profile_stage(options.profiler, "Limit influences", [variant]):
+                    limit_matrix_groups(variant, matrix, options.limits)
+            if options.clean:
+                with profile_stage(options.profiler, "Remove unused vertex groups", [variant]):
+                    cleanup_unused_matrix_groups(matrix, pairs)
+            with profile_stage(options.profiler, "Write weights", [variant]):
+                matrix.commit(variant)
+
+            store_rest_positions(variant)
+            store_fingerprint(variant, source_fingerprint(body, surface) if not options.force else None, option_key)
+            results.append(VariantResult(body.name, variant, time.perf_counter() - start))
+            options.message_updator(f"Dressed '{variant.name}' ({len(results)} / {len(bodies)})")
+    finally:
+        bpy.data.objects.remove(template)
+        bpy.data.meshes.remove(mesh)
+
+    return results
+
+
+def apply_cloth(source_obj: bpy.types.Object, target_objs: Sequence[bpy.types.Object], options: ClothApplyOptions) -> bool:
+    """Run every step of `apply_cloth_steps` at once."""
+    steps = apply_cloth_steps(source_obj, target_objs, options)
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as stop:
+            return bool(stop.value)
+        options.message_updator(progress.message)
+        if progress.waiting:
+            time.sleep(0.01)
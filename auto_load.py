@@ -1,20 +1,29 @@
 import os
 import bpy
 import sys
+import json
+import zlib
 import typing
 import inspect
 import pkgutil
 import importlib
+import importlib.util
 from pathlib import Path
 
 __all__ = (
     "init",
     "register",
     "unregister",
+    "lazy_import",
 )
 
 blender_version = bpy.app.version
 
+MANIFEST_NAME = "registration_manifest.json"
+MANIFEST_VERSION = 1
+# set to skip the manifest and always discover the classes
+DISCOVERY_VARIABLE = "KISERU_DISCOVER_CLASSES"
+
 modules = None
 ordered_classes = None
 
@@ -22,8 +31,13 @@ def init():
     global modules
     global ordered_classes
 
-    modules = get_all_submodules(Path(__file__).parent)
-    ordered_classes = get_ordered_classes_to_register(modules)
+    directory = Path(__file__).parent
+    loaded = None if os.environ.get(DISCOVERY_VARIABLE) else load_from_manifest(directory)
+    if loaded is None:
+        modules = get_all_submodules(directory)
+        ordered_classes = get_ordered_classes_to_register(modules)
+    else:
+        modules, ordered_classes = loaded
 
 def register():
     for cls in ordered_classes:
@@ -39,12 +53,31 @@ def unregister():
     for cls in reversed(ordered_classes):
         bpy.utils.unregister_class(cls)
 
-    for module in modules:
-        if module.__name__ == __name__:
+    # modules imported lazily after registration are cleaned up as well, the ones still unused are not loaded for it
+    for module in get_loaded_submodules():
+        if is_lazy_pending(module) or module.__name__ == __name__:
             continue
         if hasattr(module, "unregister"):
             module.unregister()
 
+def lazy_import(name, package):
+    """Module that is only executed when one of its attributes is first used."""
+    module_name = importlib.util.resolve_name(name, package)
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.find_spec(module_name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
+
+def is_lazy_pending(module):
+    """True for a module of `lazy_import` that has not been executed yet: any attribute lookup would execute it."""
+    # type() does not go through the attribute lookup of the lazy module
+    return type(module) is importlib.util._LazyModule
+
 
 # Import modules
 #################################################
@@ -66,11 +99,77 @@ def iter_submodule_names(path, root=""):
             yield root + module_name
 
 
+def get_loaded_submodules():
+    prefix = __package__ + "."
+    return [module for name, module in sorted(sys.modules.items()) if name.startswith(prefix)]
+
+
+# Registration manifest
+#################################################
+
+def source_checksums(directory):
+    checksums = {}
+    for name in sorted(iter_submodule_names(directory)):
+        path = directory.joinpath(*name.split(".")).with_suffix(".py")
+        checksums[name] = zlib.crc32(path.read_bytes())
+    return checksums
+
+def load_from_manifest(directory):
+    """Modules and ordered classes from the manifest, None when it is missing or older than the sources."""
+    try:
+        with open(directory / MANIFEST_NAME, encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("sources") != source_checksums(directory):
+            return None
+        loaded_modules = [importlib.import_module("." + name, directory.name) for name in manifest["modules"]]
+        classes = [getattr(sys.modules[directory.name + "." + module], name) for module, name in manifest["classes"]]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, ImportError):
+        return None
+    return loaded_modules, classes
+
+def build_manifest(directory):
+    """Discover the classes to register and the modules that registration needs."""
+    all_modules = get_all_submodules(directory)
+    classes = get_ordered_classes_to_register(all_modules)
+    needed = [
+        module for module in all_modules
+        if module.__name__ != __name__ and (hasattr(module, "register") or any(cls.__module__ == module.__name__ for cls in classes))
+    ]
+    prefix = directory.name + "."
+    return {
+        "version": MANIFEST_VERSION,
+        "sources": source_checksums(directory),
+        "modules": sorted(module.__name__[len(prefix):] for module in needed),
+        "classes": [[cls.__module__[len(prefix):], cls.__qualname__] for cls in classes],
+    }
+
+def write_manifest(directory=None):
+    directory = Path(__file__).parent if directory is None else Path(directory)
+    manifest = build_manifest(directory)
+    with open(directory / MANIFEST_NAME, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+        file.write("\n")
+    return manifest
+
+def is_manifest_current(directory=None):
+    directory = Path(__file__).parent if directory is None else Path(directory)
+    try:
+        with open(directory / MANIFEST_NAME, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return False
+    return manifest.get("version") == MANIFEST_VERSION and manifest.get("sources") == source_checksums(directory)
+
+
 # Find classes to register
 #################################################
 
 def get_ordered_classes_to_register(modules):
-    return toposort(get_register_deps_dict(modules))
+    return toposort(get_register_deps_dict(modules), class_sort_key)
+
+def class_sort_key(cls):
+    """Stable order of the classes that do not depend on each other, so the manifest only changes with the sources."""
+    return cls.__module__, getattr(cls, "bl_idname", None) or cls.__qualname__
 
 def get_register_deps_dict(modules):
     my_classes = set(iter_my_classes(modules))
@@ -142,12 +241,13 @@ def get_register_base_types():
 # Find order to register to solve dependencies
 #################################################
 
-def toposort(deps_dict):
+def toposort(deps_dict, key=None):
     sorted_list = []
     sorted_values = set()
     while len(deps_dict) > 0:
         unsorted = []
-        for value, deps in deps_dict.items():
+        for value in sorted(deps_dict, key=key) if key is not None else list(deps_dict):
+            deps = deps_dict[value]
             if len(deps) == 0:
                 sorted_list.append(value)
                 sorted_values.add(value)
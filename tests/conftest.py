@@ -0,0 +1,52 @@
+"""Tests run in Python with the bpy module, or inside Blender with `blender -b --python-expr "import pytest; pytest.main(['tests'])"`.
+
+The add-on is imported as a package by the name of its directory, like Blender loads it."""
+
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+ADDON_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ADDON_DIRECTORY.parent))
+
+def addon_module(name: str):
+    """Submodule `name` of the add-on."""
+    return importlib.import_module(f"{ADDON_DIRECTORY.name}.{name}")
+
+@pytest.fixture
+def empty_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    yield bpy.context.scene
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+@pytest.fixture
+def make_scene(empty_scene):
+    """`make_scene(bones, body_vertices, garment_vertices)` builds the synthetic body and garment of the benchmark,
+    the body weighted to its nearest bones, and returns them."""
+    Benchmark = addon_module("Benchmark")
+
+    def make(bones: int = 12, body_vertices: int = 800, garment_vertices: int = 600) -> tuple[bpy.types.Object, bpy.types.Object]:
+        return Benchmark.make_scene(Benchmark.SceneSpec("test", bones, body_vertices, garment_vertices))
+    return make
+
+@pytest.fixture
+def dress():
+    """`dress(body, garments, **options)` runs a whole Dress Up and returns its change report.
+    Without options it is a forced native transfer only: no smoothing, cleanup or transform apply."""
+    WeightTransfer = addon_module("WeightTransfer")
+    Fingerprint = addon_module("Fingerprint")
+
+    def run(body: bpy.types.Object, garments, **options) -> "Fingerprint.ChangeReport":
+        report = Fingerprint.ChangeReport()
+        defaults = {"smooth": 0.0, "clean": False, "apply_transform": False, "transfer_engine": "NATIVE", "force": True}
+        cloth_options = WeightTransfer.ClothApplyOptions(
+            message_updator=lambda message: None, change_report=report, **{**defaults, **options}
+        )
+        targets = garments if isinstance(garments, (list, tuple)) else [garments]
+        assert WeightTransfer.apply_cloth(body, targets, cloth_options)
+        return report
+    return run
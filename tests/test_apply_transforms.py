@@ -0,0 +1,63 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightTransfer = addon_module("WeightTransfer")
+
+def key_coords(obj: bpy.types.Object) -> dict[str, np.ndarray]:
+    coords = {}
+    for key in obj.data.shape_keys.key_blocks: # type: ignore
+        array = np.empty(len(key.data) * 3, dtype=np.float32)
+        key.data.foreach_get("co", array)
+        coords[key.name] = array.reshape(-1, 3)
+    return coords
+
+def polygon_cycles(mesh: bpy.types.Mesh) -> list[tuple]:
+    """Vertices of every polygon in winding order, starting from the lowest index."""
+    cycles = []
+    for polygon in mesh.polygons:
+        vertices = list(polygon.vertices)
+        start = vertices.index(min(vertices))
+        cycles.append(tuple(vertices[start:] + vertices[:start]))
+    return cycles
+
+def polygon_normals(mesh: bpy.types.Mesh) -> np.ndarray:
+    normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    mesh.polygons.foreach_get("normal", normals)
+    return normals.reshape(-1, 3)
+
+def test_data_transform_matches_transform_apply(empty_scene):
+    garment = bpy.data.objects.new("Garment", Benchmark.ellipsoid_mesh("Garment", 400, (1.0, 0.5, 1.3)))
+    bpy.context.scene.collection.objects.link(garment)
+    garment.shape_key_add(name="Basis")
+    key = garment.shape_key_add(name="Flare")
+    for point in key.data:
+        point.co.x *= 1.3
+        point.co.z += 0.2
+    garment.location = (0.2, -0.1, 0.4)
+    garment.rotation_euler = (0.3, 0.0, 0.7)
+    # mirrors the mesh: the faces have to be turned back outside
+    garment.scale = (-1.2, 0.8, 1.1)
+    bpy.context.view_layer.update()
+    reference = Benchmark.copy_object(garment, "Reference")
+
+    WeightTransfer.apply_transforms(garment)
+
+    bpy.ops.object.select_all(action="DESELECT")
+    reference.select_set(True)
+    bpy.context.view_layer.objects.active = reference
+    assert bpy.ops.object.transform_apply(location=True, rotation=True, scale=True) == {"FINISHED"}
+    bpy.context.view_layer.update()
+
+    for obj in (garment, reference):
+        assert np.allclose(np.array(obj.matrix_world), np.identity(4))
+    keys, reference_keys = key_coords(garment), key_coords(reference)
+    assert list(keys) == list(reference_keys) == ["Basis", "Flare"]
+    for name in keys:
+        assert np.allclose(keys[name], reference_keys[name], atol=1e-5)
+    assert not np.allclose(keys["Flare"], keys["Basis"])
+
+    assert polygon_cycles(garment.data) == polygon_cycles(reference.data) # type: ignore
+    assert np.allclose(polygon_normals(garment.data), polygon_normals(reference.data), atol=1e-5) # type: ignore
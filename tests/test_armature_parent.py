@@ -0,0 +1,51 @@
+import bpy
+import pytest
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightTransfer = addon_module("WeightTransfer")
+
+def modifier_stack(obj: bpy.types.Object) -> list:
+    return [(modifier.type, getattr(modifier, "object", None)) for modifier in obj.modifiers]
+
+def rounded(matrix) -> list:
+    return [[round(value, 5) for value in row] for row in matrix]
+
+@pytest.mark.parametrize("parent_type", ["ARMATURE", "ARMATURE_NAME"])
+def test_data_parent_matches_parent_set(make_scene, parent_type):
+    _, garment = make_scene(6, 200, 200)
+    armature = bpy.data.objects["BenchmarkArmature"]
+    # off the origin, so the parent inverse is not the identity
+    armature.location = (0.3, -0.2, 0.1)
+    armature.rotation_euler = (0.1, 0.0, 0.4)
+    armature.scale = (1.2, 1.2, 1.2)
+    garment.location = (0.0, 0.5, 0.2)
+    garment.modifiers.new(name="Subdivision", type="SUBSURF")
+    bpy.context.view_layer.update()
+    reference = Benchmark.copy_object(garment, "ParentReference")
+
+    WeightTransfer.make_armature_parent([garment], armature)
+
+    bpy.ops.object.select_all(action="DESELECT")
+    reference.select_set(True)
+    armature.select_set(True)
+    bpy.context.view_layer.objects.active = armature
+    assert bpy.ops.object.parent_set(type=parent_type) == {"FINISHED"}
+    bpy.context.view_layer.update()
+
+    assert garment.parent == reference.parent == armature
+    assert garment.parent_type == reference.parent_type
+    assert rounded(garment.matrix_parent_inverse) == rounded(reference.matrix_parent_inverse)
+    assert rounded(garment.matrix_world) == rounded(reference.matrix_world)
+    assert modifier_stack(garment) == modifier_stack(reference)
+
+    # the transfer creates the groups the garment needs: the data API creates none, the named parenting only empty
+    # groups of the deform bones
+    assert len(garment.vertex_groups) == 0
+    if parent_type == "ARMATURE":
+        assert len(reference.vertex_groups) == 0
+    else:
+        deform_bones = {bone.name for bone in armature.data.bones if bone.use_deform} # type: ignore
+        assert {group.name for group in reference.vertex_groups} == deform_bones
+        assert all(len(vertex.groups) == 0 for vertex in reference.data.vertices) # type: ignore
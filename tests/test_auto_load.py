@@ -0,0 +1,11 @@
+import json
+
+from conftest import addon_module, ADDON_DIRECTORY
+
+auto_load = addon_module("auto_load")
+
+def test_manifest_is_reproducible():
+    # the classes are discovered from sets: without a stable order every regeneration would reorder the file
+    with open(ADDON_DIRECTORY / auto_load.MANIFEST_NAME, encoding="utf-8") as file:
+        committed = json.load(file)
+    assert auto_load.build_manifest(ADDON_DIRECTORY) == committed
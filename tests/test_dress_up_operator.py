@@ -0,0 +1,50 @@
+import bpy
+import importlib
+
+from conftest import addon_module, ADDON_DIRECTORY
+
+Kiseru = addon_module("Kiseru")
+Benchmark = addon_module("Benchmark")
+
+def test_objects_removed(empty_scene):
+    bpy.ops.mesh.primitive_cube_add()
+    body = bpy.context.active_object
+    bpy.ops.mesh.primitive_cube_add()
+    garment = bpy.context.active_object
+    assert not Kiseru.objects_removed([body, garment])
+
+    bpy.data.objects.remove(garment)
+    assert Kiseru.objects_removed([body, garment])
+
+def test_editing_events_are_consumed():
+    events = {item.identifier for item in bpy.types.Event.bl_rna.properties["type"].enum_items}
+    passed = Kiseru.OBJECT_OT_apply_cloth.passed_events
+    assert passed <= events
+    # undo, redo, delete and clicks on the scene
+    assert not passed & {"Z", "Y", "X", "DEL", "BACK_SPACE", "LEFTMOUSE", "RIGHTMOUSE", "RET", "ESC"}
+
+def test_dress_up_keeps_the_selection(make_scene, dress):
+    body, garment = make_scene()
+    reference = Benchmark.copy_object(garment, "OperatorGarment")
+    bpy.ops.object.select_all(action="DESELECT")
+    body.select_set(True)
+    bpy.context.view_layer.objects.active = body
+
+    dress(body, [garment], transfer_engine="NATIVE")
+    dress(body, [reference], transfer_engine="OPERATOR")
+    assert len(reference.vertex_groups) > 0
+    assert bpy.context.selected_objects == [body] and bpy.context.view_layer.objects.active == body
+
+def test_operator_selects_the_dressed_garments(make_scene):
+    addon = importlib.import_module(ADDON_DIRECTORY.name)
+    addon.register()
+    try:
+        body, garment = make_scene()
+        garment.select_set(True)
+        body.select_set(True)
+        bpy.context.view_layer.objects.active = body
+        assert bpy.ops.mesh.apply_cloth() == {"FINISHED"}
+        assert bpy.context.selected_objects == [garment]
+        assert garment.parent == bpy.data.objects["BenchmarkArmature"]
+    finally:
+        addon.unregister()
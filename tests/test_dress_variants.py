@@ -0,0 +1,37 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightTransfer = addon_module("WeightTransfer")
+
+OPTIONS = {"smooth": 0.2, "clean": True, "force": False}
+
+def test_variants_match_dressing_each_body(make_scene, dress):
+    body, garment = make_scene()
+    # a wider body on the same armature
+    wide = Benchmark.copy_object(body, "WideBody")
+    wide.data.transform(np.diag([1.15, 1.0, 1.0, 1.0]).tolist()) # type: ignore
+    bpy.context.view_layer.update()
+    references = [Benchmark.copy_object(garment, f"Reference{name}") for name in ("Body", "Wide")]
+
+    options = WeightTransfer.ClothApplyOptions(message_updator=lambda message: None, apply_transform=False, transfer_engine="NATIVE", **OPTIONS)
+    results = WeightTransfer.dress_variants(garment, [body, wide], options)
+    assert [result.body for result in results] == [body.name, wide.name]
+    # the garment itself is left as it was
+    assert garment.parent is None and len(garment.vertex_groups) == 0
+
+    for result, source, reference in zip(results, (body, wide), references):
+        variant = result.garment
+        assert variant.name == f"{garment.name}.{source.name}"
+        assert variant.parent == bpy.data.objects["BenchmarkArmature"]
+        dress(source, reference, **OPTIONS)
+        names = [group.name for group in reference.vertex_groups]
+        assert [group.name for group in variant.vertex_groups] == names
+        assert np.array_equal(Benchmark.dense_weights(variant, names), Benchmark.dense_weights(reference, names))
+        # dressed like Dress Up would have: dressing it again changes nothing
+        assert dress(source, variant, **OPTIONS).skipped == [variant.name]
+
+    names = [group.name for group in body.vertex_groups]
+    assert not np.array_equal(Benchmark.dense_weights(results[0].garment, names), Benchmark.dense_weights(results[1].garment, names))
@@ -0,0 +1,28 @@
+import bpy
+
+from conftest import addon_module
+
+Fingerprint = addon_module("Fingerprint")
+
+def test_unchanged_garment_is_skipped(make_scene, dress):
+    body, garment = make_scene()
+    assert dress(body, garment, force=False).recomputed == [garment.name]
+    assert dress(body, garment, force=False).skipped == [garment.name]
+
+def test_forced_dress_up_drops_the_fingerprint(make_scene, dress):
+    body, garment = make_scene()
+    dress(body, garment, force=False)
+    assert Fingerprint.FINGERPRINT_PROPERTY in garment
+
+    # the forced run computes no fingerprint, the old one could be for other options
+    assert dress(body, garment).recomputed == [garment.name]
+    assert Fingerprint.FINGERPRINT_PROPERTY not in garment
+    assert dress(body, garment, force=False).recomputed == [garment.name]
+
+def test_edited_body_weights_dress_again(make_scene, dress):
+    body, garment = make_scene()
+    dress(body, garment, force=False)
+    body.vertex_groups[0].add(list(range(len(body.data.vertices))), 0.5, "REPLACE")
+    body.data.update()
+    bpy.context.view_layer.update()
+    assert dress(body, garment, force=False).recomputed == [garment.name]
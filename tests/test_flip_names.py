@@ -0,0 +1,77 @@
+import re
+
+import pytest
+
+from conftest import addon_module
+
+VertexCleaner = addon_module("VertexCleaner")
+
+def flip_vertex_group_name_reference(name):
+    """The flipper before the lookup table, as it shipped."""
+    match = re.search(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", name, re.IGNORECASE)
+    if match is None: return None
+    match2 = re.search("[A-Z]+", match.group(), re.IGNORECASE)
+    if match2 is None: return None
+    flip_word = ""
+    if   match2.group() == "LEFT":  flip_word = match.group().replace("LEFT", "RIGHT")
+    elif match2.group() == "Left":  flip_word = match.group().replace("Left", "Right")
+    elif match2.group() == "left":  flip_word = match.group().replace("left", "right")
+    elif match2.group() == "L":     flip_word = match.group().replace("L", "R")
+    elif match2.group() == "l":     flip_word = match.group().replace("l", "r")
+    elif match2.group() == "RIGHT": flip_word = match.group().replace("RIGHT", "LEFT")
+    elif match2.group() == "Right": flip_word = match.group().replace("Right", "Left")
+    elif match2.group() == "right": flip_word = match.group().replace("right", "left")
+    elif match2.group() == "R":     flip_word = match.group().replace("R", "L")
+    elif match2.group() == "r":     flip_word = match.group().replace("r", "l")
+    search_name = re.sub(r"(^|_|\.|-|\s)(LEFT|RIGHT)(_+|$|\.+|\s+)|(^|_|\.|-|\s+)(L|R)(_+|$|\.+|\s+)", flip_word, name)
+    return search_name
+
+VROID = [
+    f"J_{kind}_{side}_{part}" for kind in ("Bip", "Sec", "Adj") for side in ("L", "R", "C")
+    for part in ("UpperArm", "LowerArm", "Hand", "Shoulder", "UpperLeg", "LowerLeg", "Foot", "ToeBase", "Index1", "Thumb3")
+] + ["J_Sec_Hair1_01", "J_Bip_C_Hips", "J_Sec_L_Bust1", "J_Sec_R_SkirtBack0_01"]
+
+MMD = [
+    f"{part}{side}" for side in (".L", ".R", "_L", "_R")
+    for part in ("腕", "ひじ", "手首", "足", "ひざ", "足首", "肩", "親指０", "人指１", "足ＩＫ")
+] + ["左腕", "右腕", "センター", "グルーブ", "上半身", "下半身", "左足ＩＫ", "右つま先ＩＫ"]
+
+RIGIFY = [
+    f"{prefix}{part}{suffix}" for prefix in ("", "DEF-", "ORG-", "MCH-", "MCH-ik_")
+    for part in ("upper_arm", "forearm", "hand", "thigh", "shin", "foot", "shoulder", "breast")
+    for suffix in (".L", ".R", ".L.001", ".R.001")
+] + ["DEF-spine", "DEF-spine.003", "root", "torso", "ORG-face", "DEF-lip.T.L", "DEF-lip.B.R.001", "MCH-WGT-hips"]
+
+MIXAMO = [
+    f"mixamorig:{side}{part}" for side in ("Left", "Right")
+    for part in ("Arm", "ForeArm", "Hand", "UpLeg", "Leg", "Foot", "HandIndex1", "Shoulder")
+] + ["mixamorig:Hips", "mixamorig:Spine1"]
+
+# every side word casing with every separator before and after it
+SIDE_WORDS = ["L", "R", "l", "r", "LEFT", "RIGHT", "Left", "Right", "left", "right", "LeFt", "rIGHT"]
+SEPARATORS = ["", ".", "_", "-", " ", "..", "__", "  "]
+VARIANTS = [
+    name for word in SIDE_WORDS for separator in SEPARATORS for name in (
+        f"Arm{separator}{word}", f"{word}{separator}Arm", f"Arm{separator}{word}{separator}001",
+        f"Arm{separator}{word}{separator}", f"{word}", f"Upper{separator}{word}{separator}Arm{separator}{word}"
+    )
+] + ["Leg.L.R", "Left_Right", "Real", "Blend", "LL", "Hip_LR", "Lower.l", "", "L", "_", ".L."]
+
+CORPUS = sorted(set(VROID + MMD + RIGIFY + MIXAMO + VARIANTS))
+
+@pytest.mark.parametrize("corpus", [VROID, MMD, RIGIFY, MIXAMO, VARIANTS], ids=["vroid", "mmd", "rigify", "mixamo", "variants"])
+def test_flip_matches_reference(corpus):
+    VertexCleaner.flip_vertex_group_name.cache_clear()
+    for name in corpus:
+        assert VertexCleaner.flip_vertex_group_name(name) == flip_vertex_group_name_reference(name), name
+
+def test_flip_matches_reference_from_cache():
+    VertexCleaner.flip_vertex_group_name.cache_clear()
+    first = [VertexCleaner.flip_vertex_group_name(name) for name in CORPUS]
+    second = [VertexCleaner.flip_vertex_group_name(name) for name in CORPUS]
+    assert first == second == [flip_vertex_group_name_reference(name) for name in CORPUS]
+
+def test_flip_pair_index_matches_reference():
+    names = set(CORPUS)
+    expected = {name: flipped for name in names if (flipped := flip_vertex_group_name_reference(name)) in names}
+    assert VertexCleaner.flip_pair_index(names) == expected
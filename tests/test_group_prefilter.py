@@ -0,0 +1,29 @@
+import bpy
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+
+def weight_entries(obj: bpy.types.Object) -> dict:
+    names = {group.index: group.name for group in obj.vertex_groups}
+    return {
+        (vertex.index, names[group.group]): round(group.weight, 5)
+        for vertex in obj.data.vertices for group in vertex.groups if group.weight > 0
+    }
+
+def test_prefilter_matches_full_transfer_off_the_body(make_scene, dress):
+    body, _ = make_scene(40, 1_500, 400)
+    # a sliver touching the front of the body and reaching far up to the side: the body nearest to its far corner
+    # lies outside its bounding box
+    mesh = bpy.data.meshes.new("PrefilterGarment")
+    mesh.from_pydata([(0.0, -0.5, 0.0), (0.05, -0.5, 0.0), (1.5, -0.5, 1.8)], [], [(0, 1, 2)])
+    garment = bpy.data.objects.new("PrefilterGarment", mesh)
+    bpy.context.scene.collection.objects.link(garment)
+    bpy.context.view_layer.update()
+    reference = Benchmark.copy_object(garment, "PrefilterReference")
+
+    options = {"clean": True, "transfer_engine": "OPERATOR", "prefilter_tolerance": 0.01}
+    dress(body, garment, prefilter=True, **options)
+    dress(body, reference, prefilter=False, **options)
+    assert {group.name for group in garment.vertex_groups} == {group.name for group in reference.vertex_groups}
+    assert weight_entries(garment) == weight_entries(reference)
@@ -0,0 +1,44 @@
+import bpy
+import numpy as np
+import pytest
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightTransfer = addon_module("WeightTransfer")
+
+def square(name: str, half_size: float, z: float) -> bpy.types.Object:
+    mesh = bpy.data.meshes.new(name)
+    corners = [(-half_size, -half_size, z), (half_size, -half_size, z), (half_size, half_size, z), (-half_size, half_size, z)]
+    mesh.from_pydata(corners, [], [(0, 1, 2, 3)])
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+def layered_scene():
+    """A body of two parallel plates, the lower one weighted to the left bone and the upper one to the right bone,
+    an undershirt right on the lower plate and a coat between the plates, a bit nearer to the upper one."""
+    armature, _, _ = Benchmark.make_armature(3)
+    lower, upper = square("Lower", 1.0, 0.0), square("Upper", 1.0, 1.0)
+    lower.vertex_groups.new(name="Limb000.L").add([0, 1, 2, 3], 1.0, "REPLACE")
+    upper.vertex_groups.new(name="Limb000.R").add([0, 1, 2, 3], 1.0, "REPLACE")
+    with bpy.context.temp_override(active_object=lower, selected_editable_objects=[lower, upper]):
+        bpy.ops.object.join()
+    body = lower
+    WeightTransfer.make_armature_parent([body], armature)
+
+    undershirt = square("Undershirt", 0.8, 0.1)
+    coat = square("Coat", 0.5, 0.6)
+    WeightTransfer.set_garment_layer(coat, 1)
+    bpy.context.view_layer.update()
+    return body, undershirt, coat
+
+@pytest.mark.parametrize("layered, side", [(True, "Limb000.L"), (False, "Limb000.R")])
+def test_coat_follows_the_garment_below(empty_scene, dress, layered, side):
+    body, undershirt, coat = layered_scene()
+    # the coat is 0.4 from the upper plate and 0.5 from the undershirt: only the layer offset makes the undershirt win
+    dress(body, [undershirt, coat], layered=layered, layer_offset=0.2)
+
+    assert Benchmark.dense_weights(undershirt, ["Limb000.L", "Limb000.R"]).tolist() == [[1.0, 0.0]] * 4
+    weights = Benchmark.dense_weights(coat, [side])
+    assert np.allclose(weights, 1.0)
@@ -0,0 +1,32 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+
+def add_garment(name: str, vertex_count: int, radii: tuple[float, float, float]) -> bpy.types.Object:
+    garment = bpy.data.objects.new(name, Benchmark.ellipsoid_mesh(name, vertex_count, radii))
+    bpy.context.scene.collection.objects.link(garment)
+    return garment
+
+def test_batches_fit_the_budget(make_scene, dress):
+    # 12 groups of 48 bytes per vertex: about 1.3 MB for the large garment, 0.3 MB for the small ones
+    body, large = make_scene(12, 800, 2_500)
+    small = [add_garment(f"Small{i}", 600, (1.1 + 0.05 * i, 0.58, 1.2)) for i in range(2)]
+    garments = [large] + small
+    bpy.context.view_layer.update()
+    references = [Benchmark.copy_object(garment, garment.name + "Reference") for garment in garments]
+
+    report = dress(body, garments, smooth=0.2, clean=True, memory_budget_mb=1)
+    # in order, a garment over the budget alone
+    assert [batch.garments for batch in report.batches] == [[large.name], [garment.name for garment in small]]
+    assert report.batches[0].estimated_mb > 1 and report.batches[1].estimated_mb <= 1
+    assert sorted(report.recomputed) == sorted(garment.name for garment in garments)
+
+    unbatched = dress(body, references, smooth=0.2, clean=True)
+    assert unbatched.batches == []
+    for garment, reference in zip(garments, references):
+        names = [group.name for group in reference.vertex_groups]
+        assert [group.name for group in garment.vertex_groups] == names
+        assert np.array_equal(Benchmark.dense_weights(garment, names), Benchmark.dense_weights(reference, names))
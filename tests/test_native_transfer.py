@@ -0,0 +1,27 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+
+# largest weight difference allowed between the engines, well above float32 rounding
+TOLERANCE = 1e-5
+
+def test_native_transfer_matches_data_transfer(make_scene, dress):
+    body, garment = make_scene(12, 1_500, 2_000)
+    # off the symmetry planes of the body grid: a garment vertex on an edge of the body is nearest to both of its
+    # faces, and the engines may interpolate it on either
+    garment.rotation_euler.z = 0.05
+    garment.location.z = 0.013
+    bpy.context.view_layer.update()
+    reference = Benchmark.copy_object(garment, "ParityReference")
+
+    dress(body, garment, transfer_engine="NATIVE")
+    dress(body, reference, transfer_engine="OPERATOR")
+
+    assert {group.name for group in garment.vertex_groups} == {group.name for group in reference.vertex_groups}
+    names = [group.name for group in body.vertex_groups]
+    native, expected = Benchmark.dense_weights(garment, names), Benchmark.dense_weights(reference, names)
+    assert np.count_nonzero(expected) > 0
+    assert np.abs(native - expected).max() <= TOLERANCE
@@ -0,0 +1,43 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+SurfaceCache = addon_module("SurfaceCache")
+
+def add_lifting_key(body: bpy.types.Object) -> bpy.types.ShapeKey:
+    body.shape_key_add(name="Basis")
+    key = body.shape_key_add(name="Lift")
+    for point in key.data:
+        point.co.z += 0.4
+    key.value = 0.0
+    bpy.context.view_layer.update()
+    return key
+
+def test_shape_key_change_rebuilds_the_surface(make_scene, dress):
+    body, garment = make_scene()
+    key = add_lifting_key(body)
+    names = [group.name for group in body.vertex_groups]
+    before = Benchmark.copy_object(garment, "BeforeKey")
+    reference = Benchmark.copy_object(garment, "FreshSurface")
+
+    dress(body, before)
+    assert dress(body, garment, force=False).recomputed == [garment.name]
+    # only the evaluated mesh changes, the mesh data of the body is the same
+    key.value = 1.0
+    bpy.context.view_layer.update()
+    assert dress(body, garment, force=False).recomputed == [garment.name]
+    SurfaceCache.surface_cache.invalidate()
+    dress(body, reference)
+
+    assert not np.allclose(Benchmark.dense_weights(garment, names), Benchmark.dense_weights(before, names))
+    assert np.array_equal(Benchmark.dense_weights(garment, names), Benchmark.dense_weights(reference, names))
+
+def test_modifier_change_dresses_again(make_scene, dress):
+    body, garment = make_scene()
+    assert dress(body, garment, force=False).recomputed == [garment.name]
+    displace = body.modifiers.new(name="Displace", type="DISPLACE")
+    displace.strength = 0.2 # type: ignore
+    bpy.context.view_layer.update()
+    assert dress(body, garment, force=False).recomputed == [garment.name]
@@ -0,0 +1,38 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+Symmetry = addon_module("Symmetry")
+VertexCleaner = addon_module("VertexCleaner")
+
+def test_mirrored_half_has_flipped_weights(make_scene, dress):
+    body, garment = make_scene()
+    armature = bpy.data.objects["BenchmarkArmature"]
+    half = Symmetry.symmetric_halves(garment, armature)
+    assert half is not None
+    partners, computed = half
+
+    dress(body, garment, smooth=0.2, symmetric=True)
+    names = [group.name for group in garment.vertex_groups]
+    flipped = [names.index(VertexCleaner.flip_vertex_group_name(name) or name) for name in names]
+    weights = Benchmark.dense_weights(garment, names)
+
+    assert any(name.endswith(".R") for name in names) and any(name.endswith(".L") for name in names)
+    # every vertex has exactly the weights of its partner, with L/R groups swapped
+    assert np.array_equal(weights, weights[partners][:, flipped])
+    assert len(computed) < len(partners)
+
+def test_mirror_modifier_objects_are_transferred_whole(make_scene, dress):
+    body, garment = make_scene()
+    armature = bpy.data.objects["BenchmarkArmature"]
+    garment.modifiers.new(name="Mirror", type="MIRROR")
+    reference = Benchmark.copy_object(garment, "MirrorReference")
+    assert Symmetry.symmetric_halves(garment, armature) is None
+
+    dress(body, garment, symmetric=True)
+    dress(body, reference, symmetric=False)
+    names = [group.name for group in garment.vertex_groups]
+    assert names == [group.name for group in reference.vertex_groups]
+    assert np.array_equal(Benchmark.dense_weights(garment, names), Benchmark.dense_weights(reference, names))
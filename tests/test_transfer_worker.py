@@ -0,0 +1,42 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+SurfaceCache = addon_module("SurfaceCache")
+TransferWorker = addon_module("TransferWorker")
+
+def test_worker_job_round_trip(make_scene, dress):
+    body, garment = make_scene()
+    # existing weights go through shared memory too, and a locked group keeps its weights
+    garment.vertex_groups.new(name="Locked").add(list(range(0, 600, 3)), 0.75, "REPLACE")
+    garment.vertex_groups["Locked"].lock_weight = True
+    small = Benchmark.copy_object(garment, "SmallGarment")
+    small.scale = (0.9, 0.9, 0.9)
+    bpy.context.view_layer.update()
+    references = [Benchmark.copy_object(obj, obj.name + "Reference") for obj in (garment, small)]
+    surface = SurfaceCache.surface_cache.get(body, bpy.context.evaluated_depsgraph_get())
+
+    # the jobs of two workers, run in this process instead of background Blender processes
+    pool = TransferWorker.WeightWorkers(surface, [garment, small], 0.3, 2)
+    try:
+        job_paths = pool.write_jobs()
+        assert len(job_paths) == 2
+        for job_path in job_paths:
+            assert TransferWorker.main([str(job_path)]) == 0
+        results = pool.results()
+    finally:
+        pool.close()
+    assert pool.blocks == [] and not pool.directory.exists()
+
+    for obj in (garment, small):
+        TransferWorker.garment_matrix(obj, results[obj.name]).commit(obj)
+    for reference in references:
+        dress(body, reference, smooth=0.3)
+
+    for obj, reference in zip((garment, small), references):
+        names = [group.name for group in reference.vertex_groups]
+        assert [group.name for group in obj.vertex_groups] == names
+        assert obj.vertex_groups["Locked"].lock_weight
+        assert np.allclose(Benchmark.dense_weights(obj, names), Benchmark.dense_weights(reference, names), atol=1e-6)
@@ -0,0 +1,41 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+VertexCleaner = addon_module("VertexCleaner")
+
+def weighted_grid(group_count: int, used: list[int]) -> bpy.types.Object:
+    """Grid with `group_count` groups of which only `used` carry non-zero weights, plus zero weights in every group."""
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=30, y_subdivisions=30)
+    obj = bpy.context.active_object
+    groups = [obj.vertex_groups.new(name=f"Group{i}") for i in range(group_count)]
+    rng = np.random.default_rng(0)
+    for vertex in range(len(obj.data.vertices)):
+        for index in rng.choice(used, size=min(3, len(used)), replace=False).tolist():
+            groups[index].add([vertex], float(rng.uniform(0.01, 1.0)), "REPLACE")
+        groups[vertex % group_count].add([vertex], 0.0, "ADD")
+    return obj
+
+def test_read_deform_weights_matches_vertex_groups(empty_scene):
+    obj = weighted_grid(6, [0, 2, 3])
+    vertices, groups, weights = VertexCleaner.read_deform_weights(obj.data)
+
+    expected = [(vertex.index, group.group, group.weight) for vertex in obj.data.vertices for group in vertex.groups]
+    assert list(zip(vertices.tolist(), groups.tolist(), weights.tolist())) == [
+        (vertex, group, float(np.float32(weight))) for vertex, group, weight in expected
+    ]
+
+def test_depending_indices_match_reference(empty_scene):
+    for group_count, used in ((6, [0, 2, 3]), (12, [11]), (4, [0, 1, 2, 3])):
+        obj = weighted_grid(group_count, used)
+        context = VertexCleaner.CleanupContext(obj)
+        assert VertexCleaner.depending_vertex_group_indices(context) == VertexCleaner.depending_vertex_group_indices_reference(context)
+        assert VertexCleaner.depending_vertex_group_indices(context) == set(used)
+
+def test_depending_indices_without_weights(empty_scene):
+    bpy.ops.mesh.primitive_cube_add()
+    obj = bpy.context.active_object
+    obj.vertex_groups.new(name="Unused")
+    context = VertexCleaner.CleanupContext(obj)
+    assert VertexCleaner.depending_vertex_group_indices(context) == VertexCleaner.depending_vertex_group_indices_reference(context) == set()
@@ -0,0 +1,34 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightLibrary = addon_module("WeightLibrary")
+
+OPTIONS = {"smooth": 0.1, "clean": True}
+
+def test_library_reproduces_the_transfer(make_scene, dress, tmp_path):
+    library = WeightLibrary.WeightLibrary(str(tmp_path))
+    body, garment = make_scene()
+    copy = Benchmark.copy_object(garment, "LibraryCopy")
+
+    assert dress(body, garment, **OPTIONS, library=library).recomputed == [garment.name]
+    # renamed objects still find their entry
+    body.name = "RenamedBody"
+    assert dress(body, copy, **OPTIONS, library=library).loaded == [copy.name]
+
+    names = [group.name for group in body.vertex_groups]
+    assert [group.name for group in copy.vertex_groups] == [group.name for group in garment.vertex_groups]
+    assert np.array_equal(Benchmark.dense_weights(copy, names), Benchmark.dense_weights(garment, names))
+
+def test_body_weights_change_the_key(make_scene, dress, tmp_path):
+    library = WeightLibrary.WeightLibrary(str(tmp_path))
+    body, garment = make_scene()
+    copy = Benchmark.copy_object(garment, "LibraryCopy")
+    dress(body, garment, **OPTIONS, library=library)
+
+    body.vertex_groups[0].add(list(range(len(body.data.vertices))), 0.5, "REPLACE")
+    body.data.update()
+    bpy.context.view_layer.update()
+    assert dress(body, copy, **OPTIONS, library=library).recomputed == [copy.name]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightLimit = addon_module("WeightLimit")
+
+def test_limits_after_transfer(make_scene, dress):
+    body, garment = make_scene()
+    # not named after a bone, so not a deform group: left as it is
+    garment.vertex_groups.new(name="Mask").add(list(range(100)), 0.3, "REPLACE")
+    names = [group.name for group in body.vertex_groups]
+    unlimited = Benchmark.copy_object(garment, "Unlimited")
+    dress(body, unlimited, smooth=0.2)
+    assert (np.count_nonzero(Benchmark.dense_weights(unlimited, names), axis=1) > 3).any()
+
+    dress(body, garment, smooth=0.2, limits=WeightLimit.InfluenceLimits(3, 0.0, True, 8))
+    weights = Benchmark.dense_weights(garment, names).astype(np.float64)
+    assert np.count_nonzero(weights, axis=1).max() <= 3
+    assert np.allclose(weights.sum(axis=1), 1.0, atol=1e-6)
+    steps = weights * 255
+    assert np.allclose(steps, np.rint(steps), atol=1e-4)
+    assert np.array_equal(Benchmark.dense_weights(garment, ["Mask"]), Benchmark.dense_weights(unlimited, ["Mask"]))
@@ -0,0 +1,72 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+WeightMatrix = addon_module("WeightMatrix").WeightMatrix
+
+def rows(matrix) -> list[dict[str, float]]:
+    """Weights of every vertex by group name."""
+    result = [{} for _ in range(matrix.vertex_count)]
+    for vertex, group, weight in zip(*matrix.entries()):
+        result[vertex][matrix.group_names[group]] = round(float(weight), 6)
+    return result
+
+def sample_matrix():
+    # vertices 1 and 3 have no weights
+    return WeightMatrix.from_entries(
+        ["A", "B", "C"], [True, False, False], 5,
+        np.array([4, 0, 2, 0, 4, 2]), np.array([2, 0, 1, 1, 0, 2]), np.array([0.5, 1.0, 0.25, 0.5, 0.125, 0.75])
+    )
+
+def test_from_entries_orders_the_rows():
+    matrix = sample_matrix()
+    assert matrix.indptr.tolist() == [0, 2, 2, 4, 4, 6]
+    assert matrix.groups.dtype == np.int32 and matrix.weights.dtype == np.float32
+    assert rows(matrix) == [{"A": 1.0, "B": 0.5}, {}, {"B": 0.25, "C": 0.75}, {}, {"C": 0.5, "A": 0.125}]
+
+def test_replace_drops_and_overwrites():
+    matrix = sample_matrix()
+    # B is replaced at vertex 2 only, the entry of C at vertex 4 is overwritten, vertex 1 gets its first weight
+    matrix.replace(np.array([4, 1]), np.array([2, 1]), np.array([0.9, 0.3]), [1], np.array([2]))
+    assert rows(matrix) == [{"A": 1.0, "B": 0.5}, {"B": 0.3}, {"C": 0.75}, {}, {"A": 0.125, "C": 0.9}]
+
+def test_remove_groups_remaps_the_rest():
+    matrix = sample_matrix()
+    assert matrix.remove_groups({0, 2}) == 1
+    assert matrix.group_names == ["A", "C"] and matrix.locked == [True, False]
+    assert rows(matrix) == [{"A": 1.0}, {}, {"C": 0.75}, {}, {"C": 0.5, "A": 0.125}]
+    assert matrix.remove_groups({0, 1}) == 0
+
+def test_assign_replaces_the_groups_of_the_other_matrix():
+    matrix = sample_matrix()
+    other = WeightMatrix.from_entries(["C", "D"], [False, False], 5, np.array([1, 3]), np.array([0, 1]), np.array([0.2, 0.4]))
+    matrix.assign(other)
+    assert matrix.group_names == ["A", "B", "C", "D"] and matrix.locked == [True, False, False, False]
+    assert rows(matrix) == [{"A": 1.0, "B": 0.5}, {"C": 0.2}, {"B": 0.25}, {"D": 0.4}, {"A": 0.125}]
+
+def test_commit_round_trip(empty_scene):
+    mesh = bpy.data.meshes.new("Strip")
+    mesh.from_pydata([(x, y, 0.0) for y in range(2) for x in range(3)], [], [(0, 1, 4, 3), (1, 2, 5, 4)])
+    obj = bpy.data.objects.new("Strip", mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    obj.vertex_groups.new(name="Locked").add([0, 1], 1.0, "REPLACE")
+    obj.vertex_groups["Locked"].lock_weight = True
+    obj.vertex_groups.new(name="Removed").add([1, 4], 0.5, "REPLACE")
+    obj.vertex_groups.new(name="Kept").add([4], 0.25, "REPLACE")
+    obj.vertex_groups.active_index = 2
+
+    matrix = WeightMatrix.from_object(obj)
+    # vertices 2, 3 and 5 have no weights
+    assert rows(matrix) == [{"Locked": 1.0}, {"Locked": 1.0, "Removed": 0.5}, {}, {}, {"Removed": 0.5, "Kept": 0.25}, {}]
+    matrix.remove_groups({0, 2})
+    added = matrix.group_index("Added")
+    matrix.replace(np.array([3, 4]), np.array([added, added]), np.array([0.75, 0.125]))
+    matrix.commit(obj)
+
+    assert [group.name for group in obj.vertex_groups] == ["Locked", "Kept", "Added"]
+    assert [group.lock_weight for group in obj.vertex_groups] == [True, False, False]
+    assert obj.vertex_groups.active.name == "Kept"
+    committed = WeightMatrix.from_object(obj)
+    assert rows(committed) == rows(matrix) == [{"Locked": 1.0}, {"Locked": 1.0}, {}, {"Added": 0.75}, {"Kept": 0.25, "Added": 0.125}, {}]
+    assert [len(vertex.groups) for vertex in mesh.vertices] == [1, 1, 0, 1, 2, 0]
@@ -0,0 +1,31 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+
+def smooth_each_group_reference(obj: bpy.types.Object, factor: float):
+    """The smoothing of earlier versions: the operator smoothing every group, called once per group."""
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.mode_set(mode='WEIGHT_PAINT')
+    for group in obj.vertex_groups:
+        obj.vertex_groups.active_index = group.index
+        bpy.ops.object.vertex_group_smooth(group_select_mode="ALL", factor=factor, repeat=1, expand=0.0)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+def test_smooth_each_group_matches_earlier_versions(make_scene, dress):
+    body, garment = make_scene()
+    reference = Benchmark.copy_object(garment, "SmoothReference")
+    single = Benchmark.copy_object(garment, "SmoothSingle")
+
+    dress(body, garment, smooth=0.5, smooth_per_group=True, transfer_engine="OPERATOR")
+    dress(body, reference, transfer_engine="OPERATOR")
+    smooth_each_group_reference(reference, 0.5)
+    dress(body, single, smooth=0.5, transfer_engine="OPERATOR")
+
+    names = [group.name for group in body.vertex_groups]
+    smoothed, expected = Benchmark.dense_weights(garment, names), Benchmark.dense_weights(reference, names)
+    assert np.abs(smoothed - expected).max() <= 1e-4
+    # the default single pass is a visibly different result
+    assert np.abs(Benchmark.dense_weights(single, names) - expected).max() > 1e-2
@@ -0,0 +1,35 @@
+import bpy
+import numpy as np
+
+from conftest import addon_module
+
+Benchmark = addon_module("Benchmark")
+WeightTransfer = addon_module("WeightTransfer")
+WeightSnapshot = addon_module("WeightSnapshot")
+
+def test_redress_restores_the_weights(make_scene, dress):
+    body, garment = make_scene()
+    dress(body, garment, smooth=0.1, clean=True)
+    names = [group.name for group in body.vertex_groups]
+    dressed_groups = [group.name for group in garment.vertex_groups]
+    dressed = Benchmark.dense_weights(garment, names)
+
+    WeightTransfer.unapply_cloth(garment)
+    assert len(garment.vertex_groups) == 0 and WeightSnapshot.has_weight_snapshot(garment)
+
+    assert WeightTransfer.redress_from_snapshot([garment]) == [garment]
+    assert garment.parent == body.parent
+    assert [group.name for group in garment.vertex_groups] == dressed_groups
+    assert np.array_equal(Benchmark.dense_weights(garment, names), dressed)
+
+def test_snapshot_round_trip(make_scene):
+    _, garment = make_scene()
+    garment.vertex_groups.new(name="Locked").lock_weight = True
+    garment.vertex_groups.new(name="Free").add([0, 1, 2], 0.25, "REPLACE")
+    armature = bpy.data.objects["BenchmarkArmature"]
+
+    snapshot = WeightSnapshot.WeightSnapshot.from_bytes(WeightSnapshot.WeightSnapshot.from_object(garment, armature).to_bytes())
+    assert snapshot is not None and snapshot.armature == armature.name
+    assert snapshot.weights.group_names == ["Locked", "Free"] and snapshot.weights.locked == [True, False]
+    assert snapshot.weights.vertices().tolist() == [0, 1, 2]
+    assert snapshot.weights.weights.tolist() == [0.25] * 3